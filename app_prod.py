@@ -20,15 +20,18 @@ if env_path.exists():
 else:
     print(f"Warning: .env file not found at {env_path.absolute()}")
 
+import atexit
 import logging
 from logging.handlers import RotatingFileHandler
 import traceback
+import json
 import uuid
 import threading
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 import werkzeug.exceptions
@@ -36,10 +39,16 @@ import secrets
 
 from config import get_config
 from models import db, User, ProcessingJob, EventMatch, YouTubeVideo, SystemSettings, init_db
+from utils.progress import ProgressBroker
+from utils.metrics import metrics
+from utils import instrumentation, timeline, log_pipeline
+from utils.exceptions import VideoTooLargeError, InsufficientDiskSpaceError
 
 # Initialize configuration
 config = get_config()
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = config.SECRET_KEY
@@ -51,6 +60,7 @@ def create_app():
     app.config['GOOGLE_SSO_CLIENT_ID'] = config.GOOGLE_SSO_CLIENT_ID
     app.config['GOOGLE_SSO_CLIENT_SECRET'] = config.GOOGLE_SSO_CLIENT_SECRET
     app.config['ALLOWED_DOMAIN'] = config.ALLOWED_DOMAIN
+    app.config['ADMIN_EMAILS'] = {email.strip().lower() for email in config.ADMIN_EMAILS.split(',') if email.strip()}
     
     # Trust proxy headers (for nginx)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
@@ -69,23 +79,71 @@ def create_app():
             # Don't use flash() during app initialization - it requires request context
             app.logger.warning("Configuration errors detected. Check logs for details.")
     
+    metrics.configure(config.METRICS_FOLDER)
+    progress_broker.configure(config.PROGRESS_FOLDER)
+    instrumentation.configure(config.INSTRUMENTATION_ENABLED)
+    
     # Initialize services
     from services.youtube_service import YouTubeService
     from services.zoom_service import ZoomService
     from services.eventbrite_service import EventbriteService
     from services.auth_service import AuthService
+    from services.retention_service import RetentionService
+    from services.cache_service import ResponseCacheService
+    from services.matching_service import MatchingService
+    from services.admission_service import DownloadAdmissionService
+    from services.bandwidth_service import BandwidthLimiter
+    from services.retry_service import ApiRateLimiter, ApiClient, RetryPolicy
+    from services.circuit_breaker import CircuitBreakers
+    from services.singleflight import SingleFlight
+    from utils.profiling import RequestProfiler
+    from services.async_services import AsyncRunner, AsyncZoomService, AsyncEventbriteService, AsyncYouTubeService
+    
+    # Downloads and uploads share one bandwidth budget across workers
+    app.bandwidth_limiter = BandwidthLimiter(config)
+    
+    # API calls share per-API request rates and back off together on 429s
+    app.api_rate_limiter = ApiRateLimiter(config)
+    # ...and fail fast while one of them is down
+    app.circuit_breakers = CircuitBreakers(
+        config, config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS
+    )
+    # ...and give up in time for a 503 while serving a request; background jobs wait longer
+    app.api_client = ApiClient(
+        app.api_rate_limiter,
+        RetryPolicy(config.API_MAX_RETRIES, max_wait=config.API_REQUEST_MAX_RETRY_WAIT,
+                    deadline=config.API_REQUEST_DEADLINE),
+        app.circuit_breakers,
+        background_policy=RetryPolicy(config.API_MAX_RETRIES, max_wait=config.API_MAX_RETRY_WAIT)
+    )
     
-    app.youtube_service = YouTubeService(config)
-    app.zoom_service = ZoomService(config)
-    app.eventbrite_service = EventbriteService(config)
+    # Identical upstream calls made at the same time go out once, across workers
+    app.single_flight = SingleFlight(config)
+    
+    app.youtube_service = YouTubeService(config, app.bandwidth_limiter, app.api_client)
+    app.zoom_service = ZoomService(config, app.bandwidth_limiter, app.api_client)
+    app.eventbrite_service = EventbriteService(config, app.api_client, app.single_flight)
     app.auth_service = AuthService(config)
+    app.retention_service = RetentionService(config)
+    app.response_cache = ResponseCacheService(config, app.single_flight)
+    app.matching_service = MatchingService(config)
+    app.profiler = RequestProfiler(config.PROFILES_FOLDER)
+    app.download_admission = DownloadAdmissionService(config)
+    
+    # Async variants share one event loop and connection pool per process
+    app.async_runner = AsyncRunner()
+    app.async_zoom = AsyncZoomService(app.zoom_service, app.async_runner)
+    app.async_eventbrite = AsyncEventbriteService(app.eventbrite_service, app.async_runner)
+    app.async_youtube = AsyncYouTubeService(app.youtube_service, app.async_runner)
     
     # Create database tables
-    with app.app_context():
-        init_db(app)
+    if config.INIT_DB_ON_STARTUP:
+        with app.app_context():
+            init_db(app)
     
     # Register routes
     register_routes(app)
+    register_request_hooks(app)
     
     # Register error handlers
     register_error_handlers(app)
@@ -93,19 +151,36 @@ def create_app():
     return app
 
 def setup_logging(app):
-    """Configure application logging"""
+    """Configure application logging
+    
+    Every logger writes through a queue, so a request thread only enqueues
+    the record; a background thread formats it and writes the file.
+    """
     if not app.debug and not app.testing:
+        level = getattr(logging, config.LOG_LEVEL.upper())
+        
         # File handler with rotation
         file_handler = RotatingFileHandler(
             config.LOG_FILE, maxBytes=10240000, backupCount=10
         )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
+        if config.LOG_FORMAT == 'json':
+            file_handler.setFormatter(log_pipeline.JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+                ' [request=%(request_id)s job=%(job_id)s]'
+            ))
+        file_handler.setLevel(level)
+        
+        pipeline = log_pipeline.LogPipeline([file_handler], config.LOG_QUEUE_SIZE)
+        pipeline.start()
+        atexit.register(pipeline.stop)
         
-        app.logger.addHandler(file_handler)
-        app.logger.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
+        # Service, route and instrumentation loggers propagate to the root logger
+        root = logging.getLogger()
+        root.addHandler(pipeline.handler)
+        root.setLevel(level)
+        app.logger.setLevel(level)
         app.logger.info('Application startup')
 
 def register_error_handlers(app):
@@ -134,6 +209,12 @@ def register_error_handlers(app):
 # Store processing status globally for simple implementation
 processing_status = {}
 
+# Progress events for status polls and the SSE stream, shared by all workers
+progress_broker = ProgressBroker()
+
+# Forget finished jobs after this many seconds
+PROCESSING_STATUS_TTL = 6 * 3600
+
 def login_required(f):
     """Decorator to require Google SSO authentication"""
     @wraps(f)
@@ -143,19 +224,135 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _publish_status(session_id, status=None):
+    """Update job status and notify stream listeners"""
+    job = processing_status[session_id]
+    if status:
+        job['status'] = status
+    progress_broker.publish(session_id, 'status', {
+        'status': job['status'],
+        'current': job['current'],
+        'total': job['total']
+    })
+    _update_job_gauges(status in ('completed', 'error'))
+
+def _update_job_gauges(force_flush=False):
+    """Report this worker's running jobs and queued matches to /metrics"""
+    running = [job for job in list(processing_status.values()) if job['status'] in ('pending', 'processing')]
+    metrics.set_gauge('processing_jobs_active', len(running))
+    metrics.set_gauge('processing_queue_depth',
+                      sum(1 for job in running for item in job['items'] if item['state'] == 'queued'))
+    if force_flush:
+        metrics.flush(force=True)
+
+def _add_message(session_id, message):
+    """Append a job message and notify stream listeners"""
+    processing_status[session_id]['messages'].append(message)
+    progress_broker.publish(session_id, 'message', {'text': message})
+
+def _set_item_state(session_id, index, state):
+    """Record the state of a single match and notify stream listeners"""
+    item = processing_status[session_id]['items'][index]
+    item['state'] = state
+    progress_broker.publish(session_id, 'item', {'index': index, 'title': item['title'], 'state': state})
+
+def _prune_processing_status():
+    """Drop finished jobs that nobody is watching anymore"""
+    for sid in list(processing_status):
+        if not progress_broker.has_session(sid):
+            processing_status.pop(sid, None)
+    progress_broker.prune(PROCESSING_STATUS_TTL)
+
+def init_processing_status(session_id, matches, user_id=None):
+    """Register a new job so its status can be streamed before work starts
+    
+    With a ``user_id`` the job is also recorded as a ProcessingJob, whose
+    result_data keeps the per-match timeline after the job finishes.
+    """
+    _prune_processing_status()
+    processing_status[session_id] = {
+        'status': 'pending',
+        'current': 0,
+        'total': len(matches),
+        'messages': [],
+        'user_id': user_id,
+        'request_id': log_pipeline.current_request_id(),
+        'created': time.time(),
+        'items': [
+            timeline.new_item(match['eventbrite_event'].get('name', {}).get('text', 'Untitled'))
+            for match in matches
+        ]
+    }
+    
+    if user_id is not None:
+        try:
+            db.session.add(ProcessingJob(
+                id=session_id,
+                user_id=user_id,
+                status='pending',
+                total_steps=len(matches),
+                input_data=json.dumps([
+                    {'meeting_id': match['zoom_meeting'].get('id'), 'event_id': match['eventbrite_event'].get('id')}
+                    for match in matches
+                ])
+            ))
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error recording processing job {session_id}: {str(e)}")
+            db.session.rollback()
+    
+    _publish_status(session_id)
+
+def job_timeline(session_id):
+    """Per-match timeline and aggregate stats, from memory while the job runs"""
+    job = processing_status.get(session_id)
+    if job is not None:
+        return {
+            'status': job['status'],
+            'items': job['items'],
+            'summary': timeline.summarize(job['items'], job['created'], job.get('finished'))
+        }
+    
+    record = db.session.get(ProcessingJob, session_id)
+    if record is None or not record.result_data:
+        return None
+    return dict(json.loads(record.result_data), status=record.status)
+
+def _save_job(session_id):
+    """Persist status, messages and the timeline of a recorded job"""
+    job = processing_status[session_id]
+    try:
+        record = db.session.get(ProcessingJob, session_id)
+        if record is None:
+            return
+        record.status = job['status']
+        record.current_step = job['current']
+        record.messages_list = job['messages']
+        record.started_at = record.started_at or datetime.utcnow()
+        if job['status'] in ('completed', 'error'):
+            record.completed_at = datetime.utcnow()
+        record.result_data = json.dumps({
+            'items': job['items'],
+            'summary': timeline.summarize(job['items'], job['created'], job.get('finished'))
+        })
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Error saving processing job {session_id}: {str(e)}")
+        db.session.rollback()
+
 def process_matches_background(matches, session_id, app):
     """Process confirmed matches in the background with YouTube checking"""
     global processing_status
     
-    with app.app_context():
-        print(f"DEBUG: Background processing started for session {session_id}", flush=True)
+    # Log records of the job carry its ID and the ID of the request that started it
+    request_id = processing_status.get(session_id, {}).get('request_id')
+    with app.app_context(), log_pipeline.correlation(session_id, request_id), app.api_client.background():
+        logger.info("Background processing started for job %s", session_id)
         
-        processing_status[session_id] = {
-            'status': 'processing',
-            'current': 0,
-            'total': len(matches),
-            'messages': []
-        }
+        if session_id not in processing_status:
+            init_processing_status(session_id, matches)
+        _publish_status(session_id, 'processing')
+        _save_job(session_id)
         
         try:
             # Get services
@@ -165,82 +362,202 @@ def process_matches_background(matches, session_id, app):
             # Get Zoom token
             zoom_token = zoom_service.get_access_token()
             if not zoom_token:
-                processing_status[session_id]['status'] = 'error'
-                processing_status[session_id]['messages'].append('Failed to get Zoom access token')
+                _add_message(session_id, 'Failed to get Zoom access token')
+                _finish_job(session_id, 'error')
                 return
             
             youtube_available = youtube_service.is_authenticated()
+            recording_preference = SystemSettings.get_value('recording_type_preference', [])
+            selection_policy = SystemSettings.get_value('recording_selection_policy', 'smallest')
             
             if not youtube_available:
-                processing_status[session_id]['messages'].append('YouTube not authenticated - videos will be downloaded only')
+                _add_message(session_id, 'YouTube not authenticated - videos will be downloaded only')
             
-            for i, match in enumerate(matches):
-                processing_status[session_id]['current'] = i + 1
-                
-                meeting = match['zoom_meeting']
-                eventbrite_event = match['eventbrite_event']
-                event_title = eventbrite_event.get('name', {}).get('text', 'Untitled')
+            pending = list(range(len(matches)))
+            retry = False
+            while pending:
+                for i in pending:
+                    item = processing_status[session_id]['items'][i]
+                    if not retry:
+                        timeline.start_item(item, processing_status[session_id]['created'])
+                    try:
+                        _process_match(app, session_id, i, matches[i], zoom_token, youtube_available,
+                                       recording_preference, selection_policy, retry)
+                    finally:
+                        timeline.finish_item(item)
+                        _save_job(session_id)
                 
-                processing_status[session_id]['messages'].append(f"Processing: {event_title}")
-                
-                # Check if video already exists on YouTube
-                if youtube_available:
-                    existing_video = youtube_service.check_existing_video(event_title)
-                    if existing_video:
-                        processing_status[session_id]['messages'].append(
-                            f"Video already exists on YouTube: {event_title} ({existing_video['video_id']})"
-                        )
-                        continue
-                
-                # Get recording files
-                recording_files = zoom_service.get_recording_files(zoom_token, meeting['id'])
-                if not recording_files:
-                    processing_status[session_id]['messages'].append(f"No recording files found for: {event_title}")
-                    continue
-                
-                # Find video file
-                video_file = None
-                for rec_file in recording_files:
-                    if rec_file.get('file_type', '').upper() == 'MP4':
-                        video_file = rec_file
-                        break
-                
-                if not video_file:
-                    processing_status[session_id]['messages'].append(f"No MP4 video found for: {event_title}")
-                    continue
-                
-                # Download video
-                video_path = zoom_service.download_video(zoom_token, video_file)
-                if not video_path:
-                    processing_status[session_id]['messages'].append(f"Failed to download video for: {event_title}")
-                    continue
-                
-                processing_status[session_id]['messages'].append(f"Downloaded: {event_title}")
-                
-                # Upload to YouTube if authenticated
-                if youtube_available:
-                    upload_result = youtube_service.upload_video(
-                        video_path, 
-                        event_title,
-                        f"Event recording from {meeting.get('start_time', '')}"
-                    )
-                    
-                    if upload_result and upload_result.get('success'):
-                        processing_status[session_id]['messages'].append(
-                            f"Uploaded to YouTube: {event_title} ({upload_result['video_id']})"
-                        )
-                    else:
-                        error_msg = upload_result.get('error', 'Unknown error') if upload_result else 'Upload failed'
-                        processing_status[session_id]['messages'].append(
-                            f"YouTube upload failed for {event_title}: {error_msg}"
-                        )
+                # Uploads in this pass released disk space; retry what waited for it,
+                # unless nothing got through and no space can have been freed
+                deferred = [i for i in pending if processing_status[session_id]['items'][i]['state'] == 'deferred']
+                if len(deferred) == len(pending):
+                    for i in deferred:
+                        title = processing_status[session_id]['items'][i]['title']
+                        _add_message(session_id, f"Not enough disk space for {title}; retry it once other downloads are released")
+                        _set_item_state(session_id, i, 'failed')
+                    break
+                if deferred:
+                    _add_message(session_id, f"Retrying {len(deferred)} match(es) deferred for disk space")
+                pending = deferred
+                retry = True
             
-            processing_status[session_id]['status'] = 'completed'
+            _finish_job(session_id, 'completed')
             
         except Exception as e:
-            print(f"DEBUG: Exception in background processing: {str(e)}", flush=True)
-            processing_status[session_id]['status'] = 'error'
-            processing_status[session_id]['messages'].append(f"Error: {str(e)}")
+            logger.exception("Exception in background processing of job %s", session_id)
+            _add_message(session_id, f"Error: {str(e)}")
+            _finish_job(session_id, 'error')
+
+def _finish_job(session_id, status):
+    processing_status[session_id]['finished'] = time.time()
+    _publish_status(session_id, status)
+    _save_job(session_id)
+
+def _process_match(app, session_id, i, match, zoom_token, youtube_available,
+                   recording_preference, selection_policy, retry=False):
+    """Check, download and upload one match, timing each stage in its timeline item
+    
+    A ``retry`` of a match deferred for disk space skips the YouTube search
+    its first attempt already made.
+    """
+    zoom_service = app.zoom_service
+    youtube_service = app.youtube_service
+    item = processing_status[session_id]['items'][i]
+    
+    processing_status[session_id]['current'] = i + 1
+    _publish_status(session_id)
+    
+    meeting = match['zoom_meeting']
+    eventbrite_event = match['eventbrite_event']
+    event_title = eventbrite_event.get('name', {}).get('text', 'Untitled')
+    
+    _set_item_state(session_id, i, 'processing')
+    _add_message(session_id, f"Processing: {event_title}")
+    
+    # Check if video already exists on YouTube
+    if youtube_available and not retry:
+        usage = {'searches': 0}
+        with timeline.timed(item, 'dedupe'):
+            existing_video = youtube_service.check_existing_video(event_title, usage)
+        item['quota_units'] += usage['searches'] * timeline.SEARCH_QUOTA_UNITS
+        if existing_video:
+            _add_message(
+                session_id,
+                f"Video already exists on YouTube: {event_title} ({existing_video['video_id']})"
+            )
+            _set_item_state(session_id, i, 'skipped')
+            return
+    
+    # Get recording files and pick the MP4 variant that keeps download and upload bytes down
+    with timeline.timed(item, 'lookup'):
+        # The numeric ID only resolves the latest occurrence of a recurring meeting
+        recording_files = zoom_service.get_recording_files(zoom_token, meeting.get('uuid') or meeting['id'])
+        video_file = zoom_service.select_video_file(
+            recording_files, recording_preference, selection_policy,
+            app.download_admission.max_video_bytes()
+        ) if recording_files else None
+    
+    if not recording_files:
+        _add_message(session_id, f"No recording files found for: {event_title}")
+        _set_item_state(session_id, i, 'failed')
+        return
+    
+    if not video_file:
+        _add_message(session_id, f"No MP4 video found for: {event_title}")
+        _set_item_state(session_id, i, 'failed')
+        return
+    
+    # Download video once its size and disk budget are admitted
+    try:
+        with app.download_admission.admit(video_file, session_id):
+            _set_item_state(session_id, i, 'downloading')
+            with timeline.timed(item, 'download'):
+                video_path = zoom_service.download_video(zoom_token, video_file, session_id)
+    except VideoTooLargeError as e:
+        _add_message(session_id, f"Skipped {event_title}: {str(e)}")
+        _set_item_state(session_id, i, 'skipped')
+        return
+    except InsufficientDiskSpaceError as e:
+        _add_message(session_id, f"Deferred {event_title}: {str(e)}")
+        _set_item_state(session_id, i, 'deferred')
+        return
+    
+    if not video_path:
+        _add_message(session_id, f"Failed to download video for: {event_title}")
+        _set_item_state(session_id, i, 'failed')
+        return
+    
+    video_bytes = os.path.getsize(video_path)
+    item['download_bytes'] = video_bytes
+    _add_message(session_id, f"Downloaded: {event_title}")
+    _set_item_state(session_id, i, 'downloaded')
+    
+    # Upload to YouTube if authenticated
+    if youtube_available:
+        _set_item_state(session_id, i, 'uploading')
+        with timeline.timed(item, 'upload'):
+            # The dedupe stage above already searched for this title
+            upload_result = youtube_service.upload_video(
+                video_path, 
+                event_title,
+                f"Event recording from {meeting.get('start_time', '')}",
+                check_existing=False
+            )
+        item['quota_units'] += timeline.UPLOAD_QUOTA_UNITS
+        
+        if upload_result and upload_result.get('success'):
+            item['upload_bytes'] = video_bytes
+            _add_message(
+                session_id,
+                f"Uploaded to YouTube: {event_title} ({upload_result['video_id']})"
+            )
+            _set_item_state(session_id, i, 'uploaded')
+            # The local copy is no longer needed once it is on YouTube
+            app.retention_service.release_file(video_path)
+        else:
+            error_msg = upload_result.get('error', 'Unknown error') if upload_result else 'Upload failed'
+            _add_message(session_id, f"YouTube upload failed for {event_title}: {error_msg}")
+            _set_item_state(session_id, i, 'failed')
+
+def register_request_hooks(app):
+    """Register hooks that run around every request"""
+    from routes.api import is_admin
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        # Correlates this request's log records; nginx or a client may supply the ID
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+        g.request_log_token = log_pipeline.bind_request(g.request_id)
+    
+    @app.before_request
+    def start_profile():
+        # Admins profile a single request with ?profile=1 or an X-Profile: 1 header
+        if request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1':
+            if is_admin():
+                g.profile = app.profiler.start(request.endpoint or 'request')
+    
+    @app.after_request
+    def add_timing_headers(response):
+        # Time spent inside the app; clients subtract it from their latency to see queueing
+        started = g.get('request_started')
+        if started is not None:
+            response.headers['Server-Timing'] = f'app;dur={(time.perf_counter() - started) * 1000:.1f}'
+        profile = g.get('profile')
+        if profile:
+            response.headers['X-Profile-Id'] = profile.profile_id
+        if g.get('request_id'):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+    
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = g.pop('profile', None)
+        if profile:
+            app.profiler.finish_request(profile)
+        token = g.pop('request_log_token', None)
+        if token:
+            log_pipeline.unbind_request(token)
 
 def register_routes(app):
     """Register all application routes"""
@@ -26,11 +26,19 @@ class Config:
     
     EVENTBRITE_PRIVATE_TOKEN: str = os.environ.get('EVENTBRITE_PRIVATE_TOKEN', '')
     
+    # API endpoints; overridden only to point at local stand-ins for benchmarks
+    ZOOM_API_BASE_URL: str = os.environ.get('ZOOM_API_BASE_URL', 'https://api.zoom.us/v2')
+    ZOOM_OAUTH_URL: str = os.environ.get('ZOOM_OAUTH_URL', 'https://zoom.us/oauth/token')
+    EVENTBRITE_API_BASE_URL: str = os.environ.get('EVENTBRITE_API_BASE_URL', 'https://www.eventbriteapi.com/v3')
+    
     # Google OAuth
     GOOGLE_SSO_CLIENT_ID: str = os.environ.get('GOOGLE_SSO_CLIENT_ID', '')
     GOOGLE_SSO_CLIENT_SECRET: str = os.environ.get('GOOGLE_SSO_CLIENT_SECRET', '')
     ALLOWED_DOMAIN: str = os.environ.get('ALLOWED_DOMAIN', 'ohvoice.org')
     
+    # Comma-separated emails allowed to use admin-only tools such as request profiling
+    ADMIN_EMAILS: str = os.environ.get('ADMIN_EMAILS', '')
+    
     # File storage
     @property
     def UPLOAD_FOLDER(self):
@@ -52,6 +60,23 @@ class Config:
     
     MAX_CONTENT_LENGTH: int = int(os.environ.get('MAX_CONTENT_LENGTH', '104857600'))  # 100MB
     
+    # Zoom recordings at least this large are fetched as parallel byte ranges
+    DOWNLOAD_SEGMENTS: int = int(os.environ.get('DOWNLOAD_SEGMENTS', '4'))
+    DOWNLOAD_SEGMENT_MIN_MB: int = int(os.environ.get('DOWNLOAD_SEGMENT_MIN_MB', '64'))
+    
+    # Retries of rate-limited or failed Zoom, Eventbrite and YouTube calls
+    API_MAX_RETRIES: int = int(os.environ.get('API_MAX_RETRIES', '4'))
+    # Longest Retry-After in seconds that background jobs wait out instead of failing the call
+    API_MAX_RETRY_WAIT: int = int(os.environ.get('API_MAX_RETRY_WAIT', '120'))
+    # Calls made while serving a request wait less and give up within the deadline,
+    # well inside gunicorn's worker timeout
+    API_REQUEST_MAX_RETRY_WAIT: int = int(os.environ.get('API_REQUEST_MAX_RETRY_WAIT', '10'))
+    API_REQUEST_DEADLINE: int = int(os.environ.get('API_REQUEST_DEADLINE', '30'))
+    
+    # Consecutive failed calls that open an API's circuit, and seconds before it is probed again
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_RESET_SECONDS: int = int(os.environ.get('CIRCUIT_RESET_SECONDS', '30'))
+    
     # YouTube
     @property
     def YOUTUBE_CREDENTIALS_PATH(self):
@@ -63,6 +88,10 @@ class Config:
     
     # Logging
     LOG_LEVEL: str = os.environ.get('LOG_LEVEL', 'INFO')
+    # 'json' for one structured record per line, 'text' for the classic format
+    LOG_FORMAT: str = os.environ.get('LOG_FORMAT', 'json')
+    # Records waiting for the log writer thread before new ones are dropped
+    LOG_QUEUE_SIZE: int = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
     
     @property
     def LOG_FILE(self):
@@ -70,12 +99,41 @@ class Config:
         Path(log_file).parent.mkdir(parents=True, exist_ok=True)
         return log_file
     
+    # Time and log every Zoom, Eventbrite and YouTube service call
+    INSTRUMENTATION_ENABLED: bool = os.environ.get('INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+    
+    # Request profiles (collapsed stacks) written on demand by admins
+    @property
+    def PROFILES_FOLDER(self):
+        folder = os.environ.get('PROFILES_FOLDER', os.path.join(os.path.dirname(self.LOG_FILE), 'profiles'))
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        return folder
+    
+    # Processing job progress events, read by whichever worker a poll or stream lands on
+    @property
+    def PROGRESS_FOLDER(self):
+        folder = os.environ.get('PROGRESS_FOLDER', os.path.join(self.DOWNLOAD_FOLDER, '.progress'))
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        return folder
+    
+    # Per-worker metrics snapshots merged by /metrics
+    @property
+    def METRICS_FOLDER(self):
+        folder = os.environ.get('METRICS_FOLDER', os.path.join(os.path.dirname(self.LOG_FILE), 'metrics'))
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        return folder
+    
     # Server settings
     HOST: str = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT: int = int(os.environ.get('FLASK_PORT', '5000'))
     WORKERS: int = int(os.environ.get('GUNICORN_WORKERS', '4'))
     TIMEOUT: int = int(os.environ.get('GUNICORN_TIMEOUT', '300'))
     
+    # Create tables and default settings when the app is built. With gunicorn
+    # --preload this runs once in the master; disable it when the schema is
+    # managed by scripts/init_db.py instead
+    INIT_DB_ON_STARTUP: bool = os.environ.get('INIT_DB_ON_STARTUP', 'True').lower() == 'true'
+    
     # Domain and SSL
     DOMAIN: str = os.environ.get('DOMAIN', 'localhost')
     USE_SSL: bool = os.environ.get('USE_SSL', 'False').lower() == 'true'
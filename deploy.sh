@@ -214,6 +214,23 @@ server {
     limit_req_zone \$binary_remote_addr zone=api:10m rate=10r/m;
     limit_req_zone \$binary_remote_addr zone=general:10m rate=100r/m;
 
+    # Server-Sent Events for job progress: long-lived, unbuffered, not rate-limited per event
+    location /api/processing_stream/ {
+        limit_req zone=general burst=50 nodelay;
+        
+        proxy_pass http://${APP_NAME}_app;
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        
+        proxy_read_timeout 120s;
+        proxy_buffering off;
+        proxy_cache off;
+    }
+
     location /api/ {
         limit_req zone=api burst=20 nodelay;
         
@@ -246,10 +263,25 @@ server {
         proxy_buffering off;
     }
 
+    # Scraped by Prometheus from inside the network only
+    location /metrics {
+        allow 127.0.0.1;
+        allow 10.0.0.0/8;
+        allow 172.16.0.0/12;
+        allow 192.168.0.0/16;
+        deny all;
+        access_log off;
+        
+        proxy_pass http://${APP_NAME}_app;
+        proxy_set_header Host \$host;
+    }
+
+    # Answered by the app, which reports the state of Zoom, Eventbrite and YouTube
     location /health {
         access_log off;
-        return 200 "healthy\\n";
-        add_header Content-Type text/plain;
+        
+        proxy_pass http://${APP_NAME}_app;
+        proxy_set_header Host \$host;
     }
 
     location /static/ {
@@ -293,21 +325,15 @@ setup_maintenance_tasks() {
 # Cleanup old files and optimize database
 
 APP_DIR="/opt/zoom-eventbrite-app"
-DAYS_TO_KEEP_DOWNLOADS=7
 DAYS_TO_KEEP_LOGS=30
 
-# Clean old downloads
-find "$APP_DIR/downloads" -name "*.mp4" -mtime +$DAYS_TO_KEEP_DOWNLOADS -delete 2>/dev/null || true
+# Expired jobs, uploaded/orphaned downloads and SQLite space (uses auto_cleanup_days)
+cd "$APP_DIR" && set -a && . "$APP_DIR/.env" && set +a
+"$APP_DIR/venv/bin/python" "$APP_DIR/scripts/cleanup.py" || true
 
 # Clean old logs  
 find "$APP_DIR/logs" -name "*.log" -mtime +$DAYS_TO_KEEP_LOGS -delete 2>/dev/null || true
 
-# Vacuum SQLite database to reclaim space
-sqlite3 "$APP_DIR/data/app.db" "VACUUM;" 2>/dev/null || true
-
-# Clean expired processing jobs (older than 7 days)
-sqlite3 "$APP_DIR/data/app.db" "DELETE FROM processing_jobs WHERE created_at < datetime('now', '-7 days');" 2>/dev/null || true
-
 echo "$(date): Cleanup completed"
 EOF
     
@@ -484,7 +510,7 @@ RUN mkdir -p /app/data /app/logs /app/uploads /app/downloads /app/credentials \
 
 # Copy configuration files (create them if they don't exist)
 RUN if [ -f docker/nginx.conf ]; then cp docker/nginx.conf /etc/nginx/sites-available/default; else \
-    echo 'upstream app { server 127.0.0.1:5000; } server { listen 80; location / { proxy_pass http://app; proxy_set_header Host $host; } location /health { return 200 "healthy\n"; add_header Content-Type text/plain; } }' > /etc/nginx/sites-available/default; fi
+    echo 'upstream app { server 127.0.0.1:5000; } server { listen 80; location / { proxy_pass http://app; proxy_set_header Host $host; } location /health { proxy_pass http://app; proxy_set_header Host $host; access_log off; } }' > /etc/nginx/sites-available/default; fi
 
 RUN if [ -f docker/supervisord.conf ]; then cp docker/supervisord.conf /etc/supervisor/conf.d/supervisord.conf; else \
     echo '[supervisord]\nnodaemon=true\n[program:nginx]\ncommand=/usr/sbin/nginx -g "daemon off;"\nautostart=true\nautorestart=true\n[program:flask-app]\ncommand=gunicorn --bind 127.0.0.1:5000 --workers 4 --timeout 300 app_prod:app\ndirectory=/app\nuser=appuser\nautostart=true\nautorestart=true' > /etc/supervisor/conf.d/supervisord.conf; fi
@@ -582,10 +608,25 @@ server {
         proxy_buffering off;
     }
 
+    # Scraped by Prometheus from inside the network only
+    location /metrics {
+        allow 127.0.0.1;
+        allow 10.0.0.0/8;
+        allow 172.16.0.0/12;
+        allow 192.168.0.0/16;
+        deny all;
+        access_log off;
+        
+        proxy_pass http://app;
+        proxy_set_header Host $host;
+    }
+
+    # Answered by the app, which reports the state of Zoom, Eventbrite and YouTube
     location /health {
         access_log off;
-        return 200 "healthy\n";
-        add_header Content-Type text/plain;
+        
+        proxy_pass http://app;
+        proxy_set_header Host $host;
     }
 
     location /static/ {
@@ -672,6 +713,7 @@ services:
       # Server Settings
       - GUNICORN_WORKERS=${GUNICORN_WORKERS:-4}
       - GUNICORN_TIMEOUT=${GUNICORN_TIMEOUT:-300}
+      - GUNICORN_THREADS=${GUNICORN_THREADS:-8}
       
       # Domain and SSL
       - DOMAIN=${DOMAIN:-localhost}
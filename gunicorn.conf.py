@@ -0,0 +1,31 @@
+# gunicorn.conf.py - Gunicorn settings picked up automatically from the app directory
+#
+# Command-line flags (--bind, --workers, --timeout, --threads) still take precedence.
+
+import os
+
+# Import the app and initialize the database once in the master, then fork
+# workers that share the already-imported modules
+preload_app = True
+
+# SSE progress streams and slow upstream calls hold one thread each instead of
+# a whole sync worker, so health checks and other requests are still served
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+def on_starting(server):
+    """Start /metrics from zero instead of summing a previous run's workers"""
+    from config import get_config
+    from utils.metrics import metrics
+
+    metrics.configure(get_config().METRICS_FOLDER)
+    metrics.clear_folder()
+
+def post_fork(server, worker):
+    """Give each worker its own database connections"""
+    from app_prod import app
+    from models import db
+
+    with app.app_context():
+        # close=False leaves the parent's connections alone and just drops them from the pool
+        db.engine.dispose(close=False)
@@ -1,5 +1,5 @@
 # models.py - Database models for SQLite
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from flask_sqlalchemy import SQLAlchemy
 import json
 import enum
@@ -203,6 +203,61 @@ class YouTubeVideo(db.Model):
         other_normalized = self.normalize_title(other_title)
         return self.title_normalized == other_normalized
 
+class EventbriteEventCache(db.Model):
+    """Cache of Eventbrite event listings per organization and day"""
+    __tablename__ = 'eventbrite_event_cache'
+    __table_args__ = (
+        db.UniqueConstraint('organization_id', 'event_date', name='uq_eventbrite_cache_org_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.String(100), nullable=False)
+    event_date = db.Column(db.Date, nullable=False)
+    events = db.Column(db.Text, default='[]')  # JSON array as text
+    event_count = db.Column(db.Integer, default=0)
+    
+    # Cache management
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<EventbriteEventCache {self.organization_id} {self.event_date}>'
+    
+    @property
+    def events_list(self):
+        """Get cached events as Python list"""
+        try:
+            return json.loads(self.events or '[]')
+        except (ValueError, TypeError):
+            return []
+    
+    @events_list.setter
+    def events_list(self, value):
+        """Set cached events from Python list"""
+        value = value or []
+        self.events = json.dumps(value)
+        self.event_count = len(value)
+    
+    def is_fresh(self, ttl: timedelta, now=None):
+        """Check whether this entry is younger than ``ttl``"""
+        now = now or datetime.utcnow()
+        return self.fetched_at is not None and now < self.fetched_at + ttl
+
+class ApiResponseCache(db.Model):
+    """Shared cache of serialized API responses"""
+    __tablename__ = 'api_response_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(255), unique=True, nullable=False)
+    body = db.Column(db.Text, nullable=False)  # JSON as text
+    etag = db.Column(db.String(64), nullable=False)
+    
+    # Cache management
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ApiResponseCache {self.cache_key}>'
+
 class SystemSettings(db.Model):
     """System-wide configuration settings"""
     __tablename__ = 'system_settings'
@@ -272,18 +327,38 @@ def init_db(app=None):
         ('auto_cleanup_days', '7', 'int', 'Days to keep downloaded files'),
         ('max_concurrent_jobs', '3', 'int', 'Maximum concurrent processing jobs'),
         ('youtube_cache_hours', '24', 'int', 'Hours to cache YouTube video list'),
-        ('check_existing_videos', 'true', 'bool', 'Check for existing YouTube videos before upload')
+        ('check_existing_videos', 'true', 'bool', 'Check for existing YouTube videos before upload'),
+        ('eventbrite_cache_past_hours', '168', 'int', 'Hours to cache Eventbrite events for past dates'),
+        ('eventbrite_cache_future_minutes', '15', 'int', 'Minutes to cache Eventbrite events for today and future dates'),
+        ('api_cache_minutes', '60', 'int', 'Minutes to serve cached Zoom user and Eventbrite organization lists'),
+        ('api_cache_stale_hours', '168', 'int', 'Hours a stale cached list may be served while it refreshes'),
+        ('download_disk_headroom_mb', '1024', 'int', 'Disk space in MB to keep free in the download folder'),
+        ('download_admission_wait_minutes', '30', 'int', 'Minutes a download may wait for disk space before it is deferred'),
+        ('recording_selection_policy', 'smallest', 'string', 'Which MP4 variant to download: smallest (with the best view available) or preferred'),
+        ('recording_type_preference', '[]', 'json',
+         'Zoom recording types eligible for download, most preferred first (empty for the built-in order)'),
+        ('bandwidth_ingress_mbps', '0', 'int', 'Mbit/s shared by all Zoom downloads (0 for unlimited)'),
+        ('bandwidth_egress_mbps', '0', 'int', 'Mbit/s shared by all YouTube uploads (0 for unlimited)'),
+        ('api_rate_limits', '{"zoom": 10, "eventbrite": 5, "youtube": 5}', 'json',
+         'Requests per second per API shared by all workers (0 for unlimited)'),
+        ('bandwidth_profiles', '[]', 'json',
+         'Time-of-day limits, e.g. [{"start": "09:00", "end": "18:00", "ingress_mbps": 50, "egress_mbps": 20}]')
     ]
     
-    for key, value, value_type, description in default_settings:
-        if not SystemSettings.query.filter_by(key=key).first():
-            setting = SystemSettings(
-                key=key,
-                value=value, 
-                value_type=value_type,
-                description=description
-            )
-            db.session.add(setting)
+    # One query for all keys; nothing to commit on an already initialized database
+    existing_keys = {row.key for row in db.session.query(SystemSettings.key).all()}
+    missing = [setting for setting in default_settings if setting[0] not in existing_keys]
+    if not missing:
+        return
+    
+    for key, value, value_type, description in missing:
+        setting = SystemSettings(
+            key=key,
+            value=value, 
+            value_type=value_type,
+            description=description
+        )
+        db.session.add(setting)
     
     try:
         db.session.commit()
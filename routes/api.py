@@ -1,14 +1,32 @@
 # routes/api.py - API routes
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app, g, send_file, stream_with_context
 from functools import wraps
 from dateutil.parser import parse
 import uuid
 import threading
 import logging
 import os
+import json
+import time
+
+from utils.progress import format_sse
+from utils.exceptions import ZoomError, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+# Server-Sent Events tuning
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MAX_STREAM_SECONDS = 55
+SSE_RETRY_MS = 1000
+
+# Largest meetings page a client may request (Zoom's own page size limit)
+MAX_MEETINGS_PAGE_SIZE = 300
+
+# user_id value that selects every user in the Zoom account
+ALL_USERS = 'all'
+
+DEPENDENCY_NAMES = {'zoom': 'Zoom', 'eventbrite': 'Eventbrite', 'youtube': 'YouTube'}
+
 api_bp = Blueprint('api', __name__)
 
 def api_login_required(f):
@@ -20,14 +38,71 @@ def api_login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def is_admin():
+    """Whether the signed-in user is listed in ADMIN_EMAILS"""
+    email = session.get('user', {}).get('email', '').lower()
+    return bool(email) and email in current_app.config.get('ADMIN_EMAILS', set())
+
+def admin_required(f):
+    """Decorator to restrict API endpoints to admins"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _dependency_down(api):
+    """Whether calls to ``api`` are failing fast behind its circuit breaker"""
+    return current_app.circuit_breakers.is_open(api)
+
+def _unavailable_response(api):
+    """503 naming the dependency that is down and when it will be tried again"""
+    retry_in = current_app.circuit_breakers.status(api)['retry_in']
+    response = jsonify({
+        'error': f"{DEPENDENCY_NAMES.get(api, api)} is unavailable, retrying in {retry_in}s",
+        'dependency': api,
+        'retry_in': retry_in
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(retry_in, 1))
+    return response
+
+def _cached_json_response(cache_key, loader, error_message, dependency):
+    """Serve a slow-changing upstream listing from the shared response cache"""
+    cache = current_app.response_cache
+    entry = cache.get_or_load(
+        cache_key, loader, current_app._get_current_object(),
+        force_refresh=request.args.get('refresh', '').lower() in ('1', 'true')
+    )
+    if entry is None:
+        if _dependency_down(dependency):
+            return _unavailable_response(dependency)
+        return jsonify({'error': error_message}), 500
+    
+    if request.if_none_match.contains(entry.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    # Private data behind login; browsers revalidate with If-None-Match every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @api_bp.route('/organizations')
 @api_login_required
 def get_organizations():
     """Get Eventbrite organizations"""
     try:
         eventbrite_service = current_app.eventbrite_service
-        organizations = eventbrite_service.get_organizations()
-        return jsonify({'organizations': organizations})
+        
+        def load():
+            organizations = eventbrite_service.get_organizations()
+            return {'organizations': organizations} if organizations else None
+        
+        return _cached_json_response('eventbrite:organizations', load, 'Failed to get organizations', 'eventbrite')
         
     except Exception as e:
         logger.error(f"Error getting organizations: {str(e)}")
@@ -40,13 +115,17 @@ def get_users():
     try:
         zoom_service = current_app.zoom_service
         
-        # Get access token
-        access_token = zoom_service.get_access_token()
-        if not access_token:
-            return jsonify({'error': 'Failed to get Zoom access token'}), 500
+        def load():
+            # Get access token
+            access_token = zoom_service.get_access_token()
+            if not access_token:
+                logger.error("Failed to get Zoom access token")
+                return None
+            
+            users = zoom_service.get_users(access_token)
+            return {'users': users} if users else None
         
-        users = zoom_service.get_users(access_token)
-        return jsonify({'users': users})
+        return _cached_json_response('zoom:users', load, 'Failed to get users', 'zoom')
         
     except Exception as e:
         logger.error(f"Error getting users: {str(e)}")
@@ -55,7 +134,13 @@ def get_users():
 @api_bp.route('/meetings', methods=['POST'])
 @api_login_required
 def get_meetings():
-    """Get Zoom meetings with recordings"""
+    """Get Zoom meetings with recordings
+    
+    Optional body fields: ``fields: "summary"`` drops recording file details,
+    ``limit``/``cursor`` page through the range (the response carries
+    ``next_cursor``), and ``stream: true`` returns NDJSON. ``user_id: "all"``
+    harvests recordings of every user in the account.
+    """
     try:
         data = request.json
         start_date = data.get('start_date')
@@ -65,20 +150,181 @@ def get_meetings():
         if not start_date or not end_date:
             return jsonify({'error': 'Start date and end date are required'}), 400
         
+        summary = data.get('fields') == 'summary'
+        cursor = data.get('cursor')
+        limit = data.get('limit')
+        try:
+            limit = min(max(int(limit), 1), MAX_MEETINGS_PAGE_SIZE) if limit is not None else None
+            if cursor:
+                current_app.zoom_service.decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         zoom_service = current_app.zoom_service
         
         # Get access token
         access_token = zoom_service.get_access_token()
         if not access_token:
+            if _dependency_down('zoom'):
+                return _unavailable_response('zoom')
             return jsonify({'error': 'Failed to get Zoom access token'}), 500
         
-        meetings = zoom_service.get_recordings(access_token, start_date, end_date, user_id)
-        return jsonify({'meetings': meetings})
+        project = zoom_service.summarize_meeting if summary else (lambda meeting: meeting)
+        
+        if user_id == ALL_USERS:
+            # Account-wide harvest is gathered concurrently and returned as one page
+            meetings = [project(meeting) for meeting in
+                        current_app.async_zoom.harvest_account(access_token, start_date, end_date)]
+            if data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+                return _stream_meetings_list(meetings)
+            return jsonify({'meetings': meetings, 'next_cursor': None})
+        
+        if data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+            return _stream_meetings(zoom_service, access_token, start_date, end_date, user_id,
+                                    project, cursor, limit)
         
+        if limit is None and cursor is None:
+            # All 30-day windows are requested concurrently
+            meetings = current_app.async_zoom.get_recordings(access_token, start_date, end_date, user_id)
+            return jsonify({'meetings': [project(meeting) for meeting in meetings]})
+        
+        meetings, next_cursor = _collect_meetings_page(
+            zoom_service, access_token, start_date, end_date, user_id, cursor,
+            limit or MAX_MEETINGS_PAGE_SIZE
+        )
+        return jsonify({'meetings': [project(meeting) for meeting in meetings], 'next_cursor': next_cursor})
+        
+    except CircuitOpenError as e:
+        return _unavailable_response(e.api)
+    except ZoomError as e:
+        # Rate limited past the retries; a partial listing would hide the missing windows
+        logger.warning("Zoom unavailable for meetings: %s", e)
+        return jsonify({'error': 'Zoom is rate limiting or unavailable, please retry shortly'}), 503
     except Exception as e:
         logger.error(f"Error getting meetings: {str(e)}")
         return jsonify({'error': 'Failed to get meetings'}), 500
 
+def _iter_meeting_pages(zoom_service, access_token, start_date, end_date, user_id, cursor, limit):
+    """Yield ``(meetings, next_cursor)`` pages until ``limit`` meetings or the range end"""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = min(remaining, MAX_MEETINGS_PAGE_SIZE) if remaining else MAX_MEETINGS_PAGE_SIZE
+        meetings, cursor = zoom_service.get_recordings_page(
+            access_token, start_date, end_date, user_id, cursor=cursor, page_size=page_size
+        )
+        if remaining is not None:
+            remaining -= len(meetings)
+        yield meetings, cursor
+        if not cursor:
+            break
+
+def _collect_meetings_page(zoom_service, access_token, start_date, end_date, user_id, cursor, limit):
+    """Gather up to ``limit`` meetings starting at ``cursor``"""
+    collected = []
+    next_cursor = None
+    for meetings, next_cursor in _iter_meeting_pages(
+            zoom_service, access_token, start_date, end_date, user_id, cursor, limit):
+        collected.extend(meetings)
+    return collected, next_cursor
+
+def _stream_meetings(zoom_service, access_token, start_date, end_date, user_id,
+                     project, cursor=None, limit=None):
+    """Stream meetings as newline-delimited JSON while Zoom windows complete
+    
+    Each line is ``{"meeting": {...}}``; the last line is
+    ``{"done": true, "count": N, "next_cursor": ...}`` so clients can tell a
+    complete listing from a dropped connection. When Zoom fails mid-stream
+    the last line is an ``error`` record whose ``next_cursor`` resumes it.
+    """
+    breakers = current_app.circuit_breakers
+    
+    def generate():
+        count = 0
+        # Where a client resumes if the stream breaks off
+        next_cursor = cursor
+        try:
+            for meetings, next_cursor in _iter_meeting_pages(
+                    zoom_service, access_token, start_date, end_date, user_id, cursor, limit):
+                chunk = ''.join(json.dumps({'meeting': project(meeting)}) + '\n' for meeting in meetings)
+                count += len(meetings)
+                if chunk:
+                    yield chunk
+        except (ZoomError, CircuitOpenError) as e:
+            # Headers are already sent, so the 503 becomes the last record
+            logger.warning("Zoom unavailable while streaming meetings: %s", e)
+            retry_in = breakers.status('zoom')['retry_in']
+            yield json.dumps({'error': 'Zoom is rate limiting or unavailable, please retry shortly',
+                              'dependency': 'zoom', 'retry_in': retry_in, 'next_cursor': next_cursor}) + '\n'
+            return
+        except Exception as e:
+            logger.error(f"Error streaming meetings: {str(e)}")
+            yield json.dumps({'error': 'Failed to get meetings'}) + '\n'
+            return
+        logger.info("Streamed %d meetings with recordings", count)
+        yield json.dumps({'done': True, 'count': count, 'next_cursor': next_cursor}) + '\n'
+    
+    # Pages are fetched while streaming; settings lookups need the request's app context
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _stream_meetings_list(meetings):
+    """NDJSON response for an already collected meeting list"""
+    def generate():
+        for meeting in meetings:
+            yield json.dumps({'meeting': meeting}) + '\n'
+        yield json.dumps({'done': True, 'count': len(meetings), 'next_cursor': None}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache'})
+
+@api_bp.route('/meetings/recording_files', methods=['POST'])
+@api_login_required
+def get_many_recording_files():
+    """Get recording file details for many meetings in one concurrent fan-out"""
+    try:
+        meeting_ids = [str(meeting_id) for meeting_id in (request.json or {}).get('meeting_ids', [])]
+        if not meeting_ids:
+            return jsonify({'error': 'No meeting IDs provided'}), 400
+        if len(meeting_ids) > MAX_MEETINGS_PAGE_SIZE:
+            return jsonify({'error': f'At most {MAX_MEETINGS_PAGE_SIZE} meetings per request'}), 400
+        
+        access_token = current_app.zoom_service.get_access_token()
+        if not access_token:
+            if _dependency_down('zoom'):
+                return _unavailable_response('zoom')
+            return jsonify({'error': 'Failed to get Zoom access token'}), 500
+        
+        recording_files = current_app.async_zoom.get_recording_files_many(access_token, meeting_ids)
+        return jsonify({'recording_files': recording_files})
+        
+    except Exception as e:
+        logger.error(f"Error getting recording files: {str(e)}")
+        return jsonify({'error': 'Failed to get recording files'}), 500
+
+@api_bp.route('/meetings/<meeting_id>/recording_files')
+@api_login_required
+def get_meeting_recording_files(meeting_id):
+    """Get recording file details for one meeting, for lazy loading"""
+    try:
+        zoom_service = current_app.zoom_service
+        
+        access_token = zoom_service.get_access_token()
+        if not access_token:
+            if _dependency_down('zoom'):
+                return _unavailable_response('zoom')
+            return jsonify({'error': 'Failed to get Zoom access token'}), 500
+        
+        # Prefer the instance UUID; the numeric ID only resolves the latest occurrence
+        recording_files = zoom_service.get_recording_files(
+            access_token, request.args.get('uuid') or meeting_id
+        )
+        return jsonify({'recording_files': recording_files})
+        
+    except Exception as e:
+        logger.error(f"Error getting recording files: {str(e)}")
+        return jsonify({'error': 'Failed to get recording files'}), 500
+
 @api_bp.route('/events', methods=['POST'])
 @api_login_required
 def get_events():
@@ -101,14 +347,22 @@ def get_events():
             return jsonify({'error': f'Invalid date format: {meeting_date}'}), 400
         
         eventbrite_service = current_app.eventbrite_service
-        events = eventbrite_service.get_events_by_date(organization_id, event_date)
+        events = eventbrite_service.get_events_by_date(
+            organization_id, event_date, use_cache=not data.get('refresh', False)
+        )
+        if not events and _dependency_down('eventbrite'):
+            return _unavailable_response('eventbrite')
         
-        # Check each event against existing YouTube videos
+        # Check each event against existing YouTube videos; while YouTube is down
+        # the events are still listed, flagged as unchecked
         youtube_service = current_app.youtube_service
-        if youtube_service.is_authenticated():
+        youtube_checked = not _dependency_down('youtube')
+        if youtube_checked and youtube_service.is_authenticated():
+            existing_videos = current_app.async_youtube.check_existing_videos(
+                event.get('name', {}).get('text', '') for event in events
+            )
             for event in events:
-                event_title = event.get('name', {}).get('text', '')
-                existing_video = youtube_service.check_existing_video(event_title)
+                existing_video = existing_videos.get(event.get('name', {}).get('text', ''))
                 
                 event['youtube_exists'] = existing_video is not None
                 if existing_video:
@@ -119,12 +373,66 @@ def get_events():
                 event['youtube_exists'] = False
                 event['youtube_video'] = None
         
-        return jsonify({'events': events})
+        return jsonify({'events': events, 'youtube_checked': youtube_checked})
         
     except Exception as e:
         logger.error(f"Error getting events: {str(e)}")
         return jsonify({'error': 'Failed to get events'}), 500
 
+@api_bp.route('/auto_match', methods=['POST'])
+@api_login_required
+def auto_match():
+    """Propose ranked Eventbrite matches for every Zoom meeting in a range"""
+    try:
+        data = request.json
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        organization_id = data.get('organization_id')
+        user_id = data.get('user_id', 'me')
+        
+        if not start_date or not end_date or not organization_id:
+            return jsonify({'error': 'Start date, end date and organization ID are required'}), 400
+        
+        try:
+            max_candidates = int(data.get('max_candidates', 3))
+            min_score = float(data.get('min_score', 0.0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid max_candidates or min_score'}), 400
+        
+        zoom_service = current_app.zoom_service
+        access_token = zoom_service.get_access_token()
+        if not access_token:
+            if _dependency_down('zoom'):
+                return _unavailable_response('zoom')
+            return jsonify({'error': 'Failed to get Zoom access token'}), 500
+        
+        if user_id == ALL_USERS:
+            meetings = current_app.async_zoom.harvest_account(access_token, start_date, end_date)
+        else:
+            meetings = current_app.async_zoom.get_recordings(access_token, start_date, end_date, user_id)
+        meetings = [zoom_service.summarize_meeting(meeting) for meeting in meetings]
+        
+        # Only days that have meetings are looked up; cached days stay off the network
+        matching_service = current_app.matching_service
+        events_by_date = current_app.async_eventbrite.get_events_for_dates(
+            organization_id, matching_service.meeting_dates(meetings)
+        )
+        events = list({
+            event.get('id'): event for day_events in events_by_date.values() for event in day_events
+        }.values())
+        
+        proposals = matching_service.propose_matches(meetings, events, max_candidates, min_score)
+        return jsonify({'proposals': proposals, 'meeting_count': len(meetings), 'event_count': len(events)})
+        
+    except CircuitOpenError as e:
+        return _unavailable_response(e.api)
+    except ZoomError as e:
+        logger.warning("Zoom unavailable for auto-match: %s", e)
+        return jsonify({'error': 'Zoom is rate limiting or unavailable, please retry shortly'}), 503
+    except Exception as e:
+        logger.error(f"Error auto-matching: {str(e)}")
+        return jsonify({'error': 'Failed to match meetings'}), 500
+
 @api_bp.route('/process_matches', methods=['POST'])
 @api_login_required
 def process_matches():
@@ -141,17 +449,25 @@ def process_matches():
         user_id = session['user']['id']
         
         # Import the background processing function
-        from app_prod import process_matches_background
+        from app_prod import process_matches_background, init_processing_status
+        
+        # Register the job first so status requests never race the thread
+        init_processing_status(session_id, matches, user_id)
         
         # Start background thread
         thread = threading.Thread(
             target=process_matches_background,
-            args=(matches, session_id, current_app._get_current_object())
+            args=(matches, session_id, current_app._get_current_object()),
+            name=f'process-matches-{session_id[:8]}'
         )
         thread.daemon = True
         thread.start()
         
-        logger.info(f"Started processing job {session_id} for user {user_id}")
+        # A profiled request keeps sampling the job it started
+        if g.get('profile'):
+            current_app.profiler.track_thread(g.profile, thread)
+        
+        logger.info("Started processing job %s for user %s", session_id, user_id)
         return jsonify({'session_id': session_id})
         
     except Exception as e:
@@ -161,18 +477,121 @@ def process_matches():
 @api_bp.route('/processing_status/<session_id>')
 @api_login_required
 def get_processing_status(session_id):
-    """Get status of background processing job"""
+    """Get status of background processing job
+    
+    Pass ``since=<cursor>`` to receive only messages and item changes after
+    a previous response's ``cursor``. Responses carry an ETag, so an
+    unchanged job answers ``If-None-Match`` with 304.
+    """
     try:
         # Import the global processing status
-        from app_prod import processing_status
+        from app_prod import processing_status, progress_broker
         
-        status = processing_status.get(session_id, {'status': 'not_found'})
-        return jsonify(status)
+        # Only the worker running the job has it in memory; the others rebuild it from its events
+        status = processing_status.get(session_id) or progress_broker.snapshot(session_id)
+        if status is None:
+            return jsonify({'status': 'not_found'})
+        
+        cursor = progress_broker.last_event_id(session_id)
+        etag = f'{session_id}-{cursor}'
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        since = request.args.get('since', type=int)
+        if since is None:
+            payload = dict(status, cursor=cursor)
+        else:
+            payload = {
+                'status': status['status'],
+                'current': status['current'],
+                'total': status['total'],
+                'cursor': cursor,
+                'messages': [],
+                'items': {}
+            }
+            # Stop at the cursor we report so the next poll neither skips nor repeats events
+            events = progress_broker.events_since(session_id, since)[:max(cursor - since, 0)]
+            for event_id, event_type, data in events:
+                if event_type == 'message':
+                    payload['messages'].append(data['text'])
+                elif event_type == 'item':
+                    payload['items'][data['index']] = data['state']
+        
+        response = jsonify(payload)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"Error getting processing status: {str(e)}")
         return jsonify({'error': 'Failed to get status'}), 500
 
+@api_bp.route('/jobs/<session_id>/timeline')
+@api_login_required
+def get_job_timeline(session_id):
+    """Per-match timing of a processing job with throughput and its slowest matches"""
+    try:
+        from app_prod import processing_status, job_timeline
+        from models import ProcessingJob
+        
+        live = processing_status.get(session_id)
+        record = None if live else ProcessingJob.query.filter_by(id=session_id).first()
+        owner = live.get('user_id') if live else record.user_id if record else None
+        if owner != session['user']['id'] and not is_admin():
+            return jsonify({'error': 'Job not found'}), 404
+        
+        result = job_timeline(session_id)
+        if result is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error getting job timeline: {str(e)}")
+        return jsonify({'error': 'Failed to get job timeline'}), 500
+
+@api_bp.route('/processing_stream/<session_id>')
+@api_login_required
+def stream_processing_status(session_id):
+    """Stream job progress as Server-Sent Events"""
+    from app_prod import progress_broker
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', 0))
+    except ValueError:
+        last_event_id = 0
+    
+    if not progress_broker.has_session(session_id):
+        return jsonify({'status': 'not_found'}), 404
+    
+    def generate():
+        nonlocal last_event_id
+        # Close the stream periodically so a sync worker is never pinned for a whole
+        # job; EventSource reconnects and resumes from Last-Event-ID
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        yield f'retry: {SSE_RETRY_MS}\n\n'
+        
+        while time.monotonic() < deadline:
+            events = progress_broker.wait_for_events(session_id, last_event_id, SSE_KEEPALIVE_SECONDS)
+            if not events:
+                if progress_broker.is_finished(session_id):
+                    return
+                yield ': keepalive\n\n'
+                continue
+            
+            for event_id, event_type, data in events:
+                last_event_id = event_id
+                yield format_sse(event_id, event_type, data)
+            
+            if progress_broker.is_finished(session_id) and not progress_broker.events_since(session_id, last_event_id):
+                return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/youtube/status')
 @api_login_required
 def youtube_status():
@@ -203,3 +622,18 @@ def refresh_youtube_cache():
     except Exception as e:
         logger.error(f"Error refreshing YouTube cache: {str(e)}")
         return jsonify({'error': 'Failed to refresh cache'}), 500
+
+@api_bp.route('/profiles')
+@admin_required
+def list_profiles():
+    """List stored request profiles"""
+    return jsonify({'profiles': current_app.profiler.list_profiles()})
+
+@api_bp.route('/profiles/<file_name>')
+@admin_required
+def download_profile(file_name):
+    """Download a profile's collapsed stacks or summary"""
+    path = current_app.profiler.profile_path(file_name)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=file_name)
@@ -1,7 +1,5 @@
 # routes/auth.py - Authentication routes
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash, current_app
-import googleapiclient.discovery
-from google_auth_oauthlib.flow import Flow
 import logging
 import os
 
@@ -50,6 +48,9 @@ def create_google_oauth_flow():
     # Disable HTTPS requirement for local development
     os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1' if current_app.debug else '0'
     
+    # Imported here so workers and scripts don't pay for it at startup
+    from google_auth_oauthlib.flow import Flow
+    
     try:
         flow = Flow.from_client_config(client_config, scopes=scopes)
         flow.redirect_uri = redirect_uri
@@ -98,6 +99,7 @@ def callback():
         
         # Get user info from Google
         credentials = flow.credentials
+        import googleapiclient.discovery
         user_info_service = googleapiclient.discovery.build('oauth2', 'v2', credentials=credentials)
         user_info = user_info_service.userinfo().get().execute()
         
@@ -1,8 +1,10 @@
 # routes/main.py - Main application routes
-from flask import Blueprint, render_template, session, redirect, url_for
+from flask import Blueprint, Response, render_template, session, redirect, url_for, jsonify, current_app
 from functools import wraps
 import logging
 
+from utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
@@ -21,10 +23,21 @@ def login_required(f):
 def index():
     """Main application page"""
     user = session.get('user', {})
-    logger.info(f"User {user.get('email', 'unknown')} accessed main page")
+    logger.info("User %s accessed main page", user.get('email', 'unknown'))
     return render_template('index.html', user=user)
 
 @main_bp.route('/health')
 def health():
-    """Health check endpoint"""
-    return "healthy\n"
+    """Health check endpoint with the state of each upstream dependency
+    
+    Always 200 while the app itself serves requests: a dependency being down
+    degrades the app but must not get the container restarted.
+    """
+    dependencies = current_app.circuit_breakers.statuses()
+    degraded = any(dependency['state'] != 'closed' for dependency in dependencies.values())
+    return jsonify({'status': 'degraded' if degraded else 'healthy', 'dependencies': dependencies})
+
+@main_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics merged across all workers"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
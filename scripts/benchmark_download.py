@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark single-stream vs segmented recording downloads against a local stub"""
+
+import sys
+import os
+import time
+import tempfile
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MB = 1024 * 1024
+
+def make_handler(payload, per_stream_bytes):
+    """Range-capable handler that caps each connection at ``per_stream_bytes``/s,
+    the way a single TCP stream to a distant CDN is capped in practice"""
+
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            range_header = self.headers.get('Range')
+            if range_header:
+                first, last = range_header.replace('bytes=', '').split('-')
+                start, end = int(first), int(last) if last else len(payload) - 1
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{len(payload)}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', str(end - start + 1))
+            self.end_headers()
+
+            chunk = 256 * 1024
+            began = time.perf_counter()
+            sent = 0
+            for offset in range(start, end + 1, chunk):
+                block = payload[offset:min(offset + chunk, end + 1)]
+                self.wfile.write(block)
+                sent += len(block)
+                if per_stream_bytes:
+                    ahead = sent / per_stream_bytes - (time.perf_counter() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return RangeHandler
+
+def time_download(zoom_service, url, size):
+    recording_file = {'id': 'benchmark', 'file_type': 'MP4', 'file_size': size, 'download_url': url}
+    start = time.perf_counter()
+    path = zoom_service.download_video('benchmark-token', recording_file)
+    elapsed = time.perf_counter() - start
+    if not path or os.path.getsize(path) != size:
+        raise SystemExit('Download failed or has the wrong size')
+    os.unlink(path)
+    return elapsed
+
+def main():
+    """Run the download benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=128)
+    parser.add_argument('--per-stream-mbps', type=float, default=200,
+                        help='Per-connection cap in megabits/s, 0 for unlimited')
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    download_dir = tempfile.mkdtemp(prefix='benchmark-download-')
+    os.environ.setdefault('FLASK_ENV', 'development')
+    os.environ['DOWNLOAD_FOLDER'] = download_dir
+
+    from config import get_config
+    from services.zoom_service import ZoomService
+
+    size = args.size_mb * MB
+    payload = os.urandom(size)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(payload, args.per_stream_mbps * MB / 8))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/recording.mp4'
+
+    zoom_service = ZoomService(get_config())
+    zoom_service.downloader.min_segmented_bytes = 0
+
+    print(f"{args.size_mb} MB file, {args.per_stream_mbps:g} Mbit/s per connection")
+    baseline = None
+    for segments in args.segments:
+        zoom_service.downloader.segments = segments
+        elapsed = time_download(zoom_service, url, size)
+        baseline = baseline or elapsed
+        print(f"segments={segments}: {elapsed:.2f} s, {size / MB / elapsed:.1f} MB/s, "
+              f"{baseline / elapsed:.2f}x")
+
+    server.shutdown()
+    os.rmdir(download_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Offline end-to-end benchmark against local Zoom, Eventbrite and YouTube stand-ins
+
+Starts one stub HTTP server that mimics the endpoints the services call,
+points the app at it, then drives /api/meetings, /api/events and
+process_matches_background at several batch sizes.
+
+    python scripts/benchmark_pipeline.py --batch-sizes 1 5 20 --latency-ms 80 --video-mb 32
+"""
+
+import sys
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MB = 1024 * 1024
+START_DATE = datetime(2024, 3, 1, 15, 0)
+
+class StubWorld:
+    """Synthetic account: users, their recorded meetings and matching events"""
+
+    def __init__(self, args):
+        self.args = args
+        self.block = os.urandom(MB)
+        self.users = [{'id': f'user{i}', 'email': f'host{i}@example.org', 'display_name': f'Host {i}',
+                       'type': 2} for i in range(args.users)]
+        self.meetings = []
+        for i in range(args.meetings):
+            start = START_DATE + timedelta(days=i // 2, hours=(i % 2) * 3)
+            meeting_id = 80000000 + i
+            self.meetings.append({
+                'uuid': f'uuid-{i}==',
+                'id': meeting_id,
+                'host_id': self.users[i % len(self.users)]['id'],
+                'topic': f'Community Meeting {i}',
+                'start_time': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'duration': 60,
+                'recording_files': self.recording_files(meeting_id),
+            })
+        self.lock = threading.Lock()
+        self.request_times = {}
+
+    def recording_files(self, meeting_id):
+        video = self.args.video_mb * MB
+        files = []
+        for variant, size in (('gallery_view', video * 2), ('shared_screen_with_speaker_view', video),
+                              ('audio_only', video // 10)):
+            file_id = f'{meeting_id}-{variant}'
+            files.append({
+                'id': file_id,
+                'file_type': 'M4A' if variant == 'audio_only' else 'MP4',
+                'recording_type': variant,
+                'file_size': size,
+                'status': 'completed',
+                'download_url': f'{self.args.base_url}/zoom/download/{file_id}?size={size}',
+            })
+        return files
+
+    def events_on(self, day):
+        events = []
+        for i, meeting in enumerate(self.meetings):
+            if not meeting['start_time'].startswith(day):
+                continue
+            start = datetime.strptime(meeting['start_time'], '%Y-%m-%dT%H:%M:%SZ')
+            events.append({
+                'id': f'event{i}',
+                'name': {'text': f'Community Meeting {i}'},
+                'start': {'utc': meeting['start_time']},
+                'end': {'utc': (start + timedelta(minutes=60)).strftime('%Y-%m-%dT%H:%M:%SZ')},
+            })
+        return events
+
+    def admit(self, api):
+        """Sliding one-second window per API; False means answer 429"""
+        if not self.args.rate_limit:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            recent = [t for t in self.request_times.get(api, []) if now - t < 1]
+            if len(recent) >= self.args.rate_limit:
+                self.request_times[api] = recent
+                return False
+            recent.append(now)
+            self.request_times[api] = recent
+            return True
+
+def make_handler(world):
+    args = world.args
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def send_json(self, payload, status=200, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def page(self, items, key, query):
+            page_size = min(int(query.get('page_size', ['300'])[0]), args.page_size)
+            offset = int(query.get('next_page_token', ['0'])[0] or 0)
+            next_offset = offset + page_size
+            return {key: items[offset:next_offset],
+                    'next_page_token': str(next_offset) if next_offset < len(items) else ''}
+
+        def read_body(self):
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, MB)))
+
+        def do_POST(self):
+            self.read_body()
+            path = urlparse(self.path).path
+            if path == '/zoom/oauth/token':
+                return self.send_json({'access_token': 'stub-token', 'expires_in': 3600})
+            if path == '/youtube/upload':
+                return self.send_json({'id': uuid.uuid4().hex[:11]})
+            self.send_json({'error': 'not found'}, 404)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            parts = url.path.strip('/').split('/')
+            api = parts[0]
+
+            if api != 'zoom' or parts[1] != 'download':
+                if not world.admit(api):
+                    return self.send_json({'error': 'rate limited'}, 429, {'Retry-After': '1'})
+                time.sleep(args.latency_ms / 1000)
+
+            if url.path == '/zoom/v2/users':
+                return self.send_json(self.page(world.users, 'users', query))
+            if api == 'zoom' and parts[1:3] == ['v2', 'users'] and parts[-1] == 'recordings':
+                user_id = parts[3]
+                start, end = query['from'][0], query['to'][0] + 'T23:59:59Z'
+                meetings = [m for m in world.meetings
+                            if (user_id == 'me' or m['host_id'] == user_id) and start <= m['start_time'] <= end]
+                return self.send_json(self.page(meetings, 'meetings', query))
+            if api == 'zoom' and parts[1:3] == ['v2', 'meetings']:
+                # Recordings are looked up by instance UUID, or by ID for the latest one
+                key = unquote(unquote(parts[3]))
+                meeting_id = next((m['id'] for m in world.meetings if m['uuid'] == key), None) or int(key)
+                return self.send_json({'recording_files': world.recording_files(meeting_id)})
+            if api == 'zoom' and parts[1] == 'download':
+                return self.send_video(int(query['size'][0]))
+            if url.path == '/eventbrite/v3/users/me/organizations/':
+                return self.send_json({'organizations': [{'id': 'org1', 'name': 'Benchmark Org'}]})
+            if api == 'eventbrite' and parts[-1] == 'events':
+                return self.send_json({'events': world.events_on(query['start_date.range_start'][0])})
+            if url.path == '/youtube/search':
+                return self.send_json({'items': []})
+            self.send_json({'error': 'not found'}, 404)
+
+        def send_video(self, size):
+            start, end = 0, size - 1
+            range_header = self.headers.get('Range')
+            if range_header:
+                first, last = range_header.replace('bytes=', '').split('-')
+                start, end = int(first), int(last) if last else size - 1
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(end - start + 1))
+            self.end_headers()
+
+            per_stream = args.per_stream_mbps * MB / 8
+            began = time.perf_counter()
+            offset = start
+            while offset <= end:
+                chunk = world.block[offset % MB:][:min(end + 1 - offset, 256 * 1024)]
+                self.wfile.write(chunk)
+                offset += len(chunk)
+                if per_stream:
+                    ahead = (offset - start) / per_stream - (time.perf_counter() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return StubHandler
+
+def make_youtube_stand_in(app, base_url):
+    """YouTubeService that talks to the stub instead of the Google client"""
+    import requests
+    from services.youtube_service import YouTubeService
+
+    class StubYouTubeService(YouTubeService):
+        def is_authenticated(self):
+            return True
+
+        def get_access_token(self):
+            return 'stub-token'
+
+        def _search_youtube_for_title(self, title, usage=None):
+            response = requests.get(f'{base_url}/youtube/search', params=self.search_params_for_title(title),
+                                    timeout=30)
+            if usage is not None:
+                usage['searches'] = usage.get('searches', 0) + 1
+            return self.match_search_results(title, response.json())
+
+        def upload_video(self, file_path, title, description='', recording_date=None, check_existing=True):
+            with open(file_path, 'rb') as f:
+                response = requests.post(f'{base_url}/youtube/upload', data=f, timeout=300)
+            return {'success': True, 'video_id': response.json()['id']}
+
+    service = StubYouTubeService(app.youtube_service.config, app.bandwidth_limiter, app.api_client)
+    app.youtube_service = service
+    app.async_youtube.youtube_service = service
+    app.async_youtube.SEARCH_URL = f'{base_url}/youtube/search'
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def timed_post(client, path, payload):
+    start = time.perf_counter()
+    response = client.post(path, json=payload)
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return elapsed, response.get_json()
+
+def main():
+    """Run the pipeline benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--meetings', type=int, default=60)
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--page-size', type=int, default=25, help='Largest page the stub returns')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Added to every API response')
+    parser.add_argument('--rate-limit', type=int, default=0, help='Requests per second per API, 0 for none')
+    parser.add_argument('--video-mb', type=int, default=16, help='Size of the selected MP4 variant')
+    parser.add_argument('--per-stream-mbps', type=float, default=0, help='Download cap per connection')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per route per batch size')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    world_dir = tempfile.mkdtemp(prefix='benchmark-pipeline-')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), None)
+    args.base_url = f'http://127.0.0.1:{server.server_port}'
+    world = StubWorld(args)
+    server.RequestHandlerClass = make_handler(world)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # A throwaway app instance wired to the stub
+    os.environ.update({
+        'FLASK_ENV': 'development',
+        'DATABASE_PATH': os.path.join(world_dir, 'app.db'),
+        'DOWNLOAD_FOLDER': os.path.join(world_dir, 'downloads'),
+        'UPLOAD_FOLDER': os.path.join(world_dir, 'uploads'),
+        'CREDENTIALS_FOLDER': os.path.join(world_dir, 'credentials'),
+        'LOG_FILE': os.path.join(world_dir, 'logs', 'app.log'),
+        'ZOOM_API_BASE_URL': f'{args.base_url}/zoom/v2',
+        'ZOOM_OAUTH_URL': f'{args.base_url}/zoom/oauth/token',
+        'EVENTBRITE_API_BASE_URL': f'{args.base_url}/eventbrite/v3',
+    })
+
+    import app_prod
+    app = app_prod.app
+    make_youtube_stand_in(app, args.base_url)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'email': 'benchmark@example.org', 'name': 'Benchmark'}
+
+    last_day = (START_DATE + timedelta(days=args.meetings // 2 + 1)).strftime('%Y-%m-%d')
+    results = []
+    for batch in args.batch_sizes:
+        span = {'start_date': START_DATE.strftime('%Y-%m-%d'), 'end_date': last_day}
+
+        meeting_latencies = []
+        for _ in range(args.repeat):
+            elapsed, body = timed_post(client, '/api/meetings', dict(span, limit=batch))
+            meeting_latencies.append(elapsed)
+        meetings = body['meetings']
+
+        event_latencies = []
+        events = {}
+        for _ in range(args.repeat):
+            for meeting in meetings:
+                elapsed, body = timed_post(client, '/api/events', {
+                    'meeting_date': meeting['start_time'], 'organization_id': 'org1', 'refresh': True
+                })
+                event_latencies.append(elapsed)
+                events.update((event['name']['text'], event) for event in body['events'])
+
+        matches = [{'zoom_meeting': meeting, 'eventbrite_event': events[meeting['topic']]}
+                   for meeting in meetings if meeting['topic'] in events]
+        session_id = f'benchmark-{uuid.uuid4()}'
+        start = time.perf_counter()
+        app_prod.process_matches_background(matches, session_id, app)
+        elapsed = time.perf_counter() - start
+
+        items = app_prod.processing_status[session_id]['items']
+        uploaded = sum(1 for item in items if item['state'] == 'uploaded')
+        moved = uploaded * args.video_mb * MB * 2  # downloaded once, uploaded once
+
+        results.append({
+            'batch_size': batch,
+            'matches': len(matches),
+            'uploaded': uploaded,
+            'matches_per_minute': round(uploaded / elapsed * 60, 1),
+            'bytes_per_second': round(moved / elapsed),
+            'meetings_p95_ms': round(percentile(meeting_latencies, 95) * 1000, 1),
+            'events_p95_ms': round(percentile(event_latencies, 95) * 1000, 1),
+            'events_median_ms': round(statistics.median(event_latencies) * 1000, 1),
+        })
+
+    server.shutdown()
+    shutil.rmtree(world_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.meetings} meetings, {args.latency_ms:g} ms API latency, {args.video_mb} MB videos, "
+          f"rate limit {args.rate_limit or 'none'}")
+    for row in results:
+        print(f"batch={row['batch_size']:>3}: {row['uploaded']}/{row['matches']} uploaded, "
+              f"{row['matches_per_minute']} matches/min, {row['bytes_per_second'] / MB:.1f} MB/s, "
+              f"/api/meetings p95 {row['meetings_p95_ms']} ms, /api/events p95 {row['events_p95_ms']} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark application import and first-request time"""
+
+import sys
+import os
+import json
+import subprocess
+import statistics
+
+# Add the parent directory to the Python path
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Runs in a fresh interpreter so every sample is a cold start
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import app_prod
+imported = time.perf_counter()
+client = app_prod.app.test_client()
+client.get('/health')
+first_request = time.perf_counter()
+heavy = [name for name in ('googleapiclient.discovery', 'google_auth_oauthlib.flow') if name in sys.modules]
+print(json.dumps({
+    'import_seconds': imported - start,
+    'first_request_seconds': first_request - imported,
+    'heavy_modules_loaded': heavy
+}))
+'''
+
+def run_probe():
+    """Start the app in a new interpreter and return its timings"""
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    """Run the startup benchmark"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    
+    # Benchmark against a throwaway development setup unless told otherwise
+    os.environ.setdefault('FLASK_ENV', 'development')
+    
+    samples = [run_probe() for _ in range(runs)]
+    
+    for key in ('import_seconds', 'first_request_seconds'):
+        values = [sample[key] for sample in samples]
+        print(f"{key}: median {statistics.median(values) * 1000:.1f} ms, "
+              f"min {min(values) * 1000:.1f} ms, max {max(values) * 1000:.1f} ms")
+    
+    heavy = samples[-1]['heavy_modules_loaded']
+    print(f"Google client modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+if __name__ == '__main__':
+    main()
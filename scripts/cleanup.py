@@ -3,43 +3,44 @@
 
 import sys
 import os
-from datetime import datetime, timedelta
-from pathlib import Path
 
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def cleanup_old_files(download_folder, days=7):
-    """Clean up old downloaded files"""
-    download_path = Path(download_folder)
-    
-    if not download_path.exists():
-        return 0
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    cleaned_count = 0
-    
-    for file_path in download_path.glob('*.mp4'):
-        if file_path.stat().st_mtime < cutoff_date.timestamp():
-            try:
-                file_path.unlink()
-                cleaned_count += 1
-                print(f"Deleted: {file_path.name}")
-            except Exception as e:
-                print(f"Error deleting {file_path.name}: {e}")
-    
-    return cleaned_count
-
 def main():
     """Run cleanup tasks"""
-    # Simple cleanup without database dependencies for now
-    print("Starting cleanup...")
-    
-    download_folder = os.environ.get('DOWNLOAD_FOLDER', './downloads')
-    files_cleaned = cleanup_old_files(download_folder)
-    print(f"Cleaned up {files_cleaned} old video files")
-    
-    print("Cleanup complete!")
+    try:
+        print("Starting cleanup...")
+
+        # Import after the path is set up
+        from models import db
+        from config import get_config
+        from flask import Flask
+        from services.retention_service import RetentionService
+
+        # Create minimal Flask app for database access
+        app = Flask(__name__)
+        config = get_config()
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = config.DATABASE_URL
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            summary = RetentionService(config).run()
+
+        print(f"Deleted {summary['jobs_deleted']} expired processing jobs")
+        print(f"Removed {summary['uploaded_files_removed']} already uploaded video files")
+        print(f"Removed {summary['orphan_files_removed']} stale or partial files")
+        print(f"Freed {summary['vacuum_pages_freed']} database pages")
+        print("Cleanup complete!")
+
+    except Exception as e:
+        print(f"Error during cleanup: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
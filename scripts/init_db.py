@@ -50,8 +50,8 @@ def main():
         db.init_app(app)
         
         with app.app_context():
-            print("Creating database tables...")
-            db.create_all()
+            print("Creating database tables and default settings...")
+            init_db()
             print("Database initialization complete!")
             
     except Exception as e:
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Concurrent staff-session load test for the web tier against stubbed backends
+
+Each virtual user signs in, lists meetings, looks up events for them,
+starts processing and polls the job until it finishes. By default a
+gunicorn server is started against the benchmark stub; pass --target to
+load an already running server started with the same FLASK_SECRET_KEY
+and its API base URLs pointed at --stub-port.
+
+    python scripts/loadtest.py --scenario full --users 8 --workers 4
+    python scripts/loadtest.py --scenario browse --users 20 --workers 2 --threads 1   # sync workers
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import socket
+import runpy
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import requests
+
+# Add the parent directory to the Python path
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from benchmark_pipeline import StubWorld, make_handler, percentile, START_DATE
+
+SCENARIOS = {
+    # Browsing only: meetings and event lookups
+    'browse': {'process': False},
+    # The full staff flow including processing and status polling
+    'full': {'process': True},
+}
+
+class StepStats:
+    """Client latency, server time and errors per scenario step"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.server_times = defaultdict(list)
+        # Client latency minus server time, only for responses that report it
+        self.queue_times = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.job_seconds = []
+        self.status_misses = 0
+
+    def record(self, step, response, elapsed):
+        server = None
+        for metric in response.headers.get('Server-Timing', '').split(','):
+            name, _, duration = metric.strip().partition(';dur=')
+            if name == 'app' and duration:
+                server = float(duration) / 1000
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if server is not None:
+                self.server_times[step].append(server)
+                self.queue_times[step].append(max(elapsed - server, 0))
+            if response.status_code >= 400:
+                self.errors[step] += 1
+
+def make_session_cookie(secret_key):
+    """Signed Flask session for a signed-in staff member, as Google SSO would leave it"""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    app = Flask('loadtest')
+    app.secret_key = secret_key
+    serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+    return serializer.dumps({'user': {'id': 'loadtest', 'email': 'loadtest@example.org', 'name': 'Load Test'}})
+
+def run_user(user_index, args, base_url, cookie, stats):
+    http = requests.Session()
+    http.cookies.set('session', cookie)
+
+    def call(step, method, path, **kwargs):
+        start = time.perf_counter()
+        response = http.request(method, base_url + path, timeout=args.request_timeout, **kwargs)
+        stats.record(step, response, time.perf_counter() - start)
+        return response
+
+    time.sleep(args.ramp * user_index / max(args.users, 1))
+
+    for _ in range(args.iterations):
+        call('login', 'GET', '/')
+
+        # Each user looks at a different slice of the stub's meetings
+        day = START_DATE.date().toordinal() + (user_index * 3) % max(args.meetings // 2, 1)
+        span = {'start_date': str(START_DATE.date().fromordinal(day)),
+                'end_date': str(START_DATE.date().fromordinal(day + 2)),
+                'limit': args.batch}
+        response = call('meetings', 'POST', '/api/meetings', json=span)
+        meetings = response.json().get('meetings', []) if response.ok else []
+
+        events = {}
+        for meeting in meetings:
+            response = call('events', 'POST', '/api/events',
+                            json={'meeting_date': meeting['start_time'], 'organization_id': 'org1'})
+            if response.ok:
+                events.update((event['name']['text'], event) for event in response.json().get('events', []))
+
+        if not SCENARIOS[args.scenario]['process']:
+            continue
+
+        matches = [{'zoom_meeting': meeting, 'eventbrite_event': events[meeting['topic']]}
+                   for meeting in meetings if meeting['topic'] in events]
+        if not matches:
+            continue
+        response = call('process', 'POST', '/api/process_matches', json={'matches': matches})
+        if not response.ok:
+            continue
+
+        session_id = response.json()['session_id']
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.job_timeout:
+            time.sleep(args.poll_interval)
+            status = call('poll', 'GET', f'/api/processing_status/{session_id}').json().get('status')
+            if status == 'not_found':
+                with stats.lock:
+                    stats.status_misses += 1
+            elif status in ('completed', 'error'):
+                with stats.lock:
+                    stats.job_seconds.append(time.perf_counter() - started)
+                break
+
+def deployed_threads():
+    """Threads per worker that gunicorn.conf.py configures for production"""
+    return runpy.run_path(os.path.join(APP_DIR, 'gunicorn.conf.py')).get('threads', 1)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_gunicorn(args, env):
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(args.workers), '--timeout', str(args.worker_timeout)]
+    if args.threads > 1:
+        command += ['--worker-class', 'gthread', '--threads', str(args.threads)]
+    else:
+        # gunicorn.conf.py defaults to gthread; --threads 1 measures plain sync workers
+        command += ['--worker-class', 'sync']
+    process = subprocess.Popen(command + ['app_prod:app'], cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(base_url + '/health', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                raise SystemExit('gunicorn exited during startup')
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit('gunicorn did not start within 60 s')
+
+def report(args, stats, wall):
+    capacity = args.workers * args.threads
+    busy = sum(sum(times) for times in stats.server_times.values())
+    rows = {}
+    for step, latencies in stats.latencies.items():
+        server = stats.server_times.get(step, [])
+        queued = stats.queue_times.get(step, [])
+        rows[step] = {
+            'requests': len(latencies),
+            'errors': stats.errors.get(step, 0),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'server_p95_ms': round(percentile(server, 95) * 1000, 1) if server else None,
+            'queue_p95_ms': round(percentile(queued, 95) * 1000, 1) if queued else None,
+        }
+    return {
+        'scenario': args.scenario,
+        'users': args.users,
+        'workers': args.workers,
+        'threads': args.threads,
+        'wall_seconds': round(wall, 2),
+        # Share of worker capacity spent inside the app; near 1.0 means requests queue
+        'worker_saturation': round(busy / (wall * capacity), 3) if capacity else None,
+        'requests_per_second': round(sum(len(l) for l in stats.latencies.values()) / wall, 2),
+        'jobs_completed': len(stats.job_seconds),
+        'job_p95_seconds': round(percentile(stats.job_seconds, 95), 2) if stats.job_seconds else None,
+        'status_misses': stats.status_misses,
+        'steps': rows,
+    }
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='full')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent staff sessions')
+    parser.add_argument('--iterations', type=int, default=1, help='Flows per user')
+    parser.add_argument('--ramp', type=float, default=0, help='Seconds over which users start')
+    parser.add_argument('--batch', type=int, default=3, help='Meetings per user flow')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=deployed_threads(),
+                        help='Threads per worker (gthread when > 1), by default as in gunicorn.conf.py')
+    parser.add_argument('--worker-timeout', type=int, default=300)
+    parser.add_argument('--target', help='Base URL of a running server instead of starting gunicorn')
+    parser.add_argument('--stub-port', type=int, default=0, help='Port for the stub APIs, 0 for any free port')
+    parser.add_argument('--secret-key', default=os.environ.get('FLASK_SECRET_KEY', 'loadtest-secret'))
+    parser.add_argument('--meetings', type=int, default=60)
+    parser.add_argument('--users-in-account', type=int, default=3)
+    parser.add_argument('--page-size', type=int, default=25)
+    parser.add_argument('--latency-ms', type=float, default=150, help='Stub API latency')
+    parser.add_argument('--rate-limit', type=int, default=0, help='Stub requests per second per API')
+    parser.add_argument('--video-mb', type=int, default=8)
+    parser.add_argument('--per-stream-mbps', type=float, default=0)
+    parser.add_argument('--poll-interval', type=float, default=1)
+    parser.add_argument('--job-timeout', type=float, default=600)
+    parser.add_argument('--request-timeout', type=float, default=330)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    # StubWorld's own option names
+    stub_args = argparse.Namespace(**vars(args))
+    stub_args.users = args.users_in_account
+
+    work_dir = tempfile.mkdtemp(prefix='loadtest-')
+    stub = ThreadingHTTPServer(('127.0.0.1', args.stub_port), None)
+    stub_args.base_url = f'http://127.0.0.1:{stub.server_port}'
+    stub.RequestHandlerClass = make_handler(StubWorld(stub_args))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    server = None
+    base_url = args.target
+    if not base_url:
+        env = dict(os.environ, **{
+            'FLASK_ENV': 'development',
+            'FLASK_SECRET_KEY': args.secret_key,
+            'DATABASE_PATH': os.path.join(work_dir, 'app.db'),
+            'DOWNLOAD_FOLDER': os.path.join(work_dir, 'downloads'),
+            'UPLOAD_FOLDER': os.path.join(work_dir, 'uploads'),
+            'CREDENTIALS_FOLDER': os.path.join(work_dir, 'credentials'),
+            'LOG_FILE': os.path.join(work_dir, 'logs', 'app.log'),
+            'ZOOM_API_BASE_URL': f'{stub_args.base_url}/zoom/v2',
+            'ZOOM_OAUTH_URL': f'{stub_args.base_url}/zoom/oauth/token',
+            'EVENTBRITE_API_BASE_URL': f'{stub_args.base_url}/eventbrite/v3',
+        })
+        server, base_url = start_gunicorn(args, env)
+
+    stats = StepStats()
+    cookie = make_session_cookie(args.secret_key)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            for future in [pool.submit(run_user, i, args, base_url, cookie, stats) for i in range(args.users)]:
+                future.result()
+    finally:
+        wall = time.perf_counter() - start
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        stub.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = report(args, stats, wall)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['scenario']}: {args.users} users, {args.workers} workers x {args.threads} threads, "
+          f"{results['wall_seconds']} s, {results['requests_per_second']} req/s, "
+          f"saturation {results['worker_saturation']}")
+    for step, row in results['steps'].items():
+        print(f"  {step:<9} n={row['requests']:<4} err={row['errors']:<3} p50 {row['p50_ms']} ms  "
+              f"p95 {row['p95_ms']} ms  p99 {row['p99_ms']} ms  server p95 {row['server_p95_ms']} ms  "
+              f"queue p95 {row['queue_p95_ms']} ms")
+    if SCENARIOS[args.scenario]['process']:
+        print(f"  jobs completed {results['jobs_completed']}, p95 {results['job_p95_seconds']} s, "
+              f"status polls that found no job: {results['status_misses']}")
+
+if __name__ == '__main__':
+    main()
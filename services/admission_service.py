@@ -0,0 +1,157 @@
+# services/admission_service.py - Disk and size admission control for downloads
+import os
+import time
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from models import SystemSettings
+from services.retention_service import PARTIAL_SUFFIX, RESERVATION_SUFFIX
+from utils.exceptions import VideoTooLargeError, InsufficientDiskSpaceError
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE_NAME = '.admission.lock'
+
+MB = 1024 * 1024
+
+class DownloadAdmissionService:
+    """Reserve disk space for a recording before downloading it.
+
+    A reservation is a small marker file next to the download, so every
+    gunicorn worker sees the same budget. Space still owed to a reservation
+    is its size minus what its partial file has already written.
+    """
+
+    def __init__(self, config, poll_seconds: float = 10):
+        self.config = config
+        self.poll_seconds = poll_seconds
+
+    def max_video_bytes(self) -> int:
+        return SystemSettings.get_value('max_video_size_mb', 500) * MB
+
+    def headroom_bytes(self) -> int:
+        return SystemSettings.get_value('download_disk_headroom_mb', 1024) * MB
+
+    def wait_seconds(self) -> int:
+        return SystemSettings.get_value('download_admission_wait_minutes', 30) * 60
+
+    @staticmethod
+    def file_name(recording_file: Dict, job_id: Optional[str] = None) -> str:
+        """Download file name used by ZoomService.download_video"""
+        file_extension = recording_file.get('file_type', 'mp4').lower()
+        file_id = recording_file.get('id', 'temp')
+        if job_id:
+            return f"zoom_video_{job_id}_{file_id}.{file_extension}"
+        return f"zoom_video_{file_id}.{file_extension}"
+
+    def outstanding_bytes(self) -> int:
+        """Reserved bytes that downloads in progress have not written yet"""
+        download_dir = self.config.DOWNLOAD_FOLDER
+        outstanding = 0
+        with os.scandir(download_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(RESERVATION_SUFFIX):
+                    continue
+                try:
+                    with open(entry.path) as f:
+                        reserved = int(f.read().strip() or 0)
+                    partial = os.path.join(download_dir, entry.name[:-len(RESERVATION_SUFFIX)] + PARTIAL_SUFFIX)
+                    written = os.path.getsize(partial) if os.path.exists(partial) else 0
+                except (OSError, ValueError):
+                    continue
+                outstanding += max(reserved - written, 0)
+        return outstanding
+
+    def available_bytes(self) -> int:
+        """Free space left for new downloads after reservations and headroom"""
+        free = shutil.disk_usage(self.config.DOWNLOAD_FOLDER).free
+        return free - self.outstanding_bytes() - self.headroom_bytes()
+
+    def downloaded_bytes(self) -> int:
+        """Bytes held by downloads, finished or partial, that are released after upload"""
+        total = 0
+        with os.scandir(self.config.DOWNLOAD_FOLDER) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+        return total
+
+    def can_ever_fit(self, size: int) -> bool:
+        """Whether ``size`` fits once every download in the folder has been released"""
+        usage = shutil.disk_usage(self.config.DOWNLOAD_FOLDER)
+        headroom = self.headroom_bytes()
+        if size > usage.total - headroom:
+            return False
+        # Space used by anything other than our downloads is not coming back
+        return size <= usage.free + self.downloaded_bytes() - headroom
+
+    @contextmanager
+    def _budget_lock(self):
+        with open(os.path.join(self.config.DOWNLOAD_FOLDER, LOCK_FILE_NAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _try_reserve(self, reservation_path: str, size: int) -> bool:
+        with self._budget_lock():
+            if self.available_bytes() < size:
+                return False
+            with open(reservation_path, 'w') as f:
+                f.write(str(size))
+            return True
+
+    @contextmanager
+    def admit(self, recording_file: Dict, job_id: Optional[str] = None):
+        """Hold a disk reservation for one recording while it downloads.
+
+        The reservation is keyed by ``job_id`` and file, like the download,
+        so jobs fetching the same recording do not share one. Raises VideoTooLargeError for files over max_video_size_mb and
+        InsufficientDiskSpaceError at once if the file could not fit even
+        after every download is released, or if no budget frees up within
+        download_admission_wait_minutes.
+        """
+        size = int(recording_file.get('file_size') or 0)
+        name = self.file_name(recording_file, job_id)
+
+        if size > self.max_video_bytes():
+            raise VideoTooLargeError(
+                f"{name} is {size // MB} MB, over the {self.max_video_bytes() // MB} MB limit"
+            )
+
+        if not self.can_ever_fit(size):
+            raise InsufficientDiskSpaceError(
+                f"{name} ({size // MB} MB) cannot fit on this disk even after other downloads are released"
+            )
+
+        reservation_path = os.path.join(self.config.DOWNLOAD_FOLDER, name + RESERVATION_SUFFIX)
+        deadline = time.monotonic() + self.wait_seconds()
+        logged_wait = False
+
+        # Queue until other downloads finish or uploaded files are released
+        while not self._try_reserve(reservation_path, size):
+            if time.monotonic() >= deadline:
+                raise InsufficientDiskSpaceError(
+                    f"Not enough disk space to download {name} ({size // MB} MB)"
+                )
+            if not logged_wait:
+                logger.info("Waiting for disk space to download %s (%d MB)", name, size // MB)
+                logged_wait = True
+            time.sleep(self.poll_seconds)
+
+        try:
+            yield
+        finally:
+            try:
+                os.unlink(reservation_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,336 @@
+# services/async_services.py - Async fan-out for Zoom, Eventbrite and YouTube calls
+import os
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from utils.metrics import metrics
+from utils.exceptions import ZoomError, CircuitOpenError
+from services.retry_service import RETRYABLE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+class AsyncRunner:
+    """One background event loop and pooled HTTP client per process.
+
+    Flask routes stay synchronous and call ``run()``, which blocks until the
+    coroutine finishes on the shared loop. The loop is recreated after a
+    fork, so the runner is safe to build before gunicorn forks workers.
+    """
+
+    def __init__(self, max_connections: int = 50, timeout: float = 30):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._pid = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-services')
+            thread.daemon = True
+            thread.start()
+
+            self._loop = loop
+            self._pid = os.getpid()
+            self._client = None
+            self._semaphores = {}
+            self._flights = {}
+            return loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop and wait for its result"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared connection pool; only use from coroutines on the runner's loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    def semaphore(self, name: str, limit: int) -> asyncio.Semaphore:
+        """Per-API concurrency limit shared by every caller in this process"""
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(limit)
+        return self._semaphores[name]
+
+    async def coalesce(self, name: str, key: str, make_call: Callable[[], Awaitable]):
+        """Await ``make_call()``, sharing one call among coroutines asking for the same key.
+
+        Every request thread's coroutines run on this loop, so identical
+        lookups from concurrent requests in this process go out once.
+        The result is shared; callers must not mutate it.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(make_call())
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            metrics.inc('singleflight_shared_total', flight=name, scope='process')
+        # One caller timing out or being cancelled must not cancel the others' call
+        return await asyncio.shield(flight)
+
+class AsyncZoomService:
+    """Concurrent variants of ZoomService calls"""
+
+    def __init__(self, zoom_service, runner: AsyncRunner, concurrency: int = 10):
+        self.zoom_service = zoom_service
+        self.runner = runner
+        self.concurrency = concurrency
+
+    async def _get(self, url: str, access_token: str, operation: str, params: Optional[Dict] = None,
+                   timeout: float = 30) -> Optional[Dict]:
+        """JSON body of a Zoom GET, None on failure; raises ZoomError once rate limits outlast the retries"""
+        # The request rate is paced by the shared limiter in ApiClient, across workers
+        async with self.runner.semaphore('zoom', self.concurrency):
+            response = await self.zoom_service.api_client.arequest(
+                self.runner.client, 'zoom', operation, 'GET', url,
+                headers={'Authorization': f'Bearer {access_token}'}, params=params, timeout=timeout
+            )
+        if response.status_code == 200:
+            return response.json()
+        logger.error(f"Zoom API error for {url}: {response.status_code} - {response.text}")
+        if response.status_code in RETRYABLE_STATUSES:
+            raise ZoomError(f"Zoom unavailable: {response.status_code}")
+        return None
+
+    async def fetch_recording_files(self, access_token: str, meeting_id: str) -> List[Dict]:
+        """Get recording files for a specific meeting"""
+        try:
+            data = await self._get(self.zoom_service.recording_files_url(meeting_id), access_token, 'recording_files')
+            return data.get('recording_files', []) if data else []
+        except Exception as e:
+            logger.error(f"Exception getting recording files for {meeting_id}: {str(e)}")
+            return []
+
+    async def fetch_recording_files_many(self, access_token: str,
+                                         meeting_ids: Iterable[str]) -> Dict[str, List[Dict]]:
+        meeting_ids = list(meeting_ids)
+        results = await asyncio.gather(
+            *(self.fetch_recording_files(access_token, meeting_id) for meeting_id in meeting_ids)
+        )
+        return dict(zip(meeting_ids, results))
+
+    def get_recording_files_many(self, access_token: str, meeting_ids: Iterable[str]) -> Dict[str, List[Dict]]:
+        """Get recording files for many meetings at once, keyed by meeting ID"""
+        return self.runner.run(self.fetch_recording_files_many(access_token, meeting_ids))
+
+    async def _fetch_window(self, access_token: str, recordings_url: str,
+                            from_date: str, to_date: str) -> List[Dict]:
+        """All meetings with recordings in one window, following Zoom's pages"""
+        meetings = []
+        page_token = None
+        while True:
+            params = {'from': from_date, 'to': to_date, 'page_size': 300}
+            if page_token:
+                params['next_page_token'] = page_token
+
+            data = await self._get(recordings_url, access_token, 'recordings', params=params, timeout=60)
+            if data is None:
+                logger.warning("API error for chunk %s-%s", from_date, to_date)
+                return meetings
+
+            meetings.extend(self.zoom_service.format_recording(meeting)
+                            for meeting in data.get('meetings', []) if meeting.get('recording_files'))
+            page_token = data.get('next_page_token')
+            if not page_token:
+                return meetings
+
+    async def fetch_recordings(self, access_token: str, start_date: str, end_date: str,
+                               user_id: str = 'me') -> List[Dict]:
+        """Fetch every 30-day window of a range concurrently"""
+        try:
+            recordings_url = self.zoom_service.recordings_url(user_id)
+            windows = self.zoom_service.date_windows(start_date, end_date)
+            results = await asyncio.gather(
+                *(self._fetch_window(access_token, recordings_url, from_date, to_date)
+                  for from_date, to_date in windows)
+            )
+            return [meeting for window in results for meeting in window]
+        except (ZoomError, CircuitOpenError):
+            # A missing window must not pass for an empty one
+            raise
+        except Exception as e:
+            logger.error(f"Exception getting recordings: {str(e)}")
+            return []
+
+    def get_recordings(self, access_token: str, start_date: str, end_date: str,
+                       user_id: str = 'me') -> List[Dict]:
+        """Get recordings for a date range with all windows in flight at once"""
+        recordings = self.runner.run(self.fetch_recordings(access_token, start_date, end_date, user_id))
+        logger.info("Retrieved %d meetings with recordings", len(recordings))
+        return recordings
+
+    async def fetch_users(self, access_token: str) -> List[Dict]:
+        """Every active user in the account, following Zoom's pages"""
+        users = []
+        params = {'status': 'active', 'page_size': 300}
+        while True:
+            data = await self._get(f'{self.zoom_service.base_url}/users', access_token, 'users', params=params)
+            if data is None:
+                return users
+            users.extend(self.zoom_service.format_user(user) for user in data.get('users', []))
+            if not data.get('next_page_token'):
+                return users
+            params = dict(params, next_page_token=data['next_page_token'])
+
+    async def harvest_recordings(self, access_token: str, start_date: str, end_date: str) -> List[Dict]:
+        """Recordings of every user in the account, fetched concurrently and de-duplicated"""
+        users = await self.fetch_users(access_token)
+        results = await asyncio.gather(
+            *(self.fetch_recordings(access_token, start_date, end_date, user['id']) for user in users)
+        )
+
+        recordings = {}
+        for meeting in (meeting for user_meetings in results for meeting in user_meetings):
+            # A meeting instance shows up once per host that can see it
+            key = meeting.get('uuid') or (meeting.get('id'), meeting.get('start_time'))
+            recordings.setdefault(key, meeting)
+
+        merged = sorted(recordings.values(), key=lambda meeting: meeting.get('start_time') or '')
+        logger.info("Harvested %d meetings with recordings from %d users", len(merged), len(users))
+        return merged
+
+    def harvest_account(self, access_token: str, start_date: str, end_date: str) -> List[Dict]:
+        """Get recordings across all users in the account in one call"""
+        return self.runner.run(self.harvest_recordings(access_token, start_date, end_date))
+
+class AsyncEventbriteService:
+    """Concurrent variants of EventbriteService calls"""
+
+    def __init__(self, eventbrite_service, runner: AsyncRunner, concurrency: int = 5):
+        self.eventbrite_service = eventbrite_service
+        self.runner = runner
+        self.concurrency = concurrency
+
+    async def fetch_events_by_date(self, organization_id: str, event_date: date) -> Optional[List[Dict]]:
+        """Fetch events for a date from the Eventbrite API, None on failure"""
+        return await self.runner.coalesce(
+            'eventbrite_events', f'eventbrite:events:{organization_id}:{event_date}',
+            lambda: self._fetch_events_by_date(organization_id, event_date)
+        )
+
+    async def _fetch_events_by_date(self, organization_id: str, event_date: date) -> Optional[List[Dict]]:
+        service = self.eventbrite_service
+        try:
+            async with self.runner.semaphore('eventbrite', self.concurrency):
+                response = await service.api_client.arequest(
+                    self.runner.client, 'eventbrite', 'events', 'GET',
+                    f'{service.base_url}/organizations/{organization_id}/events/',
+                    headers={'Authorization': f'Bearer {service.private_token}'},
+                    params=service.event_search_params(event_date)
+                )
+            if response.status_code == 200:
+                return response.json().get('events', [])
+            logger.error(f"Failed to get events: {response.status_code} - {response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"Exception getting events: {str(e)}")
+            return None
+
+    def get_events_for_dates(self, organization_id: str, dates: Iterable[date]) -> Dict[date, List[Dict]]:
+        """Get events for many days, serving cached days and fetching the rest concurrently"""
+        service = self.eventbrite_service
+        results = {}
+        missing = []
+        for event_date in sorted(set(dates)):
+            cached = service._get_cached_events(organization_id, event_date)
+            metrics.cache_lookup('eventbrite_events', cached is not None)
+            if cached is None:
+                missing.append(event_date)
+            else:
+                results[event_date] = cached
+
+        async def fetch_all():
+            return await asyncio.gather(*(self.fetch_events_by_date(organization_id, d) for d in missing))
+
+        # Cache writes happen here, in the calling thread, which owns the DB session
+        for event_date, events in zip(missing, self.runner.run(fetch_all()) if missing else []):
+            if events is None:
+                results[event_date] = []
+                continue
+            service._cache_events(organization_id, event_date, events)
+            results[event_date] = events
+
+        return results
+
+class AsyncYouTubeService:
+    """Concurrent variants of YouTubeService lookups"""
+
+    SEARCH_URL = 'https://www.googleapis.com/youtube/v3/search'
+
+    def __init__(self, youtube_service, runner: AsyncRunner, concurrency: int = 5):
+        self.youtube_service = youtube_service
+        self.runner = runner
+        self.concurrency = concurrency
+
+    async def search_title(self, access_token: str, title: str) -> Optional[Dict]:
+        """Raw YouTube search response for a title, None on failure"""
+        # Each search costs quota, and staff looking at the same day search the same titles
+        return await self.runner.coalesce(
+            'youtube_search', f'youtube:search:{title}', lambda: self._search_title(access_token, title)
+        )
+
+    async def _search_title(self, access_token: str, title: str) -> Optional[Dict]:
+        try:
+            async with self.runner.semaphore('youtube', self.concurrency):
+                response = await self.youtube_service.api_client.arequest(
+                    self.runner.client, 'youtube', 'search', 'GET', self.SEARCH_URL,
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    params=self.youtube_service.search_params_for_title(title)
+                )
+            if response.status_code == 200:
+                return response.json()
+            logger.error(f"Error searching YouTube: {response.status_code} - {response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"Error searching YouTube: {str(e)}")
+            return None
+
+    def check_existing_videos(self, titles: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Check many titles at once; cached titles never leave the process"""
+        service = self.youtube_service
+        titles = list(dict.fromkeys(titles))
+        if not service.config.CHECK_EXISTING_VIDEOS:
+            return {title: None for title in titles}
+
+        results = {}
+        missing = []
+        for title in titles:
+            cached = service._get_cached_video(title)
+            metrics.cache_lookup('youtube_title', bool(cached))
+            if cached:
+                results[title] = cached
+            else:
+                missing.append(title)
+
+        access_token = service.get_access_token() if missing else None
+        if not access_token:
+            results.update({title: None for title in missing})
+            return results
+
+        async def search_all():
+            return await asyncio.gather(*(self.search_title(access_token, title) for title in missing))
+
+        logger.info("Searching YouTube for %d titles concurrently", len(missing))
+        for title, search_response in zip(missing, self.runner.run(search_all())):
+            results[title] = service.match_search_results(title, search_response) if search_response else None
+
+        return results
@@ -0,0 +1,125 @@
+# services/bandwidth_service.py - Shared bandwidth limits for transfers
+import os
+import time
+import fcntl
+import struct
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models import SystemSettings
+
+logger = logging.getLogger(__name__)
+
+INGRESS = 'ingress'
+EGRESS = 'egress'
+
+# Bucket state: tokens available and the time they were counted
+BUCKET_STATE = struct.Struct('dd')
+
+MBIT = 1000 * 1000 / 8
+
+class BandwidthLimiter:
+    """Token buckets for Zoom downloads (ingress) and YouTube uploads (egress).
+
+    Bucket state lives in small files under an flock, so every thread and
+    gunicorn worker draws from the same budget. Rates come from the
+    bandwidth_* settings and the first matching time-of-day profile; a
+    rate of 0 means unlimited.
+    """
+
+    def __init__(self, config, burst_seconds: float = 1.0, refresh_seconds: float = 60):
+        self.config = config
+        self.burst_seconds = burst_seconds
+        self.refresh_seconds = refresh_seconds
+        self._rates = {INGRESS: 0.0, EGRESS: 0.0}
+        self._rates_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_rates(profiles: List[Dict], now: datetime) -> Optional[Dict]:
+        """Mbit/s limits of the first profile covering ``now``.
+
+        Profiles look like ``{"start": "09:00", "end": "18:00",
+        "ingress_mbps": 50, "egress_mbps": 20}`` with optional ``days``
+        (0 = Monday); windows may wrap past midnight.
+        """
+        clock = now.strftime('%H:%M')
+        for profile in profiles:
+            days = profile.get('days')
+            if days is not None and now.weekday() not in days:
+                continue
+            start, end = profile.get('start', '00:00'), profile.get('end', '24:00')
+            inside = start <= clock < end if start <= end else (clock >= start or clock < end)
+            if inside:
+                return profile
+        return None
+
+    def _load_rates(self) -> Dict[str, float]:
+        """Current limits in bytes/second from the settings table"""
+        rates = {
+            INGRESS: SystemSettings.get_value('bandwidth_ingress_mbps', 0),
+            EGRESS: SystemSettings.get_value('bandwidth_egress_mbps', 0),
+        }
+        profile = self.profile_rates(SystemSettings.get_value('bandwidth_profiles', []) or [], datetime.now())
+        if profile:
+            rates[INGRESS] = profile.get('ingress_mbps', rates[INGRESS])
+            rates[EGRESS] = profile.get('egress_mbps', rates[EGRESS])
+        return {direction: float(mbps or 0) * MBIT for direction, mbps in rates.items()}
+
+    def rate(self, direction: str) -> float:
+        """Bytes/second allowed in ``direction``, re-read from settings once a minute"""
+        with self._lock:
+            if time.monotonic() - self._rates_at >= self.refresh_seconds:
+                try:
+                    self._rates = self._load_rates()
+                    self._rates_at = time.monotonic()
+                except Exception as e:
+                    # Transfer threads have no app context; keep the last known limits
+                    # until the next refresh instead of failing on every chunk
+                    self._rates_at = time.monotonic()
+                    logger.debug("Keeping cached bandwidth limits: %s", e)
+            return self._rates[direction]
+
+    def is_limited(self, direction: str) -> bool:
+        return self.rate(direction) > 0
+
+    def _state_path(self, direction: str) -> str:
+        return os.path.join(self.config.DOWNLOAD_FOLDER, f'.bandwidth-{direction}')
+
+    def _take(self, direction: str, nbytes: int, rate: float) -> float:
+        """Spend ``nbytes`` tokens and return how long to wait for any deficit"""
+        capacity = rate * self.burst_seconds
+        with open(self._state_path(direction), 'a+b') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                data = state_file.read(BUCKET_STATE.size)
+                now = time.time()
+                tokens, counted_at = BUCKET_STATE.unpack(data) if len(data) == BUCKET_STATE.size else (capacity, now)
+
+                tokens = min(capacity, tokens + (now - counted_at) * rate) - nbytes
+
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(BUCKET_STATE.pack(tokens, now))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+        # Debt is paid back by sleeping, so a large chunk delays only its own sender
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def throttle(self, direction: str, nbytes: int):
+        """Block until ``nbytes`` may be sent or received in ``direction``"""
+        rate = self.rate(direction)
+        if rate <= 0 or nbytes <= 0:
+            return
+        try:
+            delay = self._take(direction, nbytes, rate)
+        except OSError as e:
+            logger.error(f"Bandwidth limiter unavailable, not throttling: {str(e)}")
+            return
+        if delay:
+            time.sleep(delay)
@@ -0,0 +1,173 @@
+# services/cache_service.py - Shared API response cache
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from models import db, ApiResponseCache, SystemSettings
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedResponse:
+    """A serialized response body with its strong ETag"""
+    body: str
+    etag: str
+    fetched_at: datetime
+    expires_at: datetime
+
+    @property
+    def is_fresh(self) -> bool:
+        return datetime.utcnow() < self.expires_at
+
+    def is_servable(self, stale_for: timedelta) -> bool:
+        """Whether a stale entry may still be served while it refreshes"""
+        return datetime.utcnow() < self.expires_at + stale_for
+
+class ResponseCacheService:
+    """Two-level (process memory, then SQLite) cache for slow-changing API responses"""
+
+    def __init__(self, config, single_flight: Optional[SingleFlight] = None):
+        self.config = config
+        self.single_flight = single_flight or SingleFlight(config)
+        self._memory: Dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def ttl(self) -> timedelta:
+        return timedelta(minutes=SystemSettings.get_value('api_cache_minutes', 60))
+
+    def stale_window(self) -> timedelta:
+        return timedelta(hours=SystemSettings.get_value('api_cache_stale_hours', 168))
+
+    @staticmethod
+    def make_etag(body: str) -> str:
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up a cached response in memory, then in the database"""
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry and entry.is_fresh:
+            return entry
+
+        return self._read_stored(key) or entry
+
+    def _read_stored(self, key: str, fetched_since: Optional[datetime] = None) -> Optional[CachedResponse]:
+        """Load a response from the database into memory, if stored at or after ``fetched_since``"""
+        try:
+            row = ApiResponseCache.query.filter_by(cache_key=key).first()
+        except Exception as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+
+        if not row or (fetched_since and row.fetched_at < fetched_since):
+            return None
+
+        entry = CachedResponse(row.body, row.etag, row.fetched_at, row.expires_at)
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def set(self, key: str, payload) -> CachedResponse:
+        """Serialize and store a payload under ``key``"""
+        body = json.dumps(payload, sort_keys=True, default=str)
+        now = datetime.utcnow()
+        entry = CachedResponse(body, self.make_etag(body), now, now + self.ttl())
+
+        with self._lock:
+            self._memory[key] = entry
+
+        try:
+            row = ApiResponseCache.query.filter_by(cache_key=key).first()
+            if not row:
+                row = ApiResponseCache(cache_key=key)
+                db.session.add(row)
+            row.body = entry.body
+            row.etag = entry.etag
+            row.fetched_at = entry.fetched_at
+            row.expires_at = entry.expires_at
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error writing response cache: {str(e)}")
+            db.session.rollback()
+
+        return entry
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Drop one cached response, or all of them"""
+        with self._lock:
+            if key:
+                self._memory.pop(key, None)
+            else:
+                self._memory.clear()
+
+        try:
+            query = ApiResponseCache.query
+            if key:
+                query = query.filter_by(cache_key=key)
+            deleted = query.delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f"Error invalidating response cache: {str(e)}")
+            db.session.rollback()
+            return 0
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[object]], app,
+                    force_refresh: bool = False) -> Optional[CachedResponse]:
+        """Return a cached response, loading it with ``loader`` when needed.
+
+        ``loader`` returns the payload or None on failure; failures are not
+        cached. A stale entry inside the stale window is served immediately
+        and refreshed in a background thread.
+        """
+        entry = None if force_refresh else self.get(key)
+
+        if entry and entry.is_fresh:
+            return entry
+
+        if entry and entry.is_servable(self.stale_window()):
+            self._refresh_in_background(key, loader, app)
+            return entry
+
+        return self._load(key, loader) or entry
+
+    def _load(self, key: str, loader: Callable[[], Optional[object]]) -> Optional[CachedResponse]:
+        """Call ``loader`` and store its payload, once for every concurrent caller of ``key``
+
+        A worker that waited on another worker's load picks its result up from the database.
+        """
+        started = datetime.utcnow()
+
+        def load():
+            payload = loader()
+            return self.set(key, payload) if payload is not None else None
+
+        return self.single_flight.do('response_cache', f'response:{key}', load,
+                                     lambda: self._read_stored(key, fetched_since=started))
+
+    def _refresh_in_background(self, key: str, loader: Callable, app):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with app.app_context():
+                    if self._load(key, loader):
+                        logger.info("Refreshed cached response: %s", key)
+            except Exception as e:
+                logger.error(f"Error refreshing cached response {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        thread = threading.Thread(target=refresh)
+        thread.daemon = True
+        thread.start()
@@ -0,0 +1,144 @@
+# services/circuit_breaker.py - Fail fast while Zoom, Eventbrite or YouTube is down
+import os
+import time
+import fcntl
+import struct
+import logging
+from typing import Dict, Iterable
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEPENDENCIES = ('zoom', 'eventbrite', 'youtube')
+
+_STATE_CODES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+_STATE_NAMES = {code: name for name, code in _STATE_CODES.items()}
+
+# Breaker state: state code, consecutive failures, when it opened, when the current probe started
+BREAKER_STATE = struct.Struct('iidd')
+
+class CircuitBreakers:
+    """One breaker per upstream API, shared by every thread and gunicorn worker.
+
+    After ``failure_threshold`` consecutive failed calls a breaker opens and
+    calls fail immediately instead of waiting out their timeouts. After
+    ``reset_seconds`` one caller is let through as a probe (half-open); its
+    success closes the breaker and its failure opens it again. State lives
+    in small files under an flock, like the rate-limit buckets.
+    """
+
+    def __init__(self, config, failure_threshold: int = 5, reset_seconds: float = 30,
+                 probe_timeout: float = 120):
+        self.config = config
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        # A probe that never reported back (worker killed) is replaced after this long
+        self.probe_timeout = probe_timeout
+
+    def _state_path(self, api: str) -> str:
+        return os.path.join(self.config.DOWNLOAD_FOLDER, f'.circuit-{api}')
+
+    def _transition(self, api: str, change):
+        """Apply ``change(state, failures, opened_at, probe_at, now)`` under the lock"""
+        with open(self._state_path(api), 'a+b') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                data = state_file.read(BREAKER_STATE.size)
+                now = time.time()
+                if len(data) == BREAKER_STATE.size:
+                    code, failures, opened_at, probe_at = BREAKER_STATE.unpack(data)
+                    before = (_STATE_NAMES.get(code, CLOSED), failures, opened_at, probe_at)
+                else:
+                    before = (CLOSED, 0, 0.0, 0.0)
+
+                result, after = change(*before, now)
+                if after != before:
+                    state_file.seek(0)
+                    state_file.truncate()
+                    state_file.write(BREAKER_STATE.pack(_STATE_CODES[after[0]], *after[1:]))
+                    state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+        if after[0] != before[0]:
+            logger.warning("Circuit for %s is now %s", api, after[0])
+            metrics.inc('circuit_transitions_total', api=api, state=after[0])
+        return result
+
+    def allow(self, api: str) -> bool:
+        """Whether a call to ``api`` may go out now; may make this caller the half-open probe"""
+        def change(state, failures, opened_at, probe_at, now):
+            if state == CLOSED:
+                return True, (state, failures, opened_at, probe_at)
+            probe_due = now - opened_at >= self.reset_seconds if state == OPEN else now - probe_at >= self.probe_timeout
+            if probe_due:
+                return True, (HALF_OPEN, failures, opened_at, now)
+            return False, (state, failures, opened_at, probe_at)
+
+        try:
+            allowed = self._transition(api, change)
+        except OSError as e:
+            logger.error(f"Circuit breaker unavailable, allowing call: {str(e)}")
+            return True
+        if not allowed:
+            metrics.inc('circuit_rejections_total', api=api)
+        return allowed
+
+    def record_success(self, api: str):
+        def change(state, failures, opened_at, probe_at, now):
+            return None, (CLOSED, 0, 0.0, 0.0)
+
+        try:
+            self._transition(api, change)
+        except OSError as e:
+            logger.error(f"Circuit breaker unavailable: {str(e)}")
+
+    def record_failure(self, api: str):
+        def change(state, failures, opened_at, probe_at, now):
+            failures += 1
+            if state == HALF_OPEN or failures >= self.failure_threshold:
+                return None, (OPEN, failures, now, 0.0)
+            return None, (state, failures, opened_at, probe_at)
+
+        try:
+            self._transition(api, change)
+        except OSError as e:
+            logger.error(f"Circuit breaker unavailable: {str(e)}")
+
+    def status(self, api: str) -> Dict:
+        """State of one breaker and, while open, seconds until the next probe"""
+        def change(state, failures, opened_at, probe_at, now):
+            retry_in = max(self.reset_seconds - (now - opened_at), 0) if state == OPEN else 0
+            return ({'state': state, 'failures': failures, 'retry_in': round(retry_in)},
+                    (state, failures, opened_at, probe_at))
+
+        try:
+            return self._transition(api, change)
+        except OSError as e:
+            logger.error(f"Circuit breaker unavailable: {str(e)}")
+            return {'state': CLOSED, 'failures': 0, 'retry_in': 0}
+
+    def is_open(self, api: str) -> bool:
+        """Open or probing: calls to ``api`` are currently failing fast"""
+        return self.status(api)['state'] != CLOSED
+
+    def statuses(self, apis: Iterable[str] = DEPENDENCIES) -> Dict[str, Dict]:
+        return {api: self.status(api) for api in apis}
+
+    def release(self, api: str):
+        """Let the next caller probe at once when a probe ended without an answer either way"""
+        def change(state, failures, opened_at, probe_at, now):
+            if state == HALF_OPEN:
+                return None, (OPEN, failures, now - self.reset_seconds, 0.0)
+            return None, (state, failures, opened_at, probe_at)
+
+        try:
+            self._transition(api, change)
+        except OSError as e:
+            logger.error(f"Circuit breaker unavailable: {str(e)}")
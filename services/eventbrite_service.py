@@ -1,30 +1,39 @@
 # services/eventbrite_service.py - Eventbrite API integration
-import requests
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional
 
+from models import db, EventbriteEventCache, SystemSettings
+from utils.metrics import metrics
+from utils.instrumentation import instrumented
+from services.retry_service import ApiClient
+from services.singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
 class EventbriteService:
     """Service for Eventbrite API integration"""
     
-    def __init__(self, config):
+    def __init__(self, config, api_client=None, single_flight=None):
         self.config = config
+        self.api_client = api_client or ApiClient()
+        self.single_flight = single_flight or SingleFlight(config)
         self.private_token = config.EVENTBRITE_PRIVATE_TOKEN
-        self.base_url = 'https://www.eventbriteapi.com/v3'
+        self.base_url = config.EVENTBRITE_API_BASE_URL
         
+    @instrumented('eventbrite')
     def get_organizations(self) -> List[Dict]:
         """Get all organizations the user belongs to"""
         try:
             orgs_url = f'{self.base_url}/users/me/organizations/'
             headers = {'Authorization': f'Bearer {self.private_token}'}
             
-            response = requests.get(orgs_url, headers=headers, timeout=30)
+            response = self.api_client.request('eventbrite', 'organizations', 'GET', orgs_url,
+                                               headers=headers, timeout=30)
             
             if response.status_code == 200:
                 orgs = response.json().get('organizations', [])
-                logger.info(f"Retrieved {len(orgs)} Eventbrite organizations")
+                logger.info("Retrieved %d Eventbrite organizations", len(orgs))
                 return orgs
             else:
                 logger.error(f"Failed to get organizations: {response.status_code} - {response.text}")
@@ -34,32 +43,129 @@ class EventbriteService:
             logger.error(f"Exception getting organizations: {str(e)}")
             return []
     
-    def get_events_by_date(self, organization_id: str, event_date: datetime) -> List[Dict]:
+    @instrumented('eventbrite')
+    def get_events_by_date(self, organization_id: str, event_date: datetime,
+                           use_cache: bool = True) -> List[Dict]:
         """Get events for a specific date and organization"""
+        if use_cache:
+            cached_events = self._get_cached_events(organization_id, event_date.date())
+            metrics.cache_lookup('eventbrite_events', cached_events is not None)
+            if cached_events is not None:
+                return cached_events
+        
+        events = self._load_events(organization_id, event_date)
+        # The list is shared with coalesced callers, and routes annotate each event
+        return [dict(event) for event in events] if events else []
+    
+    def _load_events(self, organization_id: str, event_date: datetime) -> Optional[List[Dict]]:
+        """Fetch and cache a day's events, once for every concurrent caller in any worker"""
+        day = event_date.date()
+        started = datetime.utcnow()
+        
+        def load():
+            events = self._fetch_events_by_date(organization_id, event_date)
+            if events is not None:
+                self._cache_events(organization_id, day, events)
+            return events
+        
+        return self.single_flight.do(
+            'eventbrite_events', f'eventbrite:events:{organization_id}:{day}', load,
+            lambda: self._get_cached_events(organization_id, day, fetched_since=started)
+        )
+    
+    def _fetch_events_by_date(self, organization_id: str, event_date: datetime) -> Optional[List[Dict]]:
+        """Fetch events for a date from the Eventbrite API, None on failure"""
         try:
             search_url = f'{self.base_url}/organizations/{organization_id}/events/'
             headers = {'Authorization': f'Bearer {self.private_token}'}
             
             date_str = event_date.strftime('%Y-%m-%d')
+            params = self.event_search_params(event_date)
             
-            params = {
-                'start_date.range_start': date_str,
-                'start_date.range_end': date_str,
-                'expand': 'description'
-            }
-            
-            logger.debug(f"Searching events for {date_str} in org {organization_id}")
+            logger.debug("Searching events for %s in org %s", date_str, organization_id)
             
-            response = requests.get(search_url, headers=headers, params=params, timeout=30)
+            response = self.api_client.request('eventbrite', 'events', 'GET', search_url,
+                                               headers=headers, params=params, timeout=30)
             
             if response.status_code == 200:
                 events = response.json().get('events', [])
-                logger.info(f"Found {len(events)} events for {date_str}")
+                logger.info("Found %d events for %s", len(events), date_str)
                 return events
             else:
                 logger.error(f"Failed to get events: {response.status_code} - {response.text}")
-                return []
+                return None
                 
         except Exception as e:
             logger.error(f"Exception getting events: {str(e)}")
-            return []
+            return None
+    
+    @staticmethod
+    def event_search_params(event_date) -> Dict:
+        """Query parameters for a single day's event search"""
+        date_str = event_date.strftime('%Y-%m-%d')
+        return {
+            'start_date.range_start': date_str,
+            'start_date.range_end': date_str,
+            'expand': 'description'
+        }
+    
+    def _cache_ttl(self, event_date: date) -> timedelta:
+        """Past days rarely change, so they are cached much longer than upcoming ones"""
+        if event_date < datetime.utcnow().date():
+            return timedelta(hours=SystemSettings.get_value('eventbrite_cache_past_hours', 168))
+        return timedelta(minutes=SystemSettings.get_value('eventbrite_cache_future_minutes', 15))
+    
+    def _get_cached_events(self, organization_id: str, event_date: date,
+                           fetched_since: Optional[datetime] = None) -> Optional[List[Dict]]:
+        """Return cached events for an organization and day if still fresh (and fetched since ``fetched_since``)"""
+        try:
+            entry = EventbriteEventCache.query.filter_by(
+                organization_id=str(organization_id), event_date=event_date
+            ).first()
+            
+            if entry and fetched_since and entry.fetched_at < fetched_since:
+                return None
+            if entry and entry.is_fresh(self._cache_ttl(event_date)):
+                logger.debug("Eventbrite cache hit for %s in org %s", event_date, organization_id)
+                return entry.events_list
+            
+        except Exception as e:
+            logger.error(f"Error reading Eventbrite cache: {str(e)}")
+        
+        return None
+    
+    def _cache_events(self, organization_id: str, event_date: date, events: List[Dict]):
+        """Store events for an organization and day in the cache"""
+        try:
+            entry = EventbriteEventCache.query.filter_by(
+                organization_id=str(organization_id), event_date=event_date
+            ).first()
+            
+            if not entry:
+                entry = EventbriteEventCache(organization_id=str(organization_id), event_date=event_date)
+                db.session.add(entry)
+            
+            entry.events_list = events
+            entry.fetched_at = datetime.utcnow()
+            db.session.commit()
+            
+        except Exception as e:
+            logger.error(f"Error caching Eventbrite events: {str(e)}")
+            db.session.rollback()
+    
+    def invalidate_cache(self, organization_id: Optional[str] = None) -> int:
+        """Drop cached events, optionally for a single organization"""
+        try:
+            query = EventbriteEventCache.query
+            if organization_id:
+                query = query.filter_by(organization_id=str(organization_id))
+            
+            deleted = query.delete(synchronize_session=False)
+            db.session.commit()
+            logger.info("Invalidated %d cached Eventbrite event days", deleted)
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error invalidating Eventbrite cache: {str(e)}")
+            db.session.rollback()
+            return 0
@@ -0,0 +1,140 @@
+# services/matching_service.py - Automatic meeting/event matching
+import bisect
+import logging
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from dateutil.parser import parse
+
+from utils.helpers import normalize_title_for_matching
+
+logger = logging.getLogger(__name__)
+
+class MatchingService:
+    """Score Eventbrite events against Zoom meetings and propose matches"""
+
+    def __init__(self, config, window_minutes: int = 180, time_weight: float = 0.5,
+                 overlap_weight: float = 0.2, title_weight: float = 0.3):
+        self.config = config
+        self.window = timedelta(minutes=window_minutes)
+        self.time_weight = time_weight
+        self.overlap_weight = overlap_weight
+        self.title_weight = title_weight
+
+    @staticmethod
+    def _parse_time(value) -> Optional[datetime]:
+        """Parse an API timestamp as an aware UTC datetime"""
+        if not value:
+            return None
+        try:
+            parsed = parse(value)
+        except (ValueError, TypeError, OverflowError):
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+
+    def meeting_dates(self, meetings: List[Dict]) -> List:
+        """Days whose events could match these meetings, padded for time zones"""
+        dates = set()
+        for meeting in meetings:
+            start = self._parse_time(meeting.get('start_time'))
+            if start:
+                for offset in (-1, 0, 1):
+                    dates.add((start + timedelta(days=offset)).date())
+        return sorted(dates)
+
+    def build_index(self, events: List[Dict]) -> Tuple[List[datetime], List[Tuple[datetime, datetime, Dict]]]:
+        """Sort events by start time for bisect lookups"""
+        intervals = []
+        seen = set()
+        for event in events:
+            if event.get('id') in seen:
+                continue
+            seen.add(event.get('id'))
+
+            start = self._parse_time(event.get('start', {}).get('utc'))
+            if not start:
+                continue
+            end = self._parse_time(event.get('end', {}).get('utc')) or start
+            intervals.append((start, max(end, start), event))
+
+        intervals.sort(key=lambda interval: interval[0])
+        return [interval[0] for interval in intervals], intervals
+
+    @staticmethod
+    def title_similarity(first: str, second: str) -> float:
+        a = normalize_title_for_matching(first)
+        b = normalize_title_for_matching(second)
+        if not a or not b:
+            return 0.0
+        return SequenceMatcher(None, a, b).ratio()
+
+    @staticmethod
+    def interval_overlap(start_a, end_a, start_b, end_b) -> float:
+        """Intersection over union of two time intervals"""
+        union = max(end_a, end_b) - min(start_a, start_b)
+        if union.total_seconds() <= 0:
+            return 1.0 if start_a == start_b else 0.0
+        intersection = min(end_a, end_b) - max(start_a, start_b)
+        return max(intersection.total_seconds(), 0) / union.total_seconds()
+
+    def score_candidates(self, meeting: Dict, index) -> List[Dict]:
+        """Scored events starting within the window around a meeting"""
+        starts, intervals = index
+        meeting_start = self._parse_time(meeting.get('start_time'))
+        if not meeting_start:
+            return []
+        meeting_end = meeting_start + timedelta(minutes=meeting.get('duration') or 0)
+
+        lo = bisect.bisect_left(starts, meeting_start - self.window)
+        hi = bisect.bisect_right(starts, meeting_start + self.window)
+
+        candidates = []
+        for event_start, event_end, event in intervals[lo:hi]:
+            offset = abs((event_start - meeting_start).total_seconds())
+            time_score = 1 - offset / self.window.total_seconds()
+            overlap_score = self.interval_overlap(meeting_start, meeting_end, event_start, event_end)
+            title = event.get('name', {}).get('text', '')
+            title_score = self.title_similarity(meeting.get('topic', ''), title)
+
+            score = (self.time_weight * time_score
+                     + self.overlap_weight * overlap_score
+                     + self.title_weight * title_score)
+            candidates.append({
+                'event_id': event.get('id'),
+                'event_name': title,
+                'event_start': event.get('start', {}).get('utc'),
+                'score': round(score, 4),
+                'components': {
+                    'time': round(time_score, 4),
+                    'overlap': round(overlap_score, 4),
+                    'title': round(title_score, 4)
+                }
+            })
+
+        candidates.sort(key=lambda candidate: candidate['score'], reverse=True)
+        return candidates
+
+    def propose_matches(self, meetings: List[Dict], events: List[Dict],
+                        max_candidates: int = 3, min_score: float = 0.0) -> List[Dict]:
+        """Ranked match proposals for every meeting"""
+        index = self.build_index(events)
+
+        proposals = []
+        for meeting in meetings:
+            candidates = [candidate for candidate in self.score_candidates(meeting, index)
+                          if candidate['score'] >= min_score]
+            proposals.append({
+                'meeting': meeting,
+                'candidates': candidates[:max_candidates]
+            })
+
+        # Most confident proposals first so reviewers can accept from the top
+        proposals.sort(key=lambda proposal: proposal['candidates'][0]['score'] if proposal['candidates'] else -1,
+                       reverse=True)
+
+        matched = sum(1 for proposal in proposals if proposal['candidates'])
+        logger.info("Proposed matches for %d of %d meetings from %d events", matched, len(meetings), len(events))
+        return proposals
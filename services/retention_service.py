@@ -0,0 +1,207 @@
+# services/retention_service.py - Database and disk retention
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from sqlalchemy import text
+
+from models import db, ProcessingJob, EventMatch, SystemSettings
+
+logger = logging.getLogger(__name__)
+
+# Suffix used by ZoomService.download_video while a file is being written
+PARTIAL_SUFFIX = '.part'
+
+# Download admission markers; left behind only if a worker died mid-download
+RESERVATION_SUFFIX = '.reserve'
+
+class RetentionService:
+    """Service for keeping database and download folder size bounded"""
+
+    def __init__(self, config, batch_size: int = 500, partial_grace_hours: int = 6,
+                 vacuum_pages: int = 2000):
+        self.config = config
+        self.batch_size = batch_size
+        self.partial_grace_hours = partial_grace_hours
+        self.vacuum_pages = vacuum_pages
+
+    def retention_days(self) -> int:
+        """Days to keep jobs and downloaded files (auto_cleanup_days setting)"""
+        return SystemSettings.get_value('auto_cleanup_days', 7)
+
+    def run(self) -> Dict:
+        """Run every retention task and return a summary"""
+        summary = {
+            'jobs_deleted': self.purge_expired_jobs(),
+            'uploaded_files_removed': self.release_uploaded_files(),
+            'orphan_files_removed': self.sweep_download_folder(),
+        }
+        summary['vacuum_pages_freed'] = self.incremental_vacuum()
+        logger.info("Retention run complete: %s", summary)
+        return summary
+
+    def purge_expired_jobs(self, now: Optional[datetime] = None) -> int:
+        """Delete expired processing jobs in batches"""
+        now = now or datetime.utcnow()
+        fallback_cutoff = now - timedelta(days=self.retention_days())
+
+        expired = db.or_(
+            ProcessingJob.expires_at < now,
+            db.and_(ProcessingJob.expires_at.is_(None), ProcessingJob.created_at < fallback_cutoff)
+        )
+        # Never purge a job that is still running
+        expired = db.and_(expired, ProcessingJob.status.notin_(('pending', 'processing')))
+
+        deleted = 0
+        while True:
+            ids = [row.id for row in
+                   db.session.query(ProcessingJob.id).filter(expired).limit(self.batch_size).all()]
+            if not ids:
+                break
+
+            try:
+                # Keep the match audit trail, just detach it from the job
+                EventMatch.query.filter(EventMatch.processing_job_id.in_(ids)).update(
+                    {EventMatch.processing_job_id: None}, synchronize_session=False
+                )
+                deleted += ProcessingJob.query.filter(ProcessingJob.id.in_(ids)).delete(
+                    synchronize_session=False
+                )
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error purging processing jobs: {str(e)}")
+                db.session.rollback()
+                break
+
+        if deleted:
+            logger.info("Purged %d expired processing jobs", deleted)
+        return deleted
+
+    def release_file(self, file_path: Optional[str]) -> bool:
+        """Delete a downloaded file that is no longer needed"""
+        if not file_path:
+            return False
+        try:
+            os.unlink(file_path)
+            logger.info("Removed downloaded file: %s", os.path.basename(file_path))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.error(f"Error removing {file_path}: {str(e)}")
+            return False
+
+    def release_uploaded_files(self) -> int:
+        """Delete local copies of videos whose match is already on YouTube"""
+        removed = 0
+        last_id = 0
+        while True:
+            matches = (EventMatch.query
+                       .filter(EventMatch.id > last_id,
+                               EventMatch.youtube_uploaded.is_(True),
+                               EventMatch.video_file_path.isnot(None))
+                       .order_by(EventMatch.id)
+                       .limit(self.batch_size)
+                       .all())
+            if not matches:
+                break
+
+            for match in matches:
+                if self.release_file(match.video_file_path):
+                    removed += 1
+                match.video_file_path = None
+            last_id = matches[-1].id
+
+            try:
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error updating released matches: {str(e)}")
+                db.session.rollback()
+                break
+
+        return removed
+
+    def _pending_files(self) -> Set[str]:
+        """File names still needed by a match that has not been uploaded"""
+        rows = (db.session.query(EventMatch.video_file_path)
+                .filter(EventMatch.youtube_uploaded.isnot(True),
+                        EventMatch.video_file_path.isnot(None),
+                        EventMatch.status.in_(('pending', 'processing')))
+                .all())
+        return {os.path.basename(row.video_file_path) for row in rows}
+
+    def sweep_download_folder(self, now: Optional[float] = None) -> int:
+        """Remove stale partial downloads and old files nobody is waiting for"""
+        now = now or time.time()
+        partial_cutoff = now - self.partial_grace_hours * 3600
+        file_cutoff = now - self.retention_days() * 86400
+        pending = self._pending_files()
+
+        removed = 0
+        try:
+            entries = os.scandir(self.config.DOWNLOAD_FOLDER)
+        except FileNotFoundError:
+            return 0
+
+        with entries:
+            for entry in entries:
+                # Dotfiles are bookkeeping such as the admission lock
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+
+                if entry.name.endswith(RESERVATION_SUFFIX):
+                    # The reservation is written once; its download shows it is alive
+                    partial = entry.path[:-len(RESERVATION_SUFFIX)] + PARTIAL_SUFFIX
+                    try:
+                        mtime = max(mtime, os.stat(partial).st_mtime)
+                    except OSError:
+                        pass
+                    stale = mtime < partial_cutoff
+                elif entry.name.endswith(PARTIAL_SUFFIX):
+                    stale = mtime < partial_cutoff
+                else:
+                    stale = mtime < file_cutoff and entry.name not in pending
+
+                if stale and self.release_file(entry.path):
+                    removed += 1
+
+        if removed:
+            logger.info("Removed %d stale files from download folder", removed)
+        return removed
+
+    def incremental_vacuum(self) -> int:
+        """Return free SQLite pages to the filesystem"""
+        if db.engine.dialect.name != 'sqlite':
+            return 0
+
+        try:
+            with db.engine.connect() as conn:
+                mode = conn.execute(text('PRAGMA auto_vacuum')).scalar()
+                if mode != 2:
+                    # Switching to incremental mode only takes effect after a full VACUUM
+                    logger.info("Enabling SQLite incremental auto_vacuum")
+                    conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+                    conn.execute(text('VACUUM'))
+                    return 0
+
+                free_before = conn.execute(text('PRAGMA freelist_count')).scalar()
+                # SQLite frees one page each time the pragma is stepped, and execute()
+                # steps a statement without result columns only once; executescript
+                # runs it to completion
+                conn.connection.driver_connection.executescript(
+                    f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});'
+                )
+                free_after = conn.execute(text('PRAGMA freelist_count')).scalar()
+                return free_before - free_after
+
+        except Exception as e:
+            logger.error(f"Error running SQLite vacuum: {str(e)}")
+            return 0
@@ -0,0 +1,378 @@
+# services/retry_service.py - Rate-limit-aware retries shared by the API clients
+import os
+import time
+import fcntl
+import random
+import struct
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+
+import requests
+import httpx
+
+from models import SystemSettings
+from utils.metrics import metrics
+from utils.instrumentation import record_retry
+from utils.exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Responses worth repeating: rate limits and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Requests per second per API, shared by every worker, when settings are unavailable
+DEFAULT_API_RATES = {'zoom': 10, 'eventbrite': 5, 'youtube': 5}
+
+# Bucket state: when the next request is due, and the end of a pause set by a 429
+BUCKET_STATE = struct.Struct('dd')
+
+# Set inside background jobs, which may wait out long rate limits
+_background = contextvars.ContextVar('api_background', default=False)
+
+class RetryPolicy:
+    """When to retry and how long to wait: server hints first, else jittered backoff"""
+
+    def __init__(self, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_wait: float = 120.0, deadline: Optional[float] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # A longer Retry-After (e.g. Zoom's daily limit) is not waited out
+        self.max_wait = max_wait
+        # Seconds a call may spend on all its attempts and waits, None for no limit
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff, so workers retrying together spread out"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def _seconds_until(value: str, now: float) -> Optional[float]:
+        """Seconds from a delay, an epoch timestamp, an HTTP date or an ISO time"""
+        value = value.strip()
+        try:
+            number = float(value)
+            # Reset headers carry either a delay or an epoch timestamp
+            return max(number - now, 0.0) if number > 1e9 else max(number, 0.0)
+        except ValueError:
+            pass
+        for parse in (parsedate_to_datetime, lambda text: datetime.fromisoformat(text.replace('Z', '+00:00'))):
+            try:
+                moment = parse(value)
+            except (TypeError, ValueError):
+                continue
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            return max(moment.timestamp() - now, 0.0)
+        return None
+
+    def retry_after(self, headers) -> Optional[float]:
+        """Wait requested by Retry-After or the Zoom/Eventbrite rate-limit reset headers"""
+        now = time.time()
+        for name in ('Retry-After', 'X-RateLimit-Reset', 'X-Rate-Limit-Reset'):
+            value = headers.get(name)
+            if value:
+                seconds = self._seconds_until(value, now)
+                if seconds is not None:
+                    return seconds
+        return None
+
+    def delay(self, attempt: int, response=None, remaining: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry ``attempt`` (0-based), None to give up.
+
+        ``remaining`` is what is left of the call's deadline; a wait that
+        would outlast it gives up instead.
+        """
+        if attempt >= self.max_retries:
+            return None
+        delay = self.backoff(attempt)
+        if response is not None:
+            if response.status_code not in RETRYABLE_STATUSES:
+                return None
+            hint = self.retry_after(response.headers)
+            if hint is not None:
+                if hint > self.max_wait:
+                    return None
+                # A little jitter keeps workers released by the same reset from colliding
+                delay = hint + random.uniform(0, self.base_delay)
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+class ApiRateLimiter:
+    """Per-API request token buckets shared by every thread and gunicorn worker.
+
+    Like the bandwidth buckets, state lives in small files under an flock.
+    A 429 pauses the whole bucket until the server's reset, so other
+    workers stop sending too instead of collecting their own 429s.
+    """
+
+    def __init__(self, config, burst_seconds: float = 1.0, refresh_seconds: float = 60):
+        self.config = config
+        self.burst_seconds = burst_seconds
+        self.refresh_seconds = refresh_seconds
+        self._rates: Dict[str, float] = dict(DEFAULT_API_RATES)
+        self._rates_at = 0.0
+        self._lock = threading.Lock()
+
+    def rate(self, api: str) -> float:
+        """Requests/second allowed for ``api``, re-read from settings once a minute"""
+        with self._lock:
+            if time.monotonic() - self._rates_at >= self.refresh_seconds:
+                try:
+                    rates = SystemSettings.get_value('api_rate_limits', DEFAULT_API_RATES) or {}
+                    self._rates = {name: float(value or 0) for name, value in dict(DEFAULT_API_RATES, **rates).items()}
+                    self._rates_at = time.monotonic()
+                except Exception as e:
+                    # Event loop and transfer threads have no app context; keep the last known
+                    # rates until the next refresh instead of failing on every call
+                    self._rates_at = time.monotonic()
+                    logger.debug("Keeping cached API rate limits: %s", e)
+            return self._rates.get(api, 0.0)
+
+    def _state_path(self, api: str) -> str:
+        return os.path.join(self.config.DOWNLOAD_FOLDER, f'.ratelimit-{api}')
+
+    def _update(self, api: str, requests_taken: int, pause: float) -> float:
+        """Schedule requests and/or extend the pause; return how long the caller must wait.
+
+        The bucket is kept as the time its next request is due, which already
+        includes the debt of requests scheduled ahead of it, so callers that
+        were held by a pause are released one interval apart.
+        """
+        rate = self.rate(api)
+        interval = 1.0 / rate if rate > 0 else 0.0
+        burst = max(rate * self.burst_seconds, 1.0) * interval
+        with open(self._state_path(api), 'a+b') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                data = state_file.read(BUCKET_STATE.size)
+                now = time.time()
+                due, paused_until = BUCKET_STATE.unpack(data) if len(data) == BUCKET_STATE.size else (now, 0.0)
+
+                paused_until = max(paused_until, now + pause)
+                due = max(due, now, paused_until) + interval * requests_taken
+
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(BUCKET_STATE.pack(due, paused_until))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+        return max(due - burst - now, paused_until - now, 0.0)
+
+    def reserve(self, api: str) -> float:
+        """Take one request slot and return the seconds to wait before sending it"""
+        try:
+            return self._update(api, 1, 0)
+        except OSError as e:
+            logger.error(f"API rate limiter unavailable, not limiting: {str(e)}")
+            return 0.0
+
+    def pause(self, api: str, seconds: float):
+        """Hold every worker's requests to ``api`` for ``seconds``"""
+        try:
+            self._update(api, 0, seconds)
+        except OSError as e:
+            logger.error(f"API rate limiter unavailable, not pausing: {str(e)}")
+
+class ApiClient:
+    """HTTP calls with the shared rate limit, retries, circuit breakers and per-attempt metrics.
+
+    ``request`` serves the requests-based services and ``arequest`` the httpx
+    coroutines in async_services. The final response is returned whatever
+    its status; callers keep their own handling of failures. While an API's
+    circuit is open both raise CircuitOpenError without calling out.
+
+    ``policy`` bounds calls made while serving a request, so retries end
+    well before gunicorn's worker timeout. Inside ``background()`` calls use
+    ``background_policy`` and may wait out long rate limits.
+    """
+
+    def __init__(self, rate_limiter: Optional[ApiRateLimiter] = None, policy: Optional[RetryPolicy] = None,
+                 breakers=None, background_policy: Optional[RetryPolicy] = None):
+        self.rate_limiter = rate_limiter
+        self.policy = policy or RetryPolicy()
+        self.background_policy = background_policy or self.policy
+        self.breakers = breakers
+
+    @staticmethod
+    @contextmanager
+    def background() -> Iterator[None]:
+        """Use the background retry policy for calls made inside the block"""
+        token = _background.set(True)
+        try:
+            yield
+        finally:
+            _background.reset(token)
+
+    @property
+    def active_policy(self) -> RetryPolicy:
+        return self.background_policy if _background.get() else self.policy
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _slot_delay(self, api: str, deadline: Optional[float]) -> float:
+        """Seconds to wait for a slot in the shared bucket, cut short by the deadline.
+
+        When the bucket is paused past the deadline the request goes out at
+        the deadline anyway, and its 429 reaches the caller as a failure.
+        """
+        delay = self.rate_limiter.reserve(api) if self.rate_limiter else 0
+        remaining = self._remaining(deadline)
+        if remaining is not None:
+            delay = min(delay, max(remaining, 0.0))
+        return delay
+
+    def _admit(self, api: str):
+        if self.breakers and not self.breakers.allow(api):
+            raise CircuitOpenError(api)
+
+    def _record_outcome(self, api: str, failed: Optional[bool]):
+        """Report a call to the breaker; None (no verdict) only frees a half-open probe"""
+        if self.breakers:
+            if failed is None:
+                self.breakers.release(api)
+            elif failed:
+                self.breakers.record_failure(api)
+            else:
+                self.breakers.record_success(api)
+
+    @contextmanager
+    def guard(self, api: str) -> Iterator[None]:
+        """Circuit breaker for calls made outside ``request``, e.g. through googleapiclient.
+
+        Exceptions count as failures unless they carry an HTTP status below 500.
+        """
+        self._admit(api)
+        failed = None
+        try:
+            yield
+            failed = False
+        except Exception as e:
+            status = getattr(getattr(e, 'resp', None), 'status', None)
+            failed = status is None or int(status) >= 500
+            raise
+        finally:
+            self._record_outcome(api, failed)
+
+    def wait_for_slot(self, api: str, deadline: Optional[float] = None):
+        """Block until the shared bucket allows one more request to ``api``"""
+        delay = self._slot_delay(api, deadline)
+        if delay:
+            time.sleep(delay)
+
+    def _observe(self, api: str, response):
+        """Pause the bucket when a successful response says the quota is spent"""
+        remaining = response.headers.get('X-RateLimit-Remaining') or response.headers.get('X-Rate-Limit-Remaining')
+        if self.rate_limiter and remaining is not None and remaining.strip() == '0':
+            policy = self.active_policy
+            wait = policy.retry_after(response.headers)
+            if wait and wait <= policy.max_wait:
+                self.rate_limiter.pause(api, wait)
+
+    def _retry_delay(self, api: str, operation: str, attempt: int, deadline: Optional[float],
+                     response=None, error: Optional[Exception] = None) -> Optional[float]:
+        delay = self.active_policy.delay(attempt, response, self._remaining(deadline))
+        if delay is None:
+            return None
+        reason = str(response.status_code) if response is not None else type(error).__name__
+        if response is not None and response.status_code == 429 and self.rate_limiter:
+            self.rate_limiter.pause(api, delay)
+        logger.warning("%s %s failed (%s), retry %d in %.1fs", api, operation, reason, attempt + 1, delay)
+        metrics.inc('api_retries_total', api=api, operation=operation, reason=reason)
+        record_retry()
+        return delay
+
+    def request(self, api: str, operation: str, method: str, url: str,
+                expected=(200,), **kwargs) -> requests.Response:
+        """Send a request, retrying rate limits, server errors and dropped connections"""
+        self._admit(api)
+        # Every exit reports back, so a half-open probe is never left hanging
+        failed = None
+        try:
+            response = self._request(api, operation, method, url, expected, **kwargs)
+            # Rate limits and client errors say nothing about the API being down
+            failed = response.status_code >= 500
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            failed = True
+            raise
+        finally:
+            self._record_outcome(api, failed)
+
+    def _deadline(self) -> Optional[float]:
+        budget = self.active_policy.deadline
+        return None if budget is None else time.monotonic() + budget
+
+    def _request(self, api, operation, method, url, expected, **kwargs):
+        attempt = 0
+        deadline = self._deadline()
+        while True:
+            self.wait_for_slot(api, deadline)
+            try:
+                with metrics.time_call(api, operation) as call:
+                    response = call.check(requests.request(method, url, **kwargs), expected)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._retry_delay(api, operation, attempt, deadline, error=e)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code in expected:
+                    self._observe(api, response)
+                    return response
+                delay = self._retry_delay(api, operation, attempt, deadline, response)
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    async def arequest(self, client: httpx.AsyncClient, api: str, operation: str, method: str, url: str,
+                       expected=(200,), **kwargs) -> httpx.Response:
+        """``request`` for coroutines on the AsyncRunner loop"""
+        self._admit(api)
+        failed = None
+        try:
+            response = await self._arequest(client, api, operation, method, url, expected, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        except httpx.TransportError:
+            failed = True
+            raise
+        finally:
+            self._record_outcome(api, failed)
+
+    async def _arequest(self, client, api, operation, method, url, expected, **kwargs):
+        attempt = 0
+        deadline = self._deadline()
+        while True:
+            delay = self._slot_delay(api, deadline)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                with metrics.time_call(api, operation) as call:
+                    response = call.check(await client.request(method, url, **kwargs), expected)
+            except httpx.TransportError as e:
+                delay = self._retry_delay(api, operation, attempt, deadline, error=e)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code in expected:
+                    self._observe(api, response)
+                    return response
+                delay = self._retry_delay(api, operation, attempt, deadline, response)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,122 @@
+# services/singleflight.py - Share one upstream call between identical concurrent requests
+import os
+import time
+import zlib
+import fcntl
+import logging
+import threading
+from typing import Callable, Dict, Optional, TypeVar
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Cross-worker locks are striped over a fixed set of files; keys that share a
+# stripe only wait on each other, then recheck and call out themselves
+LOCK_STRIPES = 64
+
+class _Call:
+    """One in-flight call and, once done, its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Concurrent identical calls share one execution and its result.
+
+    Within a process, threads calling ``do`` with a key that is already in
+    flight wait for that call and get its result (or its exception). Across
+    gunicorn workers the caller holds an flock while it calls out; a worker
+    that finds the lock held waits for it, then asks ``recheck`` for what the
+    other worker stored (usually in a cache) and only calls out itself when
+    that comes back None. Results are shared, so callers must not mutate them.
+    """
+
+    def __init__(self, config, wait_seconds: float = 60, poll_seconds: float = 0.05):
+        self.config = config
+        # Longest a worker waits on another worker's call before making its own
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def _lock_path(self, key: str) -> str:
+        stripe = zlib.crc32(key.encode('utf-8')) % LOCK_STRIPES
+        return os.path.join(self.config.DOWNLOAD_FOLDER, f'.flight-{stripe}')
+
+    def do(self, name: str, key: str, fn: Callable[[], T],
+           recheck: Optional[Callable[[], Optional[T]]] = None) -> T:
+        """Run ``fn`` unless an identical call is in flight, and return the shared result.
+
+        ``name`` labels the metrics; ``recheck`` enables coalescing across workers.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc('singleflight_shared_total', flight=name, scope='process')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_exclusive(name, key, fn, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_exclusive(self, name: str, key: str, fn: Callable[[], T],
+                       recheck: Optional[Callable[[], Optional[T]]]) -> T:
+        if recheck is None:
+            return fn()
+
+        try:
+            lock_file = open(self._lock_path(key), 'a+b')
+        except OSError as e:
+            logger.error(f"Single-flight lock unavailable, calling out: {str(e)}")
+            return fn()
+
+        with lock_file:
+            if not self._try_lock(lock_file):
+                # Another worker is calling out; wait for it, then reuse what it stored
+                if self._wait_for_lock(lock_file):
+                    result = recheck()
+                    if result is not None:
+                        metrics.inc('singleflight_shared_total', flight=name, scope='worker')
+                        return result
+                else:
+                    logger.warning("Gave up waiting %ss for another worker's %s call", self.wait_seconds, name)
+            try:
+                return fn()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _try_lock(lock_file) -> bool:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _wait_for_lock(self, lock_file) -> bool:
+        """Poll for the lock, so a hung call in another worker cannot hold this one forever"""
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_seconds)
+            if self._try_lock(lock_file):
+                return True
+        return False
@@ -6,21 +6,29 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
-import googleapiclient.discovery
-import googleapiclient.errors
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+# The Google client libraries are imported on first use; they are slow to
+# import and most requests never talk to YouTube
 
 from models import db, YouTubeVideo, SystemSettings
+from services.bandwidth_service import EGRESS
+from services.retry_service import ApiClient
+from utils.metrics import metrics
+from utils.instrumentation import instrumented, argument_file_size, outcome_from_calls
 
 logger = logging.getLogger(__name__)
 
 class YouTubeService:
     """Service for YouTube integration and video management"""
     
-    def __init__(self, config):
+    # Upload chunk size when egress is limited; resumable chunks must be multiples of 256 KB
+    THROTTLED_CHUNK_SIZE = 8 * 1024 * 1024
+    
+    def __init__(self, config, bandwidth_limiter=None, api_client=None):
         self.config = config
+        self.bandwidth_limiter = bandwidth_limiter
+        self.api_client = api_client or ApiClient()
         self.service = None
+        self.credentials = None
         self.channel_id = config.YOUTUBE_CHANNEL_ID
         
     def get_service(self):
@@ -35,6 +43,10 @@ class YouTubeService:
             return None
             
         try:
+            from google.oauth2.credentials import Credentials
+            from google.auth.transport.requests import Request
+            import googleapiclient.discovery
+            
             # Load credentials
             creds = Credentials.from_authorized_user_file(
                 credentials_path, 
@@ -56,6 +68,7 @@ class YouTubeService:
                 return None
                 
             # Create service
+            self.credentials = creds
             self.service = googleapiclient.discovery.build('youtube', 'v3', credentials=creds)
             logger.info("YouTube service authenticated successfully")
             return self.service
@@ -64,12 +77,28 @@ class YouTubeService:
             logger.error(f"Error creating YouTube service: {str(e)}")
             return None
     
-    def check_existing_video(self, title: str) -> Optional[Dict]:
-        """Check if a video with the given title already exists"""
+    # None means no match here, not a failure
+    @instrumented('youtube', size=None, outcome=outcome_from_calls)
+    def check_existing_video(self, title: str, usage: Optional[Dict] = None) -> Optional[Dict]:
+        """Check if a video with the given title already exists
+        
+        Searches that YouTube answered are counted in ``usage['searches']``
+        when given, so callers can account for the quota they spent.
+        """
         if not self.config.CHECK_EXISTING_VIDEOS:
             return None
             
         # First check cached videos
+        cached = self._get_cached_video(title)
+        metrics.cache_lookup('youtube_title', bool(cached))
+        if cached:
+            return cached
+        
+        # If not in cache or cache expired, search YouTube
+        return self._search_youtube_for_title(title, usage)
+    
+    def _get_cached_video(self, title: str) -> Optional[Dict]:
+        """Return a fresh cached video whose title matches, if any"""
         normalized_title = YouTubeVideo.normalize_title(title)
         cached_video = YouTubeVideo.query.filter_by(title_normalized=normalized_title).first()
         
@@ -79,7 +108,7 @@ class YouTubeService:
             cache_expiry = cached_video.last_updated + timedelta(hours=cache_hours)
             
             if datetime.utcnow() < cache_expiry:
-                logger.info(f"Found cached video match for '{title}': {cached_video.youtube_video_id}")
+                logger.info("Found cached video match for '%s': %s", title, cached_video.youtube_video_id)
                 return {
                     'video_id': cached_video.youtube_video_id,
                     'title': cached_video.title,
@@ -88,56 +117,68 @@ class YouTubeService:
                     'cached': True
                 }
         
-        # If not in cache or cache expired, search YouTube
-        return self._search_youtube_for_title(title)
+        return None
+    
+    def search_params_for_title(self, title: str) -> Dict:
+        """Search parameters used to look up a title on YouTube"""
+        search_params = {
+            'part': 'snippet',
+            'q': title,
+            'type': 'video',
+            'maxResults': 50,  # Check more results for better matching
+            'order': 'relevance'
+        }
+        
+        # If we have a specific channel, search only in that channel
+        if self.channel_id:
+            search_params['channelId'] = self.channel_id
+        
+        return search_params
     
-    def _search_youtube_for_title(self, title: str) -> Optional[Dict]:
+    def match_search_results(self, title: str, search_response: Dict) -> Optional[Dict]:
+        """Pick the exact title match from a search response and cache it"""
+        normalized_search_title = YouTubeVideo.normalize_title(title)
+        
+        # Check each result for exact title match
+        for item in search_response.get('items', []):
+            video_title = item['snippet']['title']
+            video_id = item['id']['videoId']
+            
+            # Check for exact match after normalization
+            if YouTubeVideo.normalize_title(video_title) == normalized_search_title:
+                logger.info("Found exact title match: %s", video_id)
+                
+                # Cache this result
+                self._cache_video(item)
+                
+                return {
+                    'video_id': video_id,
+                    'title': video_title,
+                    'url': f'https://www.youtube.com/watch?v={video_id}',
+                    'published_at': datetime.fromisoformat(item['snippet']['publishedAt'].replace('Z', '+00:00')),
+                    'cached': False
+                }
+        
+        logger.info("No exact title match found for '%s'", title)
+        return None
+    
+    def _search_youtube_for_title(self, title: str, usage: Optional[Dict] = None) -> Optional[Dict]:
         """Search YouTube for videos with similar title"""
         service = self.get_service()
         if not service:
             return None
             
         try:
-            # Search parameters
-            search_params = {
-                'part': 'snippet',
-                'q': title,
-                'type': 'video',
-                'maxResults': 50,  # Check more results for better matching
-                'order': 'relevance'
-            }
-            
-            # If we have a specific channel, search only in that channel
-            if self.channel_id:
-                search_params['channelId'] = self.channel_id
-            
-            logger.info(f"Searching YouTube for title: '{title}'")
-            search_response = service.search().list(**search_params).execute()
-            
-            normalized_search_title = YouTubeVideo.normalize_title(title)
-            
-            # Check each result for exact title match
-            for item in search_response.get('items', []):
-                video_title = item['snippet']['title']
-                video_id = item['id']['videoId']
-                
-                # Check for exact match after normalization
-                if YouTubeVideo.normalize_title(video_title) == normalized_search_title:
-                    logger.info(f"Found exact title match: {video_id}")
-                    
-                    # Cache this result
-                    self._cache_video(item)
-                    
-                    return {
-                        'video_id': video_id,
-                        'title': video_title,
-                        'url': f'https://www.youtube.com/watch?v={video_id}',
-                        'published_at': datetime.fromisoformat(item['snippet']['publishedAt'].replace('Z', '+00:00')),
-                        'cached': False
-                    }
+            logger.info("Searching YouTube for title: '%s'", title)
+            self.api_client.wait_for_slot('youtube')
+            with self.api_client.guard('youtube'), metrics.time_call('youtube', 'search'):
+                search_response = service.search().list(**self.search_params_for_title(title)).execute(
+                    num_retries=self.api_client.active_policy.max_retries
+                )
+            if usage is not None:
+                usage['searches'] = usage.get('searches', 0) + 1
             
-            logger.info(f"No exact title match found for '{title}'")
-            return None
+            return self.match_search_results(title, search_response)
             
         except Exception as e:
             logger.error(f"Error searching YouTube: {str(e)}")
@@ -172,12 +213,13 @@ class YouTubeService:
                 db.session.add(video)
             
             db.session.commit()
-            logger.debug(f"Cached video: {snippet['title']}")
+            logger.debug("Cached video: %s", snippet['title'])
             
         except Exception as e:
             logger.error(f"Error caching video: {str(e)}")
             db.session.rollback()
     
+    @instrumented('youtube', size=argument_file_size('file_path', 1))
     def upload_video(self, file_path: str, title: str, description: str = '', 
                     recording_date: Optional[datetime] = None, 
                     check_existing: bool = True) -> Optional[Dict]:
@@ -201,6 +243,9 @@ class YouTubeService:
                 'error': 'YouTube service not available'
             }
         
+        import googleapiclient.errors
+        import googleapiclient.http
+        
         try:
             # Prepare request body
             request_body = {
@@ -221,26 +266,46 @@ class YouTubeService:
                     'recordingDate': recording_date.isoformat()
                 }
             
+            # Upload in one request unless egress is limited, then chunk by chunk
+            throttled = self.bandwidth_limiter and self.bandwidth_limiter.is_limited(EGRESS)
+            chunk_size = self.THROTTLED_CHUNK_SIZE if throttled else -1
+            
             # Create media file upload
             media_file = googleapiclient.http.MediaFileUpload(
                 file_path, 
-                chunksize=-1, 
+                chunksize=chunk_size, 
                 resumable=True
             )
             
-            logger.info(f"Starting upload: '{title}'")
+            logger.info("Starting upload: '%s'", title)
             
             # Execute upload
-            upload_response = service.videos().insert(
+            insert_request = service.videos().insert(
                 part='snippet,status,recordingDetails',
                 body=request_body,
                 media_body=media_file
-            ).execute()
+            )
+            
+            with self.api_client.guard('youtube'), metrics.time_call('youtube', 'insert'):
+                if throttled:
+                    upload_response = None
+                    file_size = media_file.size()
+                    sent = 0
+                    while upload_response is None:
+                        self.bandwidth_limiter.throttle(EGRESS, min(chunk_size, file_size - sent))
+                        status, upload_response = insert_request.next_chunk(
+                            num_retries=self.api_client.active_policy.max_retries
+                        )
+                        if status:
+                            sent = status.resumable_progress
+                else:
+                    upload_response = insert_request.execute(num_retries=self.api_client.active_policy.max_retries)
+            metrics.inc('transfer_bytes_total', media_file.size(), direction='upload')
             
             video_id = upload_response.get('id')
             video_url = f'https://www.youtube.com/watch?v={video_id}'
             
-            logger.info(f"Upload successful: {video_id}")
+            logger.info("Upload successful: %s", video_id)
             
             # Cache the uploaded video
             cache_item = {
@@ -275,6 +340,7 @@ class YouTubeService:
                 'error': f'Upload failed: {str(e)}'
             }
     
+    @instrumented('youtube', size=lambda result, args, kwargs: result)
     def refresh_video_cache(self, max_results: int = 200) -> int:
         """Refresh the cache of YouTube videos"""
         service = self.get_service()
@@ -305,7 +371,11 @@ class YouTubeService:
                 if next_page_token:
                     search_params['pageToken'] = next_page_token
                 
-                response = service.search().list(**search_params).execute()
+                self.api_client.wait_for_slot('youtube')
+                with self.api_client.guard('youtube'), metrics.time_call('youtube', 'search'):
+                    response = service.search().list(**search_params).execute(
+                        num_retries=self.api_client.active_policy.max_retries
+                    )
                 
                 # Cache each video
                 for item in response.get('items', []):
@@ -323,6 +393,20 @@ class YouTubeService:
             logger.error(f"Error refreshing video cache: {str(e)}")
             return 0
     
+    def get_access_token(self) -> Optional[str]:
+        """Current OAuth access token for direct REST calls, refreshed if needed"""
+        if not self.get_service() or not self.credentials:
+            return None
+        
+        try:
+            if not self.credentials.valid and self.credentials.refresh_token:
+                from google.auth.transport.requests import Request
+                self.credentials.refresh(Request())
+            return self.credentials.token
+        except Exception as e:
+            logger.error(f"Error refreshing YouTube credentials: {str(e)}")
+            return None
+    
     def is_authenticated(self) -> bool:
         """Check if YouTube service is authenticated"""
         return self.get_service() is not None
@@ -339,6 +423,7 @@ class YouTubeService:
             }
         
         try:
+            from google.oauth2.credentials import Credentials
             creds = Credentials.from_authorized_user_file(credentials_path)
             
             if not creds.valid:
@@ -1,33 +1,78 @@
 # services/zoom_service.py - Zoom API integration
 import os
+import json
+import base64
 import requests
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from functools import partial
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
+from urllib.parse import quote
+
+from services.retention_service import PARTIAL_SUFFIX
+from services.segmented_download import SegmentedDownloader, MB
+from services.bandwidth_service import INGRESS
+from services.retry_service import ApiClient, RETRYABLE_STATUSES
+from utils.metrics import metrics
+from utils.instrumentation import instrumented, result_file_size
+from utils.exceptions import ZoomError, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+# Zoom MP4 recording types, most useful view first
+DEFAULT_RECORDING_TYPE_PREFERENCE = [
+    'shared_screen_with_speaker_view',
+    'shared_screen_with_speaker_view(CC)',
+    'active_speaker',
+    'speaker_view',
+    'shared_screen',
+    'shared_screen_with_gallery_view',
+    'gallery_view',
+]
+
+# What each recording type shows: screen and people, people only, screen only.
+# 'smallest' trades size only within the best tier a recording has.
+RECORDING_TYPE_TIERS = {
+    'shared_screen_with_speaker_view': 0,
+    'shared_screen_with_speaker_view(CC)': 0,
+    'shared_screen_with_gallery_view': 0,
+    'active_speaker': 1,
+    'speaker_view': 1,
+    'gallery_view': 1,
+    'shared_screen': 2,
+}
+
 class ZoomService:
     """Service for Zoom API integration"""
     
-    def __init__(self, config):
+    def __init__(self, config, bandwidth_limiter=None, api_client=None):
         self.config = config
+        self.bandwidth_limiter = bandwidth_limiter
+        self.api_client = api_client or ApiClient()
         self.api_key = config.ZOOM_API_KEY
         self.api_secret = config.ZOOM_API_SECRET
         self.account_id = config.ZOOM_ACCOUNT_ID
+        self.base_url = config.ZOOM_API_BASE_URL
+        self.oauth_url = config.ZOOM_OAUTH_URL
+        self.downloader = SegmentedDownloader(
+            segments=config.DOWNLOAD_SEGMENTS,
+            min_segmented_bytes=config.DOWNLOAD_SEGMENT_MIN_MB * MB,
+            api_client=self.api_client
+        )
         
+    @instrumented('zoom')
     def get_access_token(self) -> Optional[str]:
         """Get OAuth access token from Zoom"""
         try:
-            auth_url = 'https://zoom.us/oauth/token'
+            auth_url = self.oauth_url
             auth_payload = {
                 'grant_type': 'account_credentials',
                 'account_id': self.account_id
             }
             
-            response = requests.post(
-                auth_url, 
+            response = self.api_client.request(
+                'zoom', 'token', 'POST', auth_url,
                 auth=(self.api_key, self.api_secret), 
                 data=auth_payload,
                 timeout=30
@@ -44,111 +89,240 @@ class ZoomService:
             logger.error(f"Exception getting Zoom token: {str(e)}")
             return None
     
+    @instrumented('zoom')
     def get_users(self, access_token: str) -> List[Dict]:
         """Get list of users from Zoom account"""
         try:
-            users_url = 'https://api.zoom.us/v2/users'
+            users_url = f'{self.base_url}/users'
             headers = {'Authorization': f'Bearer {access_token}'}
             params = {
                 'status': 'active',
                 'page_size': 300
             }
             
-            response = requests.get(users_url, headers=headers, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                users = data.get('users', [])
+            user_list = []
+            while True:
+                response = self.api_client.request('zoom', 'users', 'GET', users_url,
+                                                   headers=headers, params=params, timeout=30)
                 
-                user_list = []
-                for user in users:
-                    user_list.append({
-                        'id': user.get('id'),
-                        'email': user.get('email'),
-                        'display_name': user.get('display_name', user.get('email', 'Unknown User')),
-                        'first_name': user.get('first_name', ''),
-                        'last_name': user.get('last_name', ''),
-                        'type': user.get('type', 1)
-                    })
+                if response.status_code != 200:
+                    logger.error(f"Failed to get users: {response.status_code} - {response.text}")
+                    return user_list
                 
-                logger.info(f"Retrieved {len(user_list)} Zoom users")
-                return user_list
-            else:
-                logger.error(f"Failed to get users: {response.status_code} - {response.text}")
-                return []
+                data = response.json()
+                user_list.extend(self.format_user(user) for user in data.get('users', []))
+                
+                # Accounts with more than one page of users
+                if not data.get('next_page_token'):
+                    break
+                params['next_page_token'] = data['next_page_token']
+            
+            logger.info("Retrieved %d Zoom users", len(user_list))
+            return user_list
                 
         except Exception as e:
             logger.error(f"Exception getting Zoom users: {str(e)}")
             return []
     
+    @staticmethod
+    def format_user(user: Dict) -> Dict:
+        """User fields returned by the users listing"""
+        return {
+            'id': user.get('id'),
+            'email': user.get('email'),
+            'display_name': user.get('display_name', user.get('email', 'Unknown User')),
+            'first_name': user.get('first_name', ''),
+            'last_name': user.get('last_name', ''),
+            'type': user.get('type', 1)
+        }
+    
     def get_recordings(self, access_token: str, start_date: str, end_date: str, 
                       user_id: str = 'me') -> List[Dict]:
         """Get recordings for date range"""
+        recordings = []
+        for window in self.iter_recordings(access_token, start_date, end_date, user_id):
+            recordings.extend(window)
+        
+        logger.info("Retrieved %d meetings with recordings", len(recordings))
+        return recordings
+    
+    def iter_recordings(self, access_token: str, start_date: str, end_date: str,
+                        user_id: str = 'me') -> Iterator[List[Dict]]:
+        """Yield meetings with recordings one Zoom page (at most one 30-day window) at a time"""
         try:
-            recordings = []
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+            cursor = None
+            while True:
+                meetings, cursor = self.get_recordings_page(
+                    access_token, start_date, end_date, user_id, cursor=cursor
+                )
+                yield meetings
+                if not cursor:
+                    break
+            
+        except (ZoomError, CircuitOpenError):
+            # A missing window must not pass for an empty one
+            raise
+        except Exception as e:
+            logger.error(f"Exception getting recordings: {str(e)}")
+    
+    @instrumented('zoom')
+    def get_recordings_page(self, access_token: str, start_date: str, end_date: str,
+                            user_id: str = 'me', cursor: Optional[str] = None,
+                            page_size: int = 300) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of recordings and the cursor for the next page
+        
+        The cursor is opaque to callers; it records the current 30-day window
+        and Zoom's ``next_page_token`` inside it. Empty windows are skipped so a
+        page is only empty when the range is exhausted.
+        """
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        page_size = max(1, min(page_size, 300))
+        
+        position = self.decode_cursor(cursor) if cursor else {}
+        current_date = datetime.strptime(position['from'], '%Y-%m-%d') if position.get('from') else start_dt
+        page_token = position.get('token')
+        chunk_size = timedelta(days=30)
+        
+        headers = {'Authorization': f'Bearer {access_token}'}
+        recordings_url = self.recordings_url(user_id)
+        
+        while current_date <= end_dt:
+            chunk_end = min(current_date + chunk_size, end_dt)
             
-            current_date = start_dt
-            chunk_size = timedelta(days=30)
+            from_date = current_date.strftime('%Y-%m-%d')
+            to_date = chunk_end.strftime('%Y-%m-%d')
             
-            headers = {'Authorization': f'Bearer {access_token}'}
+            params = {
+                'from': from_date,
+                'to': to_date,
+                'page_size': page_size
+            }
+            if page_token:
+                params['next_page_token'] = page_token
             
-            if user_id and user_id != 'me':
-                recordings_url = f'https://api.zoom.us/v2/users/{user_id}/recordings'
-            else:
-                recordings_url = 'https://api.zoom.us/v2/users/me/recordings'
+            logger.debug("Fetching recordings from %s to %s", from_date, to_date)
             
-            while current_date <= end_dt:
-                chunk_end = min(current_date + chunk_size, end_dt)
-                
-                from_date = current_date.strftime('%Y-%m-%d')
-                to_date = chunk_end.strftime('%Y-%m-%d')
-                
-                params = {
-                    'from': from_date,
-                    'to': to_date,
-                    'page_size': 300
-                }
-                
-                logger.debug(f"Fetching recordings from {from_date} to {to_date}")
-                
-                response = requests.get(recordings_url, headers=headers, params=params, timeout=60)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    meetings = data.get('meetings', [])
-                    
-                    for meeting in meetings:
-                        if meeting.get('recording_files'):
-                            recordings.append({
-                                'topic': meeting.get('topic', 'Untitled Meeting'),
-                                'id': meeting.get('id'),
-                                'start_time': meeting.get('start_time'),
-                                'duration': meeting.get('duration', 0),
-                                'recording_count': meeting.get('recording_count', 0),
-                                'host_email': meeting.get('host_email', ''),
-                                'recording_files': meeting.get('recording_files', [])
-                            })
-                else:
-                    logger.warning(f"API error for chunk {from_date}-{to_date}: {response.status_code}")
+            response = self.api_client.request('zoom', 'recordings', 'GET', recordings_url,
+                                               headers=headers, params=params, timeout=60)
+            
+            page = []
+            page_token = None
+            if response.status_code == 200:
+                data = response.json()
+                meetings = data.get('meetings', [])
+                page_token = data.get('next_page_token') or None
                 
-                current_date = chunk_end + timedelta(days=1)
+                for meeting in meetings:
+                    if meeting.get('recording_files'):
+                        page.append(self.format_recording(meeting))
+            elif response.status_code in RETRYABLE_STATUSES:
+                # Retries are exhausted; skipping the window would silently lose its meetings
+                raise ZoomError(f"Zoom unavailable for {from_date} to {to_date}: {response.status_code}")
+            else:
+                logger.warning("API error for chunk %s-%s: %s", from_date, to_date, response.status_code)
+            
+            if page_token:
+                next_cursor = self.encode_cursor({'from': from_date, 'token': page_token})
+            elif chunk_end < end_dt:
+                next_date = chunk_end + timedelta(days=1)
+                next_cursor = self.encode_cursor({'from': next_date.strftime('%Y-%m-%d')})
+            else:
+                next_cursor = None
             
-            logger.info(f"Retrieved {len(recordings)} meetings with recordings")
-            return recordings
+            if page or not next_cursor:
+                return page, next_cursor
             
-        except Exception as e:
-            logger.error(f"Exception getting recordings: {str(e)}")
-            return []
+            # Nothing in this window, move on without a round-trip to the caller
+            position = self.decode_cursor(next_cursor)
+            current_date = datetime.strptime(position['from'], '%Y-%m-%d')
+            page_token = position.get('token')
+        
+        return [], None
+    
+    def recordings_url(self, user_id: str = 'me') -> str:
+        """Recordings listing URL for a user"""
+        if user_id and user_id != 'me':
+            return f'{self.base_url}/users/{user_id}/recordings'
+        return f'{self.base_url}/users/me/recordings'
+    
+    def recording_files_url(self, meeting_id) -> str:
+        """Recording details URL for a meeting ID or instance UUID"""
+        meeting_id = str(meeting_id)
+        encoded = quote(meeting_id, safe='')
+        if meeting_id.startswith('/') or '//' in meeting_id:
+            # Zoom requires such UUIDs to be double-encoded
+            encoded = quote(encoded, safe='')
+        return f'{self.base_url}/meetings/{encoded}/recordings'
+    
+    @staticmethod
+    def date_windows(start_date: str, end_date: str, days: int = 30) -> List[Tuple[str, str]]:
+        """Split a date range into the windows the recordings API accepts"""
+        current_date = datetime.strptime(start_date, '%Y-%m-%d')
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        windows = []
+        while current_date <= end_dt:
+            chunk_end = min(current_date + timedelta(days=days), end_dt)
+            windows.append((current_date.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')))
+            current_date = chunk_end + timedelta(days=1)
+        return windows
+    
+    @staticmethod
+    def format_recording(meeting: Dict) -> Dict:
+        """Meeting fields returned by the recordings listing"""
+        return {
+            'topic': meeting.get('topic', 'Untitled Meeting'),
+            'id': meeting.get('id'),
+            'uuid': meeting.get('uuid'),
+            'start_time': meeting.get('start_time'),
+            'duration': meeting.get('duration', 0),
+            'recording_count': meeting.get('recording_count', 0),
+            'host_email': meeting.get('host_email', ''),
+            'recording_files': meeting.get('recording_files', [])
+        }
     
+    @staticmethod
+    def encode_cursor(position: Dict) -> str:
+        """Encode a listing position as an opaque URL-safe cursor"""
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict:
+        """Decode a cursor from encode_cursor, raising ValueError if malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            datetime.strptime(position['from'], '%Y-%m-%d')
+            return position
+        except Exception:
+            raise ValueError(f'Invalid cursor: {cursor}')
+    
+    @staticmethod
+    def summarize_meeting(meeting: Dict) -> Dict:
+        """Lean projection of a meeting without recording file details"""
+        files = meeting.get('recording_files', [])
+        return {
+            'topic': meeting.get('topic'),
+            'id': meeting.get('id'),
+            'uuid': meeting.get('uuid'),
+            'start_time': meeting.get('start_time'),
+            'duration': meeting.get('duration', 0),
+            'recording_count': meeting.get('recording_count', len(files)),
+            'host_email': meeting.get('host_email', ''),
+            'file_count': len(files),
+            'total_size': sum(f.get('file_size', 0) or 0 for f in files)
+        }
+    
+    @instrumented('zoom')
     def get_recording_files(self, access_token: str, meeting_id: str) -> List[Dict]:
         """Get recording files for a specific meeting"""
         try:
-            details_url = f'https://api.zoom.us/v2/meetings/{meeting_id}/recordings'
+            details_url = self.recording_files_url(meeting_id)
             headers = {'Authorization': f'Bearer {access_token}'}
             
-            response = requests.get(details_url, headers=headers, timeout=30)
+            response = self.api_client.request('zoom', 'recording_files', 'GET', details_url,
+                                               headers=headers, timeout=30)
             
             if response.status_code == 200:
                 return response.json().get('recording_files', [])
@@ -160,8 +334,49 @@ class ZoomService:
             logger.error(f"Exception getting recording files: {str(e)}")
             return []
     
-    def download_video(self, access_token: str, recording_file: Dict) -> Optional[str]:
-        """Download a video file from Zoom"""
+    @staticmethod
+    def select_video_file(recording_files: List[Dict], preference: Optional[List[str]] = None,
+                          policy: str = 'smallest', max_bytes: Optional[int] = None) -> Optional[Dict]:
+        """Pick the MP4 variant to download.
+
+        Only completed MP4s of a recording type in ``preference`` qualify,
+        falling back to any MP4 when none do. ``smallest`` takes the smallest
+        qualifying file among the best content tier available (screen with
+        speaker over speaker only over screen only), so size never costs the
+        upload its speaker or its slides; ``preferred`` takes the first type
+        in ``preference`` order and uses size only to break ties. Files over
+        ``max_bytes`` are passed over while a smaller variant exists.
+        """
+        preference = preference or DEFAULT_RECORDING_TYPE_PREFERENCE
+        rank = {recording_type: i for i, recording_type in enumerate(preference)}
+
+        mp4s = [f for f in recording_files
+                if f.get('file_type', '').upper() == 'MP4' and f.get('status', 'completed') == 'completed']
+        if not mp4s:
+            return None
+
+        candidates = [f for f in mp4s if f.get('recording_type') in rank] or mp4s
+        if max_bytes:
+            candidates = [f for f in candidates if (f.get('file_size') or 0) <= max_bytes] or candidates
+
+        def size(f):
+            return f.get('file_size') or 0
+
+        def type_rank(f):
+            return rank.get(f.get('recording_type'), len(rank))
+
+        def tier(f):
+            return RECORDING_TYPE_TIERS.get(f.get('recording_type'), len(RECORDING_TYPE_TIERS))
+
+        if policy == 'preferred':
+            return min(candidates, key=lambda f: (type_rank(f), size(f)))
+        best_tier = min(tier(f) for f in candidates)
+        return min((f for f in candidates if tier(f) == best_tier), key=lambda f: (size(f), type_rank(f)))
+    
+    @instrumented('zoom', size=result_file_size)
+    def download_video(self, access_token: str, recording_file: Dict,
+                       job_id: Optional[str] = None) -> Optional[str]:
+        """Download a video file from Zoom, named per job so jobs never share a partial file"""
         try:
             download_url = recording_file.get('download_url')
             if not download_url:
@@ -180,25 +395,60 @@ class ZoomService:
             else:
                 download_url += f'?access_token={access_token}'
             
-            response = requests.get(download_url, headers=headers, stream=True, timeout=300)
-            
-            if response.status_code == 200:
-                file_extension = recording_file.get('file_type', 'mp4').lower()
-                file_id = recording_file.get('id', 'temp')
+            file_extension = recording_file.get('file_type', 'mp4').lower()
+            file_id = recording_file.get('id', 'temp')
+            if job_id:
+                file_name = f"zoom_video_{job_id}_{file_id}.{file_extension}"
+            else:
                 file_name = f"zoom_video_{file_id}.{file_extension}"
-                file_path = download_dir / file_name
-                
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
+            file_path = download_dir / file_name
+            partial_path = download_dir / (file_name + PARTIAL_SUFFIX)
+            expected_size = recording_file.get('file_size') or 0
+            
+            throttle = None
+            if self.bandwidth_limiter and self.bandwidth_limiter.is_limited(INGRESS):
+                throttle = partial(self.bandwidth_limiter.throttle, INGRESS)
+            
+            # Write under a partial name so interrupted downloads are easy to sweep
+            with metrics.time_call('zoom', 'download') as call:
+                written = None
+                if self.downloader.should_segment(expected_size):
+                    written = self.downloader.download(download_url, headers, str(partial_path), expected_size, throttle)
+                if written is None:
+                    written = self._stream_download(download_url, headers, partial_path, throttle)
+                if written is None:
+                    call.fail()
+                    return None
                 
-                logger.info(f"Downloaded video: {file_name}")
-                return str(file_path)
-            else:
-                logger.error(f"Download failed: {response.status_code}")
-                return None
+                metrics.inc('transfer_bytes_total', written, direction='download')
+                if expected_size and written != expected_size:
+                    logger.error(f"Download of {file_name} is {written} bytes, expected {expected_size}")
+                    partial_path.unlink(missing_ok=True)
+                    call.fail()
+                    return None
+            
+            os.replace(partial_path, file_path)
+            logger.info("Downloaded video: %s", file_name)
+            return str(file_path)
                 
         except Exception as e:
             logger.error(f"Exception downloading video: {str(e)}")
             return None
+    
+    def _stream_download(self, download_url: str, headers: Dict, partial_path: Path,
+                         throttle: Optional[Callable[[int], None]] = None) -> Optional[int]:
+        """Download over a single connection, returning the bytes written"""
+        response = self.downloader.get('download_stream', download_url, headers)
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Download failed: {response.status_code}")
+                return None
+            
+            written = 0
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.downloader.buffer_size):
+                    if throttle:
+                        throttle(len(chunk))
+                    f.write(chunk)
+                    written += len(chunk)
+            return written
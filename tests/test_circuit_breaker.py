@@ -0,0 +1,74 @@
+# tests/test_circuit_breaker.py - Breaker state transitions shared through the state files
+from types import SimpleNamespace
+
+from services.circuit_breaker import CircuitBreakers
+
+def make_breakers(tmp_path, **kwargs):
+    return CircuitBreakers(SimpleNamespace(DOWNLOAD_FOLDER=str(tmp_path)), **kwargs)
+
+def expire(breakers, api, seconds):
+    """Move the breaker's clock back, as if ``seconds`` had passed"""
+    breakers._transition(api, lambda state, failures, opened_at, probe_at, now:
+                         (None, (state, failures, opened_at - seconds, probe_at - seconds)))
+
+def test_opens_after_consecutive_failures(tmp_path):
+    breakers = make_breakers(tmp_path, failure_threshold=3)
+
+    breakers.record_failure('zoom')
+    breakers.record_failure('zoom')
+    breakers.record_success('zoom')
+    breakers.record_failure('zoom')
+    breakers.record_failure('zoom')
+    assert breakers.allow('zoom')
+
+    breakers.record_failure('zoom')
+    assert not breakers.allow('zoom')
+    assert breakers.status('zoom')['state'] == 'open'
+    # Breakers are per API
+    assert breakers.allow('youtube')
+
+def test_one_probe_after_the_reset_and_its_outcome_decides(tmp_path):
+    breakers = make_breakers(tmp_path, failure_threshold=1, reset_seconds=30)
+    breakers.record_failure('zoom')
+    expire(breakers, 'zoom', 31)
+
+    assert breakers.allow('zoom')
+    assert breakers.status('zoom')['state'] == 'half_open'
+    assert not breakers.allow('zoom')
+
+    breakers.record_failure('zoom')
+    assert breakers.status('zoom')['state'] == 'open'
+
+    expire(breakers, 'zoom', 31)
+    assert breakers.allow('zoom')
+    breakers.record_success('zoom')
+    assert breakers.status('zoom') == {'state': 'closed', 'failures': 0, 'retry_in': 0}
+
+def test_released_probe_lets_the_next_caller_probe(tmp_path):
+    breakers = make_breakers(tmp_path, failure_threshold=1, reset_seconds=30)
+    breakers.record_failure('zoom')
+    expire(breakers, 'zoom', 31)
+    assert breakers.allow('zoom')
+
+    breakers.release('zoom')
+
+    assert breakers.allow('zoom')
+
+def test_probe_that_never_reports_is_replaced(tmp_path):
+    breakers = make_breakers(tmp_path, failure_threshold=1, reset_seconds=30, probe_timeout=120)
+    breakers.record_failure('zoom')
+    expire(breakers, 'zoom', 31)
+    assert breakers.allow('zoom')
+    assert not breakers.allow('zoom')
+
+    expire(breakers, 'zoom', 121)
+
+    assert breakers.allow('zoom')
+
+def test_state_is_shared_between_instances(tmp_path):
+    first = make_breakers(tmp_path, failure_threshold=1)
+    second = make_breakers(tmp_path, failure_threshold=1)
+
+    first.record_failure('eventbrite')
+
+    assert not second.allow('eventbrite')
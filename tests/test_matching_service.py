@@ -0,0 +1,64 @@
+# tests/test_matching_service.py - Meeting/event scoring and the matching window
+from services.matching_service import MatchingService
+
+def event(event_id, name, start, end):
+    return {'id': event_id, 'name': {'text': name}, 'start': {'utc': start}, 'end': {'utc': end}}
+
+MEETING = {'id': 1, 'topic': 'Community Town Hall', 'start_time': '2024-03-01T15:00:00Z', 'duration': 60}
+
+def test_exact_match_scores_highest():
+    events = [
+        event('a', 'Unrelated Workshop', '2024-03-01T16:30:00Z', '2024-03-01T17:30:00Z'),
+        event('b', 'Community Town Hall', '2024-03-01T15:00:00Z', '2024-03-01T16:00:00Z'),
+    ]
+    service = MatchingService(config=None)
+
+    candidates = service.score_candidates(MEETING, service.build_index(events))
+
+    assert [candidate['event_id'] for candidate in candidates] == ['b', 'a']
+    assert candidates[0]['score'] == 1.0
+    assert candidates[0]['components'] == {'time': 1.0, 'overlap': 1.0, 'title': 1.0}
+
+def test_events_outside_the_window_are_not_candidates():
+    events = [
+        event('early', 'Community Town Hall', '2024-03-01T11:59:00Z', '2024-03-01T12:59:00Z'),
+        event('edge', 'Community Town Hall', '2024-03-01T18:00:00Z', '2024-03-01T19:00:00Z'),
+        event('late', 'Community Town Hall', '2024-03-01T18:01:00Z', '2024-03-01T19:01:00Z'),
+    ]
+    service = MatchingService(config=None, window_minutes=180)
+
+    candidates = service.score_candidates(MEETING, service.build_index(events))
+
+    assert [candidate['event_id'] for candidate in candidates] == ['edge']
+    assert candidates[0]['components']['time'] == 0.0
+
+def test_duplicate_and_undated_events_are_indexed_once():
+    events = [
+        event('a', 'Town Hall', '2024-03-01T15:00:00Z', '2024-03-01T16:00:00Z'),
+        event('a', 'Town Hall', '2024-03-01T15:00:00Z', '2024-03-01T16:00:00Z'),
+        {'id': 'b', 'name': {'text': 'No date'}, 'start': {}},
+    ]
+
+    starts, intervals = MatchingService(config=None).build_index(events)
+
+    assert len(starts) == len(intervals) == 1
+
+def test_interval_overlap_is_intersection_over_union():
+    service = MatchingService(config=None)
+    starts, _ = service.build_index([event('a', 'x', '2024-03-01T15:00:00Z', '2024-03-01T17:00:00Z')])
+    start = starts[0]
+    hour = start.replace(hour=16) - start
+
+    assert service.interval_overlap(start, start + 2 * hour, start + hour, start + 3 * hour) == 1 / 3
+    assert service.interval_overlap(start, start + hour, start + 2 * hour, start + 3 * hour) == 0.0
+
+def test_proposals_are_ranked_and_cut_to_max_candidates():
+    meetings = [MEETING, dict(MEETING, id=2, topic='Board Meeting', start_time='2024-03-05T15:00:00Z')]
+    events = [event(str(i), 'Community Town Hall', f'2024-03-01T15:{i:02d}:00Z', f'2024-03-01T16:{i:02d}:00Z')
+              for i in range(5)]
+
+    proposals = MatchingService(config=None).propose_matches(meetings, events, max_candidates=2)
+
+    assert [proposal['meeting']['id'] for proposal in proposals] == [1, 2]
+    assert len(proposals[0]['candidates']) == 2
+    assert proposals[1]['candidates'] == []
@@ -0,0 +1,53 @@
+# tests/test_retry_service.py - Retry-After parsing, backoff and per-call deadlines
+import time
+from email.utils import formatdate
+
+import pytest
+
+from services.retry_service import RetryPolicy
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'Retry-After': '7'}, 7),
+    ({'X-RateLimit-Reset': str(int(time.time()) + 30)}, 30),
+    ({'Retry-After': formatdate(time.time() + 60, usegmt=True)}, 60),
+    ({'X-Rate-Limit-Reset': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + 90))}, 90),
+])
+def test_retry_after_reads_delays_timestamps_and_dates(headers, expected):
+    assert RetryPolicy().retry_after(headers) == pytest.approx(expected, abs=2)
+
+def test_retry_after_ignores_unparseable_values():
+    assert RetryPolicy().retry_after({'Retry-After': 'soon'}) is None
+    assert RetryPolicy().retry_after({}) is None
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    for attempt in range(8):
+        assert 0 <= policy.backoff(attempt) <= min(5.0, 2 ** attempt)
+
+def test_delay_prefers_the_server_hint():
+    policy = RetryPolicy(base_delay=1.0)
+
+    delay = policy.delay(0, FakeResponse(429, {'Retry-After': '3'}))
+
+    assert 3 <= delay <= 4
+
+def test_delay_gives_up_on_client_errors_long_hints_and_spent_retries():
+    policy = RetryPolicy(max_retries=2, max_wait=10)
+
+    assert policy.delay(0, FakeResponse(404)) is None
+    assert policy.delay(0, FakeResponse(429, {'Retry-After': '11'})) is None
+    assert policy.delay(2, FakeResponse(503)) is None
+    assert policy.delay(1, FakeResponse(503)) is not None
+
+def test_delay_gives_up_when_the_wait_would_outlast_the_deadline():
+    policy = RetryPolicy(max_wait=120)
+    response = FakeResponse(429, {'Retry-After': '20'})
+
+    assert policy.delay(0, response, remaining=15) is None
+    assert policy.delay(0, response, remaining=30) is not None
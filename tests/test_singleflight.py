@@ -0,0 +1,95 @@
+# tests/test_singleflight.py - Coalescing identical calls within and across workers
+import fcntl
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+def make_flight(tmp_path, **kwargs):
+    return SingleFlight(SimpleNamespace(DOWNLOAD_FOLDER=str(tmp_path)), **kwargs)
+
+def run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results, errors
+
+def test_concurrent_callers_share_one_call(tmp_path):
+    flight = make_flight(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'events': len(calls)}
+
+    results, errors = run_concurrently(5, lambda: flight.do('events', 'org1:2024-03-01', fetch))
+
+    assert calls == [1]
+    assert errors == [None] * 5
+    assert all(result is results[0] for result in results)
+
+def test_waiting_callers_get_the_leaders_exception(tmp_path):
+    flight = make_flight(tmp_path)
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('upstream down')
+
+    leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, flight.do, 'events', 'key', fail))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(RuntimeError):
+        flight.do('events', 'key', lambda: 'not called')
+    leader.join()
+
+def test_different_keys_do_not_wait_on_each_other(tmp_path):
+    flight = make_flight(tmp_path)
+
+    assert flight.do('events', 'a', lambda: 'a') == 'a'
+    assert flight.do('events', 'b', lambda: 'b') == 'b'
+
+def test_other_workers_result_is_reused_after_its_lock_is_released(tmp_path):
+    flight = make_flight(tmp_path, poll_seconds=0.01)
+    stored = {}
+
+    # Another worker holds the key's lock while it calls out
+    other_worker = open(flight._lock_path('key'), 'a+b')
+    fcntl.flock(other_worker, fcntl.LOCK_EX)
+
+    def finish_other_worker():
+        time.sleep(0.1)
+        stored['key'] = 'from other worker'
+        fcntl.flock(other_worker, fcntl.LOCK_UN)
+        other_worker.close()
+
+    threading.Thread(target=finish_other_worker).start()
+    result = flight.do('events', 'key', lambda: 'called out', recheck=lambda: stored.get('key'))
+
+    assert result == 'from other worker'
+
+def test_calls_out_itself_when_the_other_worker_stored_nothing(tmp_path):
+    flight = make_flight(tmp_path, wait_seconds=0.1, poll_seconds=0.01)
+
+    with open(flight._lock_path('key'), 'a+b') as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        # The other worker never finishes within wait_seconds
+        result = flight.do('events', 'key', lambda: 'called out', recheck=lambda: None)
+
+    assert result == 'called out'
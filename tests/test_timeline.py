@@ -0,0 +1,51 @@
+# tests/test_timeline.py - Per-match timing and job summaries
+from utils import timeline
+
+def finished_item(title, state, total, **fields):
+    item = timeline.new_item(title)
+    item.update(state=state, total_seconds=total, **fields)
+    return item
+
+def test_timed_adds_up_repeated_stages_also_when_they_fail():
+    item = timeline.new_item('Town Hall')
+
+    with timeline.timed(item, 'download'):
+        pass
+    try:
+        with timeline.timed(item, 'download'):
+            raise IOError('dropped')
+    except IOError:
+        pass
+
+    assert item['download_seconds'] is not None
+    assert item['upload_seconds'] is None
+
+def test_summarize_totals_rates_and_slowest():
+    items = [
+        finished_item('A', 'uploaded', 30, download_bytes=100, download_seconds=2, upload_bytes=100,
+                      upload_seconds=4, quota_units=1700, dedupe_seconds=1),
+        finished_item('B', 'failed', 50, download_bytes=300, download_seconds=2),
+        finished_item('C', 'skipped', 5, quota_units=100),
+        timeline.new_item('D'),
+    ]
+
+    summary = timeline.summarize(items, started=1000, finished=1100, slowest=2)
+
+    assert summary['elapsed_seconds'] == 100
+    assert summary['items'] == 4
+    assert summary['finished_items'] == 3
+    assert summary['states'] == {'uploaded': 1, 'failed': 1, 'skipped': 1, 'queued': 1}
+    assert summary['items_per_hour'] == 108
+    assert summary['download_bytes_per_second'] == 100
+    assert summary['upload_bytes_per_second'] == 25
+    assert summary['quota_units'] == 1800
+    assert list(summary['stage_seconds']) == list(timeline.STAGES)
+    assert summary['stage_seconds']['download'] == 4
+    assert [entry['title'] for entry in summary['slowest']] == ['B', 'A']
+
+def test_summarize_without_transfers_has_no_rates():
+    summary = timeline.summarize([timeline.new_item('A')], started=0, finished=10)
+
+    assert summary['download_bytes_per_second'] is None
+    assert summary['upload_bytes_per_second'] is None
+    assert summary['slowest'] == []
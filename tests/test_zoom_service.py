@@ -0,0 +1,59 @@
+# tests/test_zoom_service.py - Listing cursors and recording selection
+import pytest
+
+from services.zoom_service import ZoomService
+
+def recording(recording_type, size, file_type='MP4', status='completed'):
+    return {'id': recording_type, 'recording_type': recording_type, 'file_size': size,
+            'file_type': file_type, 'status': status}
+
+def test_cursor_round_trips_and_is_url_safe():
+    position = {'from': '2024-03-01', 'token': 'abc/+=='}
+    cursor = ZoomService.encode_cursor(position)
+
+    assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+    assert ZoomService.decode_cursor(cursor) == position
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', ZoomService.encode_cursor({'from': 'March'}),
+                                    ZoomService.encode_cursor({'token': 'abc'})])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        ZoomService.decode_cursor(cursor)
+
+def test_smallest_stays_within_the_best_tier():
+    files = [recording('shared_screen_with_speaker_view', 300), recording('shared_screen_with_gallery_view', 200),
+             recording('speaker_view', 50), recording('shared_screen', 10)]
+
+    assert ZoomService.select_video_file(files)['recording_type'] == 'shared_screen_with_gallery_view'
+
+def test_smallest_falls_back_to_speaker_before_screen_only():
+    files = [recording('speaker_view', 80), recording('active_speaker', 60), recording('shared_screen', 10)]
+
+    assert ZoomService.select_video_file(files)['recording_type'] == 'active_speaker'
+
+def test_preferred_follows_preference_order():
+    files = [recording('shared_screen_with_speaker_view', 300), recording('speaker_view', 50)]
+
+    chosen = ZoomService.select_video_file(files, ['speaker_view', 'shared_screen_with_speaker_view'], 'preferred')
+    assert chosen['recording_type'] == 'speaker_view'
+
+def test_files_over_the_size_limit_are_passed_over_while_a_smaller_one_exists():
+    files = [recording('shared_screen_with_speaker_view', 900), recording('speaker_view', 100)]
+
+    assert ZoomService.select_video_file(files, max_bytes=500)['recording_type'] == 'speaker_view'
+    assert ZoomService.select_video_file(files, max_bytes=50)['recording_type'] == 'shared_screen_with_speaker_view'
+
+def test_only_completed_mp4s_qualify():
+    files = [recording('audio_only', 5, file_type='M4A'),
+             recording('shared_screen_with_speaker_view', 100, status='processing')]
+
+    assert ZoomService.select_video_file(files) is None
+
+def test_recording_files_url_encodes_uuids():
+    service = ZoomService.__new__(ZoomService)
+    service.base_url = 'https://api.zoom.us/v2'
+
+    assert service.recording_files_url(123) == 'https://api.zoom.us/v2/meetings/123/recordings'
+    assert service.recording_files_url('ab+c==') == 'https://api.zoom.us/v2/meetings/ab%2Bc%3D%3D/recordings'
+    # Zoom requires UUIDs starting with / or containing // to be encoded twice
+    assert service.recording_files_url('/ab//c') == 'https://api.zoom.us/v2/meetings/%252Fab%252F%252Fc/recordings'
@@ -29,3 +29,21 @@ class ZoomError(ZoomAppException):
 class EventbriteError(ZoomAppException):
     """Eventbrite API related errors"""
     pass
+
+class DownloadAdmissionError(ZoomAppException):
+    """A recording download was not admitted"""
+    pass
+
+class VideoTooLargeError(DownloadAdmissionError):
+    """Recording is larger than the max_video_size_mb setting"""
+    pass
+
+class InsufficientDiskSpaceError(DownloadAdmissionError):
+    """Not enough disk budget to start a download in time"""
+    pass
+
+class CircuitOpenError(APIError):
+    """Calls to an upstream API fail fast while its circuit breaker is open"""
+    def __init__(self, api):
+        super().__init__(f"{api} is unavailable (circuit open)", status_code=503)
+        self.api = api
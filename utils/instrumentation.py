@@ -0,0 +1,159 @@
+"""Timing, size and outcome records for service calls"""
+
+import os
+import time
+import logging
+import contextvars
+from functools import wraps
+from typing import Callable, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger('instrumentation')
+
+_enabled = True
+
+_current_call = contextvars.ContextVar('current_call', default=None)
+
+def configure(enabled: bool):
+    """Turn instrumentation on or off for this process"""
+    global _enabled
+    _enabled = enabled
+
+class CallRecord:
+    """What one instrumented call did; code inside the call adds retries"""
+
+    __slots__ = ('service', 'method', 'retries', 'external_calls', 'external_failed')
+
+    def __init__(self, service: str, method: str):
+        self.service = service
+        self.method = method
+        self.retries = 0
+        self.external_calls = 0
+        # Set by the last external call, so a retried call that succeeded counts as success
+        self.external_failed = False
+
+def current_call() -> Optional[CallRecord]:
+    """The innermost instrumented call running in this context, if any"""
+    return _current_call.get()
+
+def record_retry():
+    """Count a retry against the current instrumented call"""
+    call = _current_call.get()
+    if call is not None:
+        call.retries += 1
+
+def _record_external_call(api: str, operation: str, failed: bool):
+    call = _current_call.get()
+    if call is not None:
+        call.external_calls += 1
+        call.external_failed = failed
+
+# Calls timed with metrics.time_call decide the outcome of the service method around them
+metrics.add_call_listener(_record_external_call)
+
+def result_count(result, args, kwargs) -> Optional[int]:
+    """Number of items returned; paged results count the page"""
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        result = result[0]
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return None
+
+def result_file_size(result, args, kwargs) -> Optional[int]:
+    """Size in bytes of the file whose path was returned"""
+    try:
+        return os.path.getsize(result) if result else None
+    except OSError:
+        return None
+
+def argument_file_size(name: str, position: int) -> Callable:
+    """Size in bytes of a file path argument, found by keyword or position (self is 0)"""
+    def size(result, args, kwargs) -> Optional[int]:
+        path = kwargs.get(name, args[position] if len(args) > position else None)
+        try:
+            return os.path.getsize(path) if path else None
+        except OSError:
+            return None
+    return size
+
+def call_outcome(result) -> Optional[str]:
+    """Failures reported by returning None or {'success': False}"""
+    if result is None:
+        return 'error'
+    if isinstance(result, dict) and result.get('success') is False:
+        return 'error'
+    return None
+
+def outcome_from_calls(result) -> Optional[str]:
+    """For methods whose None result is not a failure; only the external calls decide"""
+    return None
+
+def _outcome(call: CallRecord, reported: Optional[str]) -> str:
+    if reported:
+        return reported
+    if not call.external_calls:
+        return 'cached'
+    return 'error' if call.external_failed else 'success'
+
+def instrumented(service: str, size: Optional[Callable] = result_count,
+                 outcome: Callable = call_outcome):
+    """Record duration, payload size, retries and outcome of a service method.
+
+    The outcome follows the external calls the method timed with
+    ``metrics.time_call``: ``error`` when the last one failed, ``cached``
+    when it made none. ``outcome`` may report a failure from the result
+    first, and ``size`` reads the payload size from it. Each call is logged
+    to the ``instrumentation`` logger with the fields in ``extra`` and
+    counted in /metrics. When instrumentation is disabled the wrapper only
+    checks a flag before calling through.
+    """
+    def decorator(func):
+        method = func.__name__.lstrip('_')
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            call = CallRecord(service, method)
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            result_outcome = 'error'
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                result_outcome = _outcome(call, outcome(result))
+                return result
+            finally:
+                _current_call.reset(token)
+                duration = time.perf_counter() - start
+                payload = size(result, args, kwargs) if size and result_outcome != 'error' else None
+                _record(call, result_outcome, duration, payload)
+
+        return wrapper
+    return decorator
+
+def _record(call: CallRecord, outcome: str, duration: float, payload: Optional[int]):
+    labels = {'service': call.service, 'method': call.method}
+    metrics.observe('service_call_duration_seconds', duration, outcome=outcome, **labels)
+    if payload:
+        metrics.inc('service_call_payload_total', payload, **labels)
+    if call.retries:
+        metrics.inc('service_call_retries_total', call.retries, **labels)
+
+    # The structured fields are only built when the record will be written
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info(
+        "%s.%s %s in %.0f ms (size=%s, retries=%d)",
+        call.service, call.method, outcome, duration * 1000, payload, call.retries,
+        extra={
+            'service': call.service,
+            'method': call.method,
+            'outcome': outcome,
+            'duration_ms': round(duration * 1000, 1),
+            'size': payload,
+            'retries': call.retries,
+        }
+    )
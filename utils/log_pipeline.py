@@ -0,0 +1,114 @@
+"""Asynchronous structured logging with request and job correlation IDs"""
+
+import os
+import json
+import queue
+import logging
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator, List, Optional
+
+from utils.metrics import metrics
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_job_id = contextvars.ContextVar('job_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+def bind_request(request_id: Optional[str]) -> contextvars.Token:
+    """Tag log records from this context with ``request_id``; pass the token to ``unbind_request``"""
+    return _request_id.set(request_id)
+
+def unbind_request(token: contextvars.Token):
+    _request_id.reset(token)
+
+@contextmanager
+def correlation(job_id: Optional[str] = None, request_id: Optional[str] = None) -> Iterator[None]:
+    """Tag log records written inside the block, e.g. by a background job"""
+    job_token = _job_id.set(job_id)
+    request_token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(request_token)
+        _job_id.reset(job_token)
+
+class CorrelationFilter(logging.Filter):
+    """Copy the correlation IDs onto the record in the thread that logged it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.job_id = _job_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including fields passed through ``extra``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'job_id': getattr(record, 'job_id', None),
+            'thread': record.threadName,
+            'source': f"{record.module}:{record.lineno}",
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS and name not in payload:
+                payload[name] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+class LazyQueueHandler(QueueHandler):
+    """Enqueue records without formatting them; the listener thread does that.
+
+    The stock QueueHandler formats in the caller so records can be pickled;
+    this queue never leaves the process. When the queue is full the record
+    is dropped and counted rather than blocking the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc('log_records_dropped_total')
+
+class LogPipeline:
+    """Loggers put records on a queue; one thread per process writes them out"""
+
+    def __init__(self, handlers: List[logging.Handler], max_queued: int = 10000):
+        self.handlers = handlers
+        self.max_queued = max_queued
+        self.handler = LazyQueueHandler(queue.Queue(max_queued))
+        self.handler.addFilter(CorrelationFilter())
+        self.listener: Optional[QueueListener] = None
+
+    def start(self):
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        # The listener thread does not survive gunicorn's fork; each worker starts its own
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _restart_in_child(self):
+        # The parent's queue lock may have been held mid-fork, so start from a fresh queue
+        self.handler.queue = queue.Queue(self.max_queued)
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Write out everything still queued"""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
@@ -0,0 +1,276 @@
+"""Prometheus-style metrics shared across gunicorn workers"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; external calls range from token fetches to multi-minute downloads
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+DESCRIPTIONS = {
+    'external_call_duration_seconds': ('histogram', 'Latency of calls to Zoom, Eventbrite and YouTube'),
+    'external_calls_total': ('counter', 'Calls to Zoom, Eventbrite and YouTube by outcome'),
+    'external_call_errors_total': ('counter', 'Failed calls to Zoom, Eventbrite and YouTube'),
+    'transfer_bytes_total': ('counter', 'Recording bytes downloaded from Zoom and uploaded to YouTube'),
+    'cache_requests_total': ('counter', 'Cache lookups by result'),
+    'cache_hit_ratio': ('gauge', 'Share of cache lookups served from the cache'),
+    'processing_jobs_active': ('gauge', 'Background processing jobs currently running'),
+    'processing_queue_depth': ('gauge', 'Matches waiting to be processed in running jobs'),
+    'service_call_duration_seconds': ('histogram', 'Duration of service methods by outcome (success, error or cached when no external call was made)'),
+    'service_call_payload_total': ('counter', 'Items or bytes returned or sent by service methods'),
+    'service_call_retries_total': ('counter', 'Retries made inside service methods'),
+    'api_retries_total': ('counter', 'Retried Zoom, Eventbrite and YouTube calls by reason'),
+    'circuit_transitions_total': ('counter', 'Circuit breaker state changes by API and new state'),
+    'circuit_rejections_total': ('counter', 'API calls failed fast by an open circuit breaker'),
+    'singleflight_shared_total': ('counter', 'Upstream calls answered by an identical call already in flight'),
+    'log_records_dropped_total': ('counter', 'Log records dropped because the log queue was full'),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+class CallTimer:
+    """Outcome of one timed external call; services mark failures explicitly
+    because they usually catch their own exceptions"""
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+    def check(self, response, expected=(200,)):
+        """Mark the call failed unless the HTTP response has an expected status"""
+        if response.status_code not in expected:
+            self.fail()
+        return response
+
+class MetricsRegistry:
+    """Counters, gauges and histograms kept in process memory.
+
+    Each process periodically writes a snapshot to ``<folder>/<pid>.json``;
+    ``collect()`` merges every snapshot so a scrape of any worker reports
+    the whole server. Gauges of processes that have exited are ignored.
+    """
+
+    def __init__(self, flush_interval: float = 5):
+        self.flush_interval = flush_interval
+        self._call_listeners: List[Callable[[str, str, bool], None]] = []
+        self.folder: Optional[str] = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List]] = {}
+        self._flushed_at = 0.0
+
+    def configure(self, folder: str):
+        """Start sharing snapshots through ``folder``"""
+        self.folder = folder
+
+    def _check_fork(self):
+        # Workers forked from a preloaded master start with empty metrics
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._check_fork()
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+        self.flush()
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._check_fork()
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+        self.flush()
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        with self._lock:
+            self._check_fork()
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            # [bucket upper bounds, per-bucket counts (+Inf last), sum, count]
+            entry = series.setdefault(key, [list(buckets), [0] * (len(buckets) + 1), 0.0, 0])
+            index = next((i for i, bound in enumerate(entry[0]) if value <= bound), len(entry[0]))
+            entry[1][index] += 1
+            entry[2] += value
+            entry[3] += 1
+        self.flush()
+
+    def add_call_listener(self, listener: Callable[[str, str, bool], None]):
+        """Call ``listener(api, operation, failed)`` after every timed external call"""
+        self._call_listeners.append(listener)
+
+    @contextmanager
+    def time_call(self, api: str, operation: str) -> Iterator[CallTimer]:
+        """Record latency and outcome of one external call"""
+        call = CallTimer()
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call.fail()
+            raise
+        finally:
+            self.observe('external_call_duration_seconds', time.perf_counter() - start,
+                         api=api, operation=operation)
+            outcome = 'error' if call.failed else 'success'
+            self.inc('external_calls_total', api=api, operation=operation, outcome=outcome)
+            if call.failed:
+                self.inc('external_call_errors_total', api=api, operation=operation)
+            for listener in self._call_listeners:
+                listener(api, operation, call.failed)
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._check_fork()
+            return {
+                'pid': self._pid,
+                'counters': [[name, list(key), value]
+                             for name, series in self._counters.items() for key, value in series.items()],
+                'gauges': [[name, list(key), value]
+                           for name, series in self._gauges.items() for key, value in series.items()],
+                'histograms': [[name, list(key)] + [list(entry[0]), list(entry[1]), entry[2], entry[3]]
+                               for name, series in self._histograms.items() for key, entry in series.items()],
+            }
+
+    def flush(self, force: bool = False):
+        """Write this process's snapshot if the last one is older than the flush interval"""
+        if not self.folder or (not force and time.monotonic() - self._flushed_at < self.flush_interval):
+            return
+        self._flushed_at = time.monotonic()
+        try:
+            snapshot = self.snapshot()
+            path = os.path.join(self.folder, f"{snapshot['pid']}.json")
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _snapshots(self) -> List[Dict]:
+        snapshots = [self.snapshot()]
+        if not self.folder:
+            return snapshots
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return snapshots
+        for name in names:
+            if not name.endswith('.json') or name == f'{self._pid}.json':
+                continue
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def collect(self) -> Dict:
+        """Metrics summed over every process that has written a snapshot"""
+        counters: Dict[Tuple[str, LabelKey], float] = {}
+        gauges: Dict[Tuple[str, LabelKey], float] = {}
+        histograms: Dict[Tuple[str, LabelKey], List] = {}
+
+        for snapshot in self._snapshots():
+            for name, key, value in snapshot['counters']:
+                series_key = (name, tuple(tuple(label) for label in key))
+                counters[series_key] = counters.get(series_key, 0) + value
+            if snapshot['pid'] == self._pid or self._is_alive(snapshot['pid']):
+                for name, key, value in snapshot['gauges']:
+                    series_key = (name, tuple(tuple(label) for label in key))
+                    gauges[series_key] = gauges.get(series_key, 0) + value
+            for name, key, bounds, counts, total, count in snapshot['histograms']:
+                series_key = (name, tuple(tuple(label) for label in key))
+                entry = histograms.setdefault(series_key, [bounds, [0] * len(counts), 0.0, 0])
+                entry[1] = [a + b for a, b in zip(entry[1], counts)]
+                entry[2] += total
+                entry[3] += count
+
+        # Hit ratios are derived here so every worker's lookups count
+        lookups: Dict[str, Dict[str, float]] = {}
+        for (name, key), value in counters.items():
+            if name == 'cache_requests_total':
+                labels = dict(key)
+                lookups.setdefault(labels['cache'], {})[labels['result']] = value
+        for cache, results in lookups.items():
+            total = results.get('hit', 0) + results.get('miss', 0)
+            gauges[('cache_hit_ratio', (('cache', cache),))] = results.get('hit', 0) / total if total else 0.0
+
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def render(self) -> str:
+        """Prometheus text exposition of ``collect()``"""
+        collected = self.collect()
+        series_by_name: Dict[str, List] = {}
+        for kind in ('counters', 'gauges', 'histograms'):
+            for (name, key), value in collected[kind].items():
+                series_by_name.setdefault(name, []).append((key, value))
+
+        lines = []
+        for name in sorted(series_by_name):
+            metric_type, description = DESCRIPTIONS.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for key, value in sorted(series_by_name[name], key=lambda series: series[0]):
+                if metric_type == 'histogram':
+                    bounds, counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip([*map(str, bounds), '+Inf'], counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {total}')
+                    lines.append(f'{name}_count{_format_labels(key)} {count}')
+                else:
+                    lines.append(f'{name}{_format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def clear_folder(self):
+        """Remove snapshots left by a previous server run"""
+        if not self.folder:
+            return
+        for name in os.listdir(self.folder):
+            if name.endswith(('.json', '.tmp')):
+                try:
+                    os.unlink(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    pass
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    pairs = (f'{name}="{_escape(value)}"' for name, value in key)
+    return '{' + ','.join(pairs) + '}'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# One registry per process, imported by services and routes
+metrics = MetricsRegistry()
@@ -0,0 +1,130 @@
+"""Sampling profiler for individual requests and the work they start"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ProfileSession:
+    """Stacks sampled from one request thread and any threads it hands off to"""
+
+    def __init__(self, label: str):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started = time.time()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.request_thread = threading.get_ident()
+        self.request_done = False
+        self.threads: List[threading.Thread] = []
+
+    @property
+    def file_stem(self) -> str:
+        timestamp = datetime.fromtimestamp(self.started).strftime('%Y%m%d-%H%M%S')
+        return f"{timestamp}-{self.label}-{self.profile_id}"
+
+class RequestProfiler:
+    """Samples Python stacks every ``interval`` seconds while a profile is open.
+
+    Output is written in collapsed-stack format (``frame;frame;frame count``)
+    that flamegraph.pl, speedscope and similar tools read directly, next to a
+    small JSON summary.
+    """
+
+    def __init__(self, folder: str, interval: float = 0.005, max_seconds: float = 900):
+        self.folder = folder
+        self.interval = interval
+        self.max_seconds = max_seconds
+
+    def start(self, label: str) -> ProfileSession:
+        """Begin sampling the calling (request) thread"""
+        session = ProfileSession(label)
+        sampler = threading.Thread(target=self._sample, args=(session,), name=f'profiler-{session.profile_id}')
+        sampler.daemon = True
+        sampler.start()
+        return session
+
+    def track_thread(self, session: ProfileSession, thread: threading.Thread):
+        """Keep sampling ``thread`` after the request returns, until it exits"""
+        session.threads.append(thread)
+
+    def finish_request(self, session: ProfileSession):
+        session.request_done = True
+
+    @staticmethod
+    def _fold(frame, root: str) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.append(root)
+        return ';'.join(reversed(names))
+
+    def _sample(self, session: ProfileSession):
+        deadline = session.started + self.max_seconds
+        while time.time() < deadline:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+
+            if not session.request_done and session.request_thread in frames:
+                session.stacks[self._fold(frames[session.request_thread], 'request')] += 1
+            for thread in session.threads:
+                if thread.ident in frames:
+                    session.stacks[self._fold(frames[thread.ident], thread.name)] += 1
+            session.samples += 1
+
+            if session.request_done and not any(thread.is_alive() for thread in session.threads):
+                break
+
+        try:
+            self._write(session)
+        except OSError as e:
+            logger.error(f"Error writing profile {session.profile_id}: {str(e)}")
+
+    def _write(self, session: ProfileSession):
+        stem = os.path.join(self.folder, session.file_stem)
+        with open(stem + '.folded', 'w') as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(stem + '.json', 'w') as f:
+            json.dump({
+                'profile_id': session.profile_id,
+                'label': session.label,
+                'started': datetime.fromtimestamp(session.started).isoformat(),
+                'duration_seconds': round(time.time() - session.started, 3),
+                'interval_seconds': self.interval,
+                'samples': session.samples,
+                'threads': ['request'] + [thread.name for thread in session.threads],
+            }, f, indent=2)
+        logger.info("Wrote profile %s (%d samples)", session.file_stem, session.samples)
+
+    def list_profiles(self) -> List[Dict]:
+        """Summaries of stored profiles, newest first"""
+        profiles = []
+        for name in sorted(os.listdir(self.folder), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary['file'] = name[:-len('.json')] + '.folded'
+            profiles.append(summary)
+        return profiles
+
+    def profile_path(self, file_name: str) -> Optional[str]:
+        """Path of a stored artifact, None for anything outside the profiles folder"""
+        if os.path.basename(file_name) != file_name or not file_name.endswith(('.folded', '.json')):
+            return None
+        path = os.path.join(self.folder, file_name)
+        return path if os.path.isfile(path) else None
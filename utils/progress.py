@@ -0,0 +1,170 @@
+"""Progress event log for background jobs, shared by every worker"""
+
+import os
+import re
+import json
+import time
+import fcntl
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Event types that end a job's stream
+TERMINAL_STATUSES = ('completed', 'error')
+
+# Session IDs become file names
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+Event = Tuple[int, str, Dict]
+
+class ProgressBroker:
+    """Numbered, replayable progress events per processing session.
+
+    Events are appended as JSON lines to one file per session, so any
+    gunicorn worker can answer status polls and resume an SSE stream from
+    ``Last-Event-ID``, not only the worker running the job. An event's ID is
+    its line number, starting at 1 so ``Last-Event-ID: 0`` replays everything.
+    Each worker keeps the events it has parsed and only reads what was appended.
+    """
+
+    def __init__(self, folder: Optional[str] = None, poll_seconds: float = 0.5):
+        self.folder = folder
+        # Listeners in other workers notice new events within this long
+        self.poll_seconds = poll_seconds
+        self._condition = threading.Condition()
+        self._read_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[int, List[Event]]] = {}
+
+    def configure(self, folder: str):
+        """Keep event logs in ``folder``, which every worker must share"""
+        self.folder = folder
+
+    def _path(self, session_id: str) -> Optional[str]:
+        if not self.folder or not _SESSION_ID.match(session_id or ''):
+            return None
+        return os.path.join(self.folder, f'{session_id}.events')
+
+    def _read(self, session_id: str) -> Optional[List[Event]]:
+        """All events of a session, parsing only lines appended since the last read"""
+        path = self._path(session_id)
+        if path is None:
+            return None
+        with self._read_lock:
+            offset, events = self._cache.get(session_id, (0, []))
+            try:
+                with open(path, 'rb') as log_file:
+                    log_file.seek(offset)
+                    chunk = log_file.read()
+            except FileNotFoundError:
+                self._cache.pop(session_id, None)
+                return None
+
+            # A line still being written is picked up by the next read
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                event_type, data = json.loads(line)
+                events.append((len(events) + 1, event_type, data))
+            self._cache[session_id] = (offset + len(complete), events)
+            return events
+
+    def publish(self, session_id: str, event_type: str, data: Dict) -> int:
+        """Append an event for a session and wake up any listeners"""
+        path = self._path(session_id)
+        if path is None:
+            raise ValueError(f'Invalid session ID: {session_id}')
+        line = (json.dumps([event_type, data], default=str) + '\n').encode('utf-8')
+
+        with open(path, 'ab') as log_file:
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+            try:
+                event_id = len(self._read(session_id) or []) + 1
+                log_file.write(line)
+                log_file.flush()
+            finally:
+                fcntl.flock(log_file, fcntl.LOCK_UN)
+
+        with self._condition:
+            self._condition.notify_all()
+        return event_id
+
+    def has_session(self, session_id: str) -> bool:
+        path = self._path(session_id)
+        return path is not None and os.path.exists(path)
+
+    @staticmethod
+    def _finished(events: List[Event]) -> bool:
+        return any(event_type == 'status' and data.get('status') in TERMINAL_STATUSES
+                   for _, event_type, data in reversed(events))
+
+    def is_finished(self, session_id: str) -> bool:
+        return self._finished(self._read(session_id) or [])
+
+    def last_event_id(self, session_id: str) -> int:
+        """ID of the newest event for a session, 0 if there is none"""
+        return len(self._read(session_id) or [])
+
+    def events_since(self, session_id: str, last_event_id: int = 0) -> List[Event]:
+        """Events with an ID greater than ``last_event_id``"""
+        return list((self._read(session_id) or [])[max(last_event_id, 0):])
+
+    def snapshot(self, session_id: str) -> Optional[Dict]:
+        """Current status, messages and per-item states of a session, rebuilt from its events"""
+        events = self._read(session_id)
+        if events is None:
+            return None
+        status = {'status': 'pending', 'current': 0, 'total': 0, 'messages': [], 'items': []}
+        items = {}
+        for _, event_type, data in events:
+            if event_type == 'status':
+                status.update(data)
+            elif event_type == 'message':
+                status['messages'].append(data['text'])
+            elif event_type == 'item':
+                items[data['index']] = {'title': data['title'], 'state': data['state']}
+        status['items'] = [items.get(index, {'state': 'queued'}) for index in range(status['total'])]
+        return status
+
+    def wait_for_events(self, session_id: str, last_event_id: int,
+                        timeout: float) -> List[Event]:
+        """Block until new events arrive, the job finishes or ``timeout`` passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self._read(session_id) or []
+            remaining = deadline - time.monotonic()
+            if len(events) > last_event_id or self._finished(events) or remaining <= 0:
+                return list(events[max(last_event_id, 0):])
+            # Publishers in this worker wake us at once; other workers are polled
+            with self._condition:
+                self._condition.wait(min(self.poll_seconds, remaining))
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete event logs untouched for ``max_age_seconds``"""
+        if not self.folder:
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            return 0
+        for entry in entries:
+            if not entry.name.endswith('.events'):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        with self._read_lock:
+            for session_id in [sid for sid in self._cache if not self.has_session(sid)]:
+                self._cache.pop(session_id, None)
+        return removed
+
+def format_sse(event_id: Optional[int], event_type: str, data: Dict) -> str:
+    """Format a single Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,77 @@
+"""Per-match timing breakdown for processing jobs"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Stages timed for every match, in pipeline order
+STAGES = ('dedupe', 'lookup', 'download', 'upload')
+
+# YouTube Data API cost of the calls a job makes
+SEARCH_QUOTA_UNITS = 100
+UPLOAD_QUOTA_UNITS = 1600
+
+def new_item(title: str) -> Dict:
+    """Timeline entry for one queued match"""
+    item = {
+        'title': title,
+        'state': 'queued',
+        'queue_wait_seconds': None,
+        'download_bytes': 0,
+        'upload_bytes': 0,
+        'quota_units': 0,
+        'total_seconds': None,
+    }
+    for stage in STAGES:
+        item[f'{stage}_seconds'] = None
+    return item
+
+@contextmanager
+def timed(item: Dict, stage: str) -> Iterator[None]:
+    """Add the time spent in ``stage`` to the item, also when it fails"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        item[f'{stage}_seconds'] = round((item[f'{stage}_seconds'] or 0) + time.time() - start, 3)
+
+def start_item(item: Dict, job_started: float):
+    item['started'] = time.time()
+    item['queue_wait_seconds'] = round(item['started'] - job_started, 3)
+
+def finish_item(item: Dict):
+    if item.get('started'):
+        item['total_seconds'] = round(time.time() - item['started'], 3)
+
+def summarize(items: List[Dict], started: float, finished: Optional[float] = None,
+              slowest: int = 5) -> Dict:
+    """Throughput, time per stage and the slowest matches of a job"""
+    elapsed = max((finished or time.time()) - started, 0.001)
+    finished_items = [(index, item) for index, item in enumerate(items) if item.get('total_seconds') is not None]
+    states: Dict[str, int] = {}
+    for item in items:
+        states[item['state']] = states.get(item['state'], 0) + 1
+
+    downloaded = sum(item['download_bytes'] for item in items)
+    uploaded = sum(item['upload_bytes'] for item in items)
+    return {
+        'elapsed_seconds': round(elapsed, 1),
+        'items': len(items),
+        'finished_items': len(finished_items),
+        'states': states,
+        'items_per_hour': round(len(finished_items) / elapsed * 3600, 2),
+        'download_bytes': downloaded,
+        'upload_bytes': uploaded,
+        'download_bytes_per_second': round(downloaded / sum(item['download_seconds'] or 0 for item in items), 1)
+        if any(item['download_seconds'] for item in items) else None,
+        'upload_bytes_per_second': round(uploaded / sum(item['upload_seconds'] or 0 for item in items), 1)
+        if any(item['upload_seconds'] for item in items) else None,
+        'quota_units': sum(item['quota_units'] for item in items),
+        # Where the job's time went, summed over matches
+        'stage_seconds': {stage: round(sum(item[f'{stage}_seconds'] or 0 for item in items), 1)
+                          for stage in STAGES},
+        'slowest': [
+            {'index': index, 'title': item['title'], 'state': item['state'], 'total_seconds': item['total_seconds']}
+            for index, item in sorted(finished_items, key=lambda pair: pair[1]['total_seconds'], reverse=True)[:slowest]
+        ],
+    }